@@ -20,3 +20,6 @@ except ImportError:  # pragma: no cover
 # settings.JOYOUS_RSS_FEED_IMAGE = "joyous/img/logo.png"
 # settings.JOYOUS_UPCOMING_INCLUDES_STARTED = False
 # settings.JOYOUS_DEFEND_FORMS = False
+# settings.JOYOUS_INDEXED_STARTS = False
+# settings.JOYOUS_OCCURRENCES = False
+# settings.JOYOUS_OCCURRENCES_WINDOW = (365, 730)
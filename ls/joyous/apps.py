@@ -8,4 +8,4 @@ class JoyousAppConfig(AppConfig):
     default_auto_field = "django.db.models.AutoField"
 
     def ready(self):
-        pass
+        from . import signals  # noqa: F401
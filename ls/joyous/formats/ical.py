@@ -4,17 +4,30 @@
 import datetime as dt
 import pytz
 import base64
+import hashlib
 import quopri
 from collections import defaultdict
+from threading import Lock
 from zipfile import is_zipfile, ZipFile
 from icalendar import Calendar, Event
 from icalendar import vDatetime, vRecur, vDDDTypes, vText
 from icalendar.cal import types_factory
+from django.conf import settings
 from django.contrib import messages
-from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
-from django.http import HttpResponse
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Q
+from django.db.models.functions import Length, Substr
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import html
 from django.utils import timezone
+from django.utils.text import slugify
+from treebeard.exceptions import PathOverflow
+from wagtail.log_actions import get_active_log_context
+from wagtail.models import Page, PageLogEntry, Revision
+from wagtail.signals import page_published
 from ls.joyous import __version__
 from ..models import (
     SimpleEventPage,
@@ -31,6 +44,7 @@ from ..models import (
     EventBase,
     CalendarPage,
 )
+from ..models.recurring_events import _ViewRestrictionChecker
 from ..utils.recurrence import Recurrence
 from ..utils.telltime import getAwareDatetime
 from .vtimezone import create_timezone
@@ -39,6 +53,35 @@ from .errors import CalendarTypeError, CalendarNotInitializedError
 # ------------------------------------------------------------------------------
 MAX_YEAR = 2038
 
+# How long the VEVENTs of an event are kept in the cache for
+_FRAGMENT_TIMEOUT = 7 * 24 * 60 * 60
+
+# How many events are written in each transaction of a bulk import
+_IMPORT_BATCH_SIZE = 100
+
+_saveRevisionLock = Lock()
+
+
+def icalStreamingEnabled():
+    """
+    Are calendars exported a VEVENT at a time?
+    """
+    return getattr(settings, "JOYOUS_ICAL_STREAMING", False)
+
+
+def icalFragmentCacheEnabled():
+    """
+    Are the VEVENTs of each event kept in the cache between exports?
+    """
+    return getattr(settings, "JOYOUS_ICAL_FRAGMENT_CACHE", False)
+
+
+def icalBulkImportEnabled():
+    """
+    Are iCalendar files imported in batches?
+    """
+    return getattr(settings, "JOYOUS_ICAL_BULK_IMPORT", False)
+
 
 # ------------------------------------------------------------------------------
 class VComponentMixin:
@@ -87,11 +130,18 @@ class ICalHandler:
     """Serve and load iCalendar files"""
 
     def serve(self, page, request, *args, **kwargs):
-        try:
-            vcal = VCalendar.fromPage(page, request)
-        except CalendarTypeError:
-            return None
-        response = HttpResponse(vcal.to_ical(), content_type="text/calendar")
+        if icalStreamingEnabled() and isinstance(page, CalendarPage):
+            chunks = VCalendar.iterFromCalendarPage(page, request)
+            response = StreamingHttpResponse(chunks, content_type="text/calendar")
+        elif icalFragmentCacheEnabled() and isinstance(page, CalendarPage):
+            ical = VCalendar.assembleFromCalendarPage(page, request)
+            response = HttpResponse(ical, content_type="text/calendar")
+        else:
+            try:
+                vcal = VCalendar.fromPage(page, request)
+            except CalendarTypeError:
+                return None
+            response = HttpResponse(vcal.to_ical(), content_type="text/calendar")
         response["Content-Disposition"] = "attachment; filename={}.ics".format(
             page.slug
         )
@@ -110,6 +160,7 @@ class ICalHandler:
             messages.error(
                 request, "Could not load {} iCal events".format(results.fail)
             )
+        return results
 
     def _loadZip(self, page, request, upload, **kwargs):
         results = VResults()
@@ -134,10 +185,12 @@ class VCalendar(Calendar, VComponentMixin):
     prodVersion = ".".join(__version__.split(".", 2)[:2])
     prodId = "-//linuxsoftware.nz//NONSGML Joyous v{}//EN".format(prodVersion)
 
-    def __init__(self, page=None, utc2local=False):
+    def __init__(self, page=None, utc2local=False, progress=None, bulk=False):
         super().__init__(self)
         self.page = page
         self.utc2local = utc2local
+        self.progress = progress
+        self.bulk = bulk
         self.set("PRODID", self.prodId)
         self.set("VERSION", "2.0")
 
@@ -170,6 +223,70 @@ class VCalendar(Calendar, VComponentMixin):
         vcal.subcomponents.extend(vevents)
         return vcal
 
+    @classmethod
+    def assembleFromCalendarPage(cls, page, request):
+        """
+        Return the iCalendar of a calendar page as bytes, put together from
+        the VEVENTs of each event, which are kept in the cache until the
+        event or its exceptions change.
+        """
+        vcal = cls(page)
+        versions = _getExceptionVersions()
+        fragments = []
+        tzs = defaultdict(TimeZoneSpan)
+        for event in page._getAllEvents(request):
+            ical, firstDt, lastDt = cls._getFragment(event, vcal.page, versions)
+            fragments.append(ical)
+            if event.tz and event.tz is not pytz.utc:
+                tzs[event.tz]._addSpan(firstDt, lastDt)
+        for tz, vspan in tzs.items():
+            vcal.add_component(vspan.createVTimeZone(tz))
+        end = b"END:VCALENDAR\r\n"
+        return b"".join([vcal.to_ical()[: -len(end)]] + fragments + [end])
+
+    @classmethod
+    def iterFromCalendarPage(cls, page, request):
+        """
+        Yield the iCalendar of a calendar page in chunks of bytes, making the
+        VEVENTs one event at a time so the whole calendar is never in memory.
+        """
+        vcal = cls(page)
+        versions = _getExceptionVersions() if icalFragmentCacheEnabled() else None
+        # A first pass over the events finds the span of each timezone
+        tzs = defaultdict(TimeZoneSpan)
+        for event in page._iterAllEvents(request):
+            if event.tz and event.tz is not pytz.utc:
+                tzs[event.tz].addPage(event)
+        for tz, vspan in tzs.items():
+            vcal.add_component(vspan.createVTimeZone(tz))
+        end = b"END:VCALENDAR\r\n"
+        yield vcal.to_ical()[: -len(end)]
+        for event in page._iterAllEvents(request):
+            yield cls._getFragment(event, vcal.page, versions)[0]
+        yield end
+
+    @classmethod
+    def _getFragment(cls, event, calendar, versions=None):
+        # The (VEVENTs as bytes, first datetime, last datetime) of an event
+        # and its exceptions, from the cache if we have the exception versions
+        key = None
+        if versions is not None:
+            key = _getFragmentKey(event, calendar, versions)
+            fragment = cache.get(key)
+            if fragment is not None:
+                return fragment
+        vevent = cls.factory.makeFromPage(event, calendar)
+        vcomponents = [vevent] + vevent.vchildren
+        vspan = TimeZoneSpan(vevent)
+        fragment = (
+            b"".join(vcomponent.to_ical() for vcomponent in vcomponents),
+            vspan.firstDt,
+            vspan.lastDt,
+        )
+        if key is not None:
+            cache.set(key, fragment, _FRAGMENT_TIMEOUT)
+        return fragment
+
     @classmethod
     def _fromEventPage(cls, event):
         vcal = cls(cls._findCalendarFor(event))
@@ -210,7 +327,9 @@ class VCalendar(Calendar, VComponentMixin):
             calStream = Calendar.from_ical(data, multiple=True)
         except Exception:
             # messages.debug(request, str(e))
-            return VResults(error=1)
+            results = VResults(error=1)
+            self._reportProgress(results)
+            return results
 
         self.clear()
         results = VResults()
@@ -242,20 +361,33 @@ class VCalendar(Calendar, VComponentMixin):
                 self.add_component(vevent)
                 match.add(vevent)
 
-        for vmatch in vmap.values():
-            vevent = vmatch.parent
-            if vevent is not None:
-                try:
-                    event = self.page._getEventFromUid(request, vevent["UID"])
-                except PermissionDenied:
-                    # No authority
-                    results.fail += 1
-                except ObjectDoesNotExist:
-                    results += self._createEventPage(request, vevent)
-                else:
-                    results += self._updateEventPage(request, vevent, event)
+        self._reportProgress(results)
+
+        vevents = [
+            vmatch.parent for vmatch in vmap.values() if vmatch.parent is not None
+        ]
+        if self.bulk or icalBulkImportEnabled():
+            return results + self._bulkLoadEvents(request, vevents)
+        events = self.page._getEventsFromUids(
+            request, [str(vevent["UID"]) for vevent in vevents]
+        )
+        for vevent in vevents:
+            uid = str(vevent["UID"])
+            if uid not in events:
+                eventResults = self._createEventPage(request, vevent)
+            elif events[uid] is None:
+                # No authority
+                eventResults = VResults(fail=1)
+            else:
+                eventResults = self._updateEventPage(request, vevent, events[uid])
+            self._reportProgress(eventResults)
+            results += eventResults
         return results
 
+    def _reportProgress(self, results):
+        if self.progress is not None:
+            self.progress(results)
+
     def _updateEventPage(self, request, vevent, event):
         allOk = True
         if vevent.modifiedDt > event.latest_revision_created_at:
@@ -303,6 +435,70 @@ class VCalendar(Calendar, VComponentMixin):
         _addPage(request, event, exception)
         _saveRevision(request, exception)
 
+    def _bulkLoadEvents(self, request, vevents):
+        # Find all the events at once, then a batch of events at a time work
+        # out what is to be created and updated, and write it
+        results = VResults()
+        events = self.page._getEventsFromUids(
+            request, [str(vevent["UID"]) for vevent in vevents]
+        )
+        writer = _BulkWriter(request, self.page)
+        for start in range(0, len(vevents), _IMPORT_BATCH_SIZE):
+            batch = vevents[start:start + _IMPORT_BATCH_SIZE]
+            jobs = []
+            batchResults = self._planEvents(request, batch, events, jobs)
+            writer.write(jobs)
+            self._reportProgress(batchResults)
+            results += batchResults
+        return results
+
+    def _planEvents(self, request, vevents, events, jobs):
+        # Add (vevent, event, update?, [(vchild, exception)]) to jobs for the
+        # events and exceptions which are new or have been modified
+        results = VResults()
+        matched = []
+        for vevent in vevents:
+            uid = str(vevent["UID"])
+            vchildren = vevent.vchildren[:]
+            vchildren += [
+                CancellationVEvent.fromExDate(vevent, exDate)
+                for exDate in vevent.exDates
+            ]
+            if uid not in events:
+                jobs.append(
+                    (vevent, None, True, [(vchild, None) for vchild in vchildren])
+                )
+                results.success += 1
+            elif events[uid] is None:
+                # No authority
+                results.fail += 1
+            else:
+                matched.append((vevent, events[uid], vchildren))
+
+        exceptions = _getExceptionPages(
+            (vchild.Page, event, vchild["RECURRENCE-ID"].date())
+            for vevent, event, vchildren in matched
+            for vchild in vchildren
+        )
+        isAuthorized = _ViewRestrictionChecker(request)
+        for vevent, event, vchildren in matched:
+            allOk = True
+            children = []
+            for vchild in vchildren:
+                key = (vchild.Page, event.path, vchild["RECURRENCE-ID"].date())
+                exception = exceptions.get(key)
+                if exception is None:
+                    children.append((vchild, None))
+                elif not isAuthorized(exception):
+                    allOk = False
+                elif vchild.modifiedDt > exception.latest_revision_created_at:
+                    children.append((vchild, exception))
+            update = vevent.modifiedDt > event.latest_revision_created_at
+            if update or children:
+                jobs.append((vevent, event, update, children))
+            results += VResults(allOk)
+        return results
+
 
 # ------------------------------------------------------------------------------
 def _addPage(request, parent, page):
@@ -311,49 +507,332 @@ def _addPage(request, parent, page):
     parent.add_child(instance=page)
 
 
+def _getUser(request):
+    # Ensure we have a proper user object
+    user = request.user
+    if isinstance(user, str):
+        from django.contrib.auth import get_user_model
+
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=user)
+        except User.DoesNotExist:
+            user = User.objects.first()
+    return user
+
+
 def _saveRevision(request, page):
     # Patch Django's datetime field to handle non-string values properly
     # This fixes the issue where fromisoformat() receives non-string values
     from django.db.models.fields import DateTimeField
     import datetime
 
-    # Store original to_python method
-    original_to_python = DateTimeField.to_python
-
-    def patched_to_python(self, value):
-        # If value is None or empty, return None
-        if value is None or value == "":
-            return None
-        # If value is already a datetime, return it
-        if isinstance(value, datetime.datetime):
-            return value
-        # If value is not a string, convert it to None
-        if not isinstance(value, str):
-            return None
-        # Otherwise use the original method
-        return original_to_python(self, value)
-
-    # Temporarily patch the method
-    DateTimeField.to_python = patched_to_python
-
-    try:
-        # Ensure we have a proper user object
-        user = request.user
-        if isinstance(user, str):
-            from django.contrib.auth import get_user_model
-
-            User = get_user_model()
-            try:
-                user = User.objects.get(username=user)
-            except User.DoesNotExist:
-                user = User.objects.first()
+    # The patch is seen by every thread, so it is only put in place by one
+    # import at a time, else one could restore another's patch as the original
+    with _saveRevisionLock:
+        # Store original to_python method
+        original_to_python = DateTimeField.to_python
+
+        def patched_to_python(self, value):
+            # If value is None or empty, return None
+            if value is None or value == "":
+                return None
+            # If value is already a datetime, return it
+            if isinstance(value, datetime.datetime):
+                return value
+            # If value is not a string, convert it to None
+            if not isinstance(value, str):
+                return None
+            # Otherwise use the original method
+            return original_to_python(self, value)
+
+        # Temporarily patch the method
+        DateTimeField.to_python = patched_to_python
 
-        revision = page.save_revision(user, bool(request.POST.get("action-submit")))
-        if bool(request.POST.get("action-publish")):
-            revision.publish()
-    finally:
-        # Restore original method
-        DateTimeField.to_python = original_to_python
+        try:
+            user = _getUser(request)
+            revision = page.save_revision(user, bool(request.POST.get("action-submit")))
+            if bool(request.POST.get("action-publish")):
+                revision.publish()
+        finally:
+            # Restore original method
+            DateTimeField.to_python = original_to_python
+
+
+def _getExceptionPages(wanted):
+    # The existing exceptions for the (model, event, date)s wanted, by
+    # (model, path of the event, date)
+    parents = defaultdict(dict)
+    dates = defaultdict(set)
+    for model, event, date in wanted:
+        parents[model][event.path] = event.depth
+        dates[model].add(date)
+    found = {}
+    for model, paths in parents.items():
+        underEvents = Q()
+        for path, depth in paths.items():
+            underEvents |= Q(path__startswith=path, depth=depth + 1)
+        exceptions = model.objects.filter(underEvents, except_date__in=dates[model])
+        for exception in exceptions.order_by("path"):
+            key = (model, exception.path[: -Page.steplen], exception.except_date)
+            # if an event somehow has more than one exception of this type on
+            # the same date, only the first is updated (one by one the import
+            # would raise MultipleObjectsReturned)
+            found.setdefault(key, exception)
+    return found
+
+
+class _BulkWriter:
+    """
+    Writes the pages of an import a batch at a time.  The paths and slugs of
+    new pages are allocated here, from one look at the children of each
+    parent, and the revisions of a batch are created all together.
+    """
+
+    def __init__(self, request, calendar):
+        self.calendar = calendar
+        self.user = _getUser(request)
+        self.publish = bool(request.POST.get("action-publish"))
+        self.submit = bool(request.POST.get("action-submit"))
+        # the last step and the slugs of the children, by the parent's path
+        self.steps = {}
+        self.slugs = {}
+
+    def write(self, jobs):
+        published = []
+        with transaction.atomic():
+            self._loadChildren(jobs)
+            added = defaultdict(int)
+            created = []
+            updated = []
+            for vevent, event, update, children in jobs:
+                if event is None:
+                    event = vevent.makePage(uid=vevent["UID"])
+                    self._addPage(self.calendar, event)
+                    added[self.calendar] += 1
+                    created.append(event)
+                elif update:
+                    vevent.toPage(event)
+                    self._updatePage(event)
+                    updated.append(event)
+                for vchild, exception in children:
+                    if exception is None:
+                        exception = vchild.makePage(overrides=event)
+                        self._addPage(event, exception)
+                        added[event] += 1
+                        created.append(exception)
+                    else:
+                        exception._cached_parent_obj = event
+                        vchild.toPage(exception)
+                        self._updatePage(exception)
+                        updated.append(exception)
+            for parent, numAdded in added.items():
+                Page.objects.filter(path=parent.path).update(
+                    numchild=F("numchild") + numAdded
+                )
+                parent.numchild += numAdded
+            self._saveRevisions(created, updated)
+            if self.publish:
+                published = created + updated
+        for page in published:
+            page_published.send(
+                sender=type(page), instance=page, revision=page.live_revision
+            )
+
+    def _loadChildren(self, jobs):
+        # Look just once at the children of the existing pages that we are
+        # about to add children to
+        parents = []
+        for vevent, event, update, children in jobs:
+            if event is None:
+                parents.append(self.calendar)
+            elif any(exception is None for vchild, exception in children):
+                parents.append(event)
+        underParents = Q()
+        for parent in parents:
+            if parent.path not in self.steps:
+                self.steps[parent.path] = 0
+                self.slugs[parent.path] = set()
+                underParents |= Q(path__startswith=parent.path, depth=parent.depth + 1)
+        if not underParents:
+            return
+        children = Page.objects.filter(underParents).values_list("path", "slug")
+        for path, slug in children:
+            parentPath = path[: -Page.steplen]
+            step = Page._str2int(path[-Page.steplen:])
+            self.steps[parentPath] = max(self.steps[parentPath], step)
+            self.slugs[parentPath].add(slug)
+
+    def _addPage(self, parent, page):
+        step = self.steps[parent.path] + 1
+        path = Page._get_path(parent.path, parent.depth + 1, step)
+        if len(path) != len(parent.path) + Page.steplen:
+            raise PathOverflow("Path Overflow from: '{}'".format(parent.path))
+        self.steps[parent.path] = step
+        page.path = path
+        page.depth = parent.depth + 1
+        page._cached_parent_obj = parent
+        page.locale_id = parent.locale_id
+        page.owner = self.user
+        page.live = self.publish
+        if not page.slug:
+            page.slug = self._getAvailableSlug(parent, page.title)
+        self._savePage(page)
+        self.slugs[parent.path].add(page.slug)
+        # a new page has no children to look for
+        self.steps[page.path] = 0
+        self.slugs[page.path] = set()
+
+    def _getAvailableSlug(self, parent, title):
+        # the same as Wagtail would give, without asking the database
+        allowUnicode = getattr(settings, "WAGTAIL_ALLOW_UNICODE_SLUGS", True)
+        baseSlug = slugify(title, allow_unicode=allowUnicode)
+        if not baseSlug:
+            return ""
+        slugs = self.slugs[parent.path]
+        slug = baseSlug
+        suffix = 1
+        while slug in slugs:
+            suffix += 1
+            slug = "{}-{}".format(baseSlug, suffix)
+        return slug
+
+    def _updatePage(self, page):
+        if self.publish:
+            self._savePage(page)
+        else:
+            # the changes only go into the new revision
+            page.full_clean(**self._getCleanArgs(page))
+
+    def _savePage(self, page):
+        if self.publish:
+            now = timezone.now()
+            page.live = True
+            page.expired = False
+            page.last_published_at = now
+            if page.first_published_at is None:
+                page.first_published_at = now
+        page.full_clean(**self._getCleanArgs(page))
+        page.save(clean=False)
+
+    @staticmethod
+    def _getCleanArgs(page):
+        # We set the relations and the tree fields ourselves, so only the
+        # values from the iCalendar file are validated
+        exclude = [field.name for field in page._meta.fields if field.is_relation]
+        return {
+            "exclude": exclude,
+            "validate_unique": False,
+            "validate_constraints": False,
+        }
+
+    def _saveRevisions(self, created, updated):
+        pages = created + updated
+        if not pages:
+            return
+        now = timezone.now()
+        revisions = [
+            Revision(
+                content_object=page,
+                base_content_type=page.get_base_content_type(),
+                submitted_for_moderation=self.submit and not self.publish,
+                user=self.user,
+                created_at=now,
+                content=page.serializable_data(),
+                object_str=str(page),
+            )
+            for page in pages
+        ]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Revision.objects.bulk_create(revisions)
+        else:
+            for revision in revisions:
+                revision.save()
+        for page, revision in zip(pages, revisions):
+            page.latest_revision = revision
+            page.latest_revision_created_at = now
+            page.draft_title = page.title
+            page.has_unpublished_changes = not self.publish
+            if self.publish:
+                page.live_revision = revision
+        Page.objects.bulk_update(
+            pages,
+            [
+                "latest_revision",
+                "latest_revision_created_at",
+                "draft_title",
+                "has_unpublished_changes",
+                "live_revision",
+            ],
+        )
+        if self.publish:
+            self._logPublished(pages, revisions, now)
+        if updated and (self.publish or self.submit):
+            # the new revisions supersede the earlier ones
+            earlier = Revision.objects.filter(
+                base_content_type=updated[0].get_base_content_type(),
+                object_id__in=[str(page.pk) for page in updated],
+            ).exclude(id__in=[revision.id for revision in revisions])
+            if self.publish:
+                earlier.update(submitted_for_moderation=False, approved_go_live_at=None)
+            else:
+                earlier.update(submitted_for_moderation=False)
+
+    def _logPublished(self, pages, revisions, now):
+        # the same entries as revision.publish() would log, all together
+        uuid = get_active_log_context().uuid
+        entries = [
+            PageLogEntry(
+                content_type=ContentType.objects.get_for_model(
+                    page, for_concrete_model=False
+                ),
+                label=page.get_admin_display_title(),
+                action="wagtail.publish",
+                timestamp=now,
+                uuid=uuid,
+                user=self.user,
+                page=page,
+                revision=revision,
+                content_changed=True,
+            )
+            for page, revision in zip(pages, revisions)
+        ]
+        PageLogEntry.objects.bulk_create(entries)
+
+
+# ------------------------------------------------------------------------------
+def _getExceptionVersions():
+    # The (latest revision, number) of the live exceptions under each event,
+    # by the path of the event
+    parentPath = Substr("path", 1, Length("path") - Page.steplen)
+    exceptions = (
+        Page.objects.live()
+        .type(EventExceptionBase)
+        .order_by()
+        .values(parentPath=parentPath)
+        .annotate(lastRevision=Max("latest_revision_id"), numPages=Count("id"))
+    )
+    return {
+        exception["parentPath"]: (exception["lastRevision"], exception["numPages"])
+        for exception in exceptions
+    }
+
+
+def _getFragmentKey(event, calendar, versions):
+    # The VEVENTs change with the event, its exceptions, where it is, and the
+    # holidays of the calendar
+    holidays = getattr(calendar, "holidays", None)
+    parts = (
+        __version__,
+        event.pk,
+        event.latest_revision_id,
+        versions.get(event.path),
+        event.full_url,
+        getattr(calendar, "pk", None),
+        getattr(holidays, "_namesConfig", None),
+    )
+    digest = hashlib.md5(repr(parts).encode("utf-8")).hexdigest()
+    return "joyous.ical.fragment.{}".format(digest)
 
 
 # ------------------------------------------------------------------------------
@@ -468,6 +947,22 @@ class TimeZoneSpan:
         if vevent is not None:
             self.add(vevent)
 
+    def addPage(self, page):
+        """Add the span of an event page without making a VEVENT of it"""
+        if isinstance(page, RecurringEventPage):
+            # may start a little before the first occurrence, but never after
+            fromDate = page.repeat.dtstart
+            toDate = page.repeat.until or dt.date(MAX_YEAR, 12, 31)
+            toDate += dt.timedelta(days=page.num_days - 1)
+        elif isinstance(page, MultidayEventPage):
+            fromDate = page.date_from
+            toDate = page.date_to
+        else:
+            fromDate = toDate = page.date
+        firstDt = getAwareDatetime(fromDate, page.time_from, page.tz, dt.time.min)
+        lastDt = getAwareDatetime(toDate, page.time_to, page.tz, dt.time.max)
+        self._addSpan(firstDt, lastDt)
+
     def add(self, vevent):
         firstDt = vDt(vevent["DTSTART"]).datetime()
         lastDt = vDt(vevent["DTEND"]).datetime(dt.time.max)
@@ -483,7 +978,9 @@ class TimeZoneSpan:
                 # either -- icalendar/src/icalendar/cal.py:526
                 # using replace to keep the tzinfo
                 lastDt = lastDt.replace(year=MAX_YEAR, month=12, day=31)
+        self._addSpan(firstDt, lastDt)
 
+    def _addSpan(self, firstDt, lastDt):
         if self.firstDt is None or firstDt < self.firstDt:
             self.firstDt = firstDt
         if self.lastDt is None or lastDt > self.lastDt:
@@ -857,9 +1354,7 @@ class RecurringVEvent(VEvent):
             ClosedForHolidaysPage.events.hols(page.holidays).child_of(page).first()
         )
         if closedHols is not None:
-            for closedDate in closedHols._getMyDates():
-                if closedDate.year > MAX_YEAR:
-                    break
+            for closedDate in closedHols._getMyDates(toDate=dt.date(MAX_YEAR, 12, 31)):
                 excludeDt = getAwareDatetime(
                     closedDate, closedHols.time_from, closedHols.tz, dt.time.min
                 )
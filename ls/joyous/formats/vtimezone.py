@@ -23,6 +23,8 @@
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 import datetime as dt
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
 import icalendar
 import pytz
 
@@ -48,25 +50,25 @@ def _ensure_pytz_timezone(tz):
     if hasattr(tz, "_utc_transition_times"):
         return tz
 
-    # Try to convert zoneinfo to pytz
-    if hasattr(tz, "key"):
-        try:
-            return pytz.timezone(tz.key)
-        except Exception:
-            pass
-
-    # Try to get zone name and convert
-    zone_name = getattr(tz, "zone", None)
-    if zone_name:
-        try:
-            return pytz.timezone(zone_name)
-        except Exception:
-            pass
+    # Try to convert zoneinfo to pytz, or else get zone name and convert
+    for zone_name in (getattr(tz, "key", None), getattr(tz, "zone", None)):
+        if zone_name:
+            pytz_tz = _get_pytz_timezone(zone_name)
+            if pytz_tz is not None:
+                return pytz_tz
 
     # If conversion fails, return original (will be handled by caller)
     return tz
 
 
+@lru_cache(maxsize=None)
+def _get_pytz_timezone(zone_name):
+    try:
+        return pytz.timezone(zone_name)
+    except Exception:
+        return None
+
+
 def create_timezone(tz, first_date=None, last_date=None):
     """
     create an icalendar vtimezone from a pytz.tzinfo object
@@ -120,8 +122,41 @@ def create_timezone(tz, first_date=None, last_date=None):
 
     first_date = dt.datetime.today() if not first_date else to_naive_utc(first_date)
     last_date = dt.datetime.today() if not last_date else to_naive_utc(last_date)
+
+    # looking for the first and last transition time we need to include
+    transition_times = tz._utc_transition_times
+    first_num = max(bisect_left(transition_times, first_date) - 1, 0)
+    last_num = min(bisect_right(transition_times, last_date), len(transition_times) - 1)
+
+    # the same transitions always make the same VTIMEZONE, so it is only
+    # built once, and then copied so callers can add to or change it
+    timezone = _create_timezone_between(tz, original_tz_name, first_num, last_num)
+    return _copy_timezone(timezone)
+
+
+def _copy_timezone(timezone):
+    """copy a vtimezone and its components, but share their property values,
+    which is much quicker than a deepcopy
+    """
+    copy = icalendar.Timezone(timezone)
+    copy.subcomponents = [type(subcomp)(subcomp) for subcomp in timezone.subcomponents]
+    return copy
+
+
+@lru_cache(maxsize=256)
+def _create_timezone_between(tz, tz_name, first_num, last_num):
+    """create an icalendar vtimezone from the transitions of a pytz.tzinfo
+
+    :param tz: the timezone
+    :type tz: pytz.tzinfo.DstTzInfo
+    :param tz_name: the TZID
+    :param first_num: the index of the first transition to include
+    :param last_num: the index of the last transition to include
+    :returns: timezone information
+    :rtype: icalendar.Timezone()
+    """
     timezone = icalendar.Timezone()
-    timezone.add("TZID", original_tz_name)
+    timezone.add("TZID", tz_name)
 
     # This is not a reliable way of determining if a transition is for
     # daylight savings.
@@ -142,18 +177,6 @@ def create_timezone(tz, first_date=None, last_date=None):
     # ...
     #   if dst[name] or bst[name]:
 
-    # looking for the first and last transition time we need to include
-    first_num, last_num = 0, len(tz._utc_transition_times) - 1
-    first_tt = tz._utc_transition_times[0]
-    last_tt = tz._utc_transition_times[-1]
-    for num, transtime in enumerate(tz._utc_transition_times):
-        if transtime > first_tt and transtime < first_date:
-            first_num = num
-            first_tt = transtime
-        if transtime < last_tt and transtime > last_date:
-            last_num = num
-            last_tt = transtime
-
     timezones = dict()
     for num in range(first_num, last_num + 1):
         name = tz._transition_info[num][2]
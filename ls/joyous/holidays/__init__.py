@@ -2,21 +2,49 @@
 # Joyous Holidays
 # ------------------------------------------------------------------------------
 import datetime as dt
+import hashlib
 from itertools import chain
 from collections import defaultdict, OrderedDict
+from threading import RLock
 from django.conf import settings
+from django.core.cache import cache
 from .parser import parseHolidays
 
+# names of the holidays by configuration and year, shared within the process
+_namesCache = {}
+
 
 class Holidays:
-    """Defines what holidays are celebrated on what dates."""
+    """
+    Defines what holidays are celebrated on what dates.
+
+    One instance, such as CalendarPage.holidays, is shared by all the threads
+    of a process, so the indexes of the years and the sources are only looked
+    at or changed while holding its lock.
+    """
 
     def __init__(self, holidaySetting="JOYOUS_HOLIDAYS"):
+        self._lock = RLock()
         self.setting = holidaySetting
         self.simple = {}
         self.srcs = [self.simple]
+        self._years = OrderedDict()
+        self._maxYears = getattr(settings, "JOYOUS_HOLIDAYS_CACHED_YEARS", 20)
+        self._nameTuples = {}
+        self._labels = {}
+        self._names = None
+        self._namesConfig = None
         self._parseSettings()
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = RLock()
+
     def __add__(self, other):
         retval = Holidays(None)
         for date, value in chain(self.simple.items(), other.simple.items()):
@@ -32,22 +60,154 @@ class Holidays:
                 hols = parseHolidays(holidaySettings)
                 if hols is not None:
                     self.register(hols)
+        else:
+            holidaySettings = ""
+        # the names can be shared with other Holidays configured the same way
+        self._namesConfig = "{}={}".format(self.setting, holidaySettings)
 
     def register(self, src):
         """Register a new source of holiday data."""
-        self.srcs.append(src)
+        with self._lock:
+            self.srcs.append(src)
+            self._clearYears()
+            self._names = None
+            # we cannot tell what other sources would give, so only keep the
+            # names for ourselves
+            self._namesConfig = None
 
     def add(self, date, value):
         """Add a holiday to an individual date."""
-        oldValue = self.simple.get(date)
-        if oldValue:
-            if oldValue not in value and value not in oldValue:
-                self.simple[date] = "{}, {}".format(oldValue, value)
-        else:
-            self.simple[date] = value
+        with self._lock:
+            oldValue = self.simple.get(date)
+            if oldValue:
+                if oldValue not in value and value not in oldValue:
+                    self.simple[date] = "{}, {}".format(oldValue, value)
+            else:
+                self.simple[date] = value
+            self._clearYears()
+            self._names = None
 
     def get(self, date):
         """Get all the holidays that are celebrated on this date."""
+        return self._getLabel(self._getNames(date))
+
+    def between(self, fromDate, toDate):
+        """
+        Get the holidays that are celebrated from fromDate to toDate
+        (inclusive), as a dict of date to holidays in date order.
+        """
+        retval = {}
+        for date, names in self._iterNames(fromDate, toDate):
+            retval[date] = self._getLabel(names)
+        return retval
+
+    def datesOf(self, names, fromDate, toDate):
+        """
+        Get the dates from fromDate to toDate (inclusive) on which any of the
+        holidays with these names are celebrated.
+        """
+        names = set(names)
+        return [
+            date
+            for date, dateNames in self._iterNames(fromDate, toDate)
+            if not names.isdisjoint(dateNames)
+        ]
+
+    def _getLabel(self, names):
+        label = self._labels.get(names)
+        if label is None:
+            label = self._labels[names] = ", ".join(names)
+        return label
+
+    def _getNames(self, date):
+        with self._lock:
+            holidays = self._years.get(date.year)
+            if holidays is None:
+                if not self._isIndexable():
+                    self._useYear(date.year, None)
+                    return self._getNamesFromSrcs(date)
+                holidays = self._getYear(date.year)
+            else:
+                self._years.move_to_end(date.year)
+        return holidays.get(date.toordinal(), ())
+
+    def _iterNames(self, fromDate, toDate):
+        # (date, names) of the holidays from fromDate to toDate in date order
+        with self._lock:
+            indexable = self._isIndexable()
+        if not indexable:
+            year = None
+            for ord in range(fromDate.toordinal(), toDate.toordinal() + 1):
+                date = dt.date.fromordinal(ord)
+                with self._lock:
+                    if date.year != year:
+                        year = date.year
+                        self._useYear(year, None)
+                    names = self._getNamesFromSrcs(date)
+                if names:
+                    yield (date, names)
+            return
+        fromOrd = fromDate.toordinal()
+        toOrd = toDate.toordinal()
+        for year in range(fromDate.year, toDate.year + 1):
+            # the index of a year is not changed once it is made
+            with self._lock:
+                holidays = self._getYear(year)
+            for ord, names in holidays.items():
+                if fromOrd <= ord <= toOrd:
+                    yield (dt.date.fromordinal(ord), names)
+
+    def _isIndexable(self):
+        # Can we list all the holidays of a year from every source?
+        # (workalendar sources only tell us about one date at a time)
+        return all(hasattr(src, "items") for src in self.srcs)
+
+    def _getYear(self, year):
+        # The index of date ordinal to names of the holidays for a year.
+        # This, and the methods below that use _years or srcs, must be called
+        # with the lock held.
+        holidays = self._years.get(year)
+        if holidays is None:
+            holidays = self._indexYear(year)
+        self._useYear(year, holidays)
+        return holidays
+
+    def _useYear(self, year, holidays):
+        # Keep the most recently used years, up to JOYOUS_HOLIDAYS_CACHED_YEARS
+        self._years[year] = holidays
+        self._years.move_to_end(year)
+        if len(self._years) > self._maxYears:
+            while len(self._years) > self._maxYears:
+                self._years.popitem(last=False)
+            self._forgetYears()
+
+    def _clearYears(self):
+        # Throw away the indexes, but remember which years are in use
+        self._years = OrderedDict.fromkeys(self._years)
+
+    def _forgetYears(self):
+        # Make the python-holidays sources drop the years we are not keeping
+        for src in self.srcs:
+            if hasattr(src, "_populate"):
+                _forgetYears(src, self._years.keys())
+
+    def _indexYear(self, year):
+        allNames = defaultdict(list)
+        for src in self.srcs:
+            if hasattr(src, "_populate"):
+                # make python-holidays populate this year if it needs to
+                src.get(dt.date(year, 1, 1))
+            for date, value in list(src.items()):
+                if date.year == year and value:
+                    allNames[date.toordinal()].extend(value.split(", "))
+        holidays = {}
+        for ord in sorted(allNames):
+            # remove duplicates and share the tuples of names between dates
+            names = tuple(OrderedDict.fromkeys(allNames[ord]))
+            holidays[ord] = self._nameTuples.setdefault(names, names)
+        return holidays
+
+    def _getNamesFromSrcs(self, date):
         holidays = []
         for src in self.srcs:
             # get from python-holidays and other dict type srcs
@@ -58,12 +218,37 @@ class Holidays:
             holiday = getHoliday(date)
             if holiday:
                 holidays.extend(holiday.split(", "))
-        holidays = list(OrderedDict.fromkeys(holidays))  # remove duplicates
-        return ", ".join(holidays)
+        return tuple(OrderedDict.fromkeys(holidays))  # remove duplicates
 
     def names(self):
-        """Get a list of all the holiday names, sorted by month-day."""
+        """
+        Get a list of all the holiday names, sorted by month-day.
+        These are worked out once a year, and kept in memory and in the cache.
+        """
         thisYear = dt.date.today().year
+        if self._names is None or self._names[0] != thisYear:
+            key = self._getNamesKey(thisYear)
+            names = _namesCache.get(key) if key else None
+            if names is None and key:
+                names = cache.get(key)
+            if names is None:
+                with self._lock:
+                    names = self._findNames(thisYear)
+            if key:
+                _namesCache[key] = names
+                cache.set(key, names, 366 * 24 * 60 * 60)
+            self._names = (thisYear, names)
+        return list(self._names[1])
+
+    def _getNamesKey(self, thisYear):
+        # The cache key for our names this year, or None if we cannot share
+        if self._namesConfig is None:
+            return None
+        config = repr((self._namesConfig, sorted(self.simple.items()), thisYear))
+        digest = hashlib.md5(config.encode("utf-8")).hexdigest()
+        return "joyous.holidays.names.{}".format(digest)
+
+    def _findNames(self, thisYear):
         popYears = list(range(thisYear - 1, thisYear + 10))
         holidays = defaultdict(list)
         for src in self.srcs:
@@ -103,9 +288,21 @@ class Holidays:
             mmddHolidays.append(((mostRecent.month, mostRecent.day), name))
         mmddHolidays.sort()
         retval = [name for mmdd, name in mmddHolidays]
+        self._forgetYears()
         return retval
 
 
+def _forgetYears(src, keepYears):
+    # Make a python-holidays calendar drop the holidays of all but keepYears,
+    # it will populate them again if they are asked for
+    for date in [date for date in dict.keys(src) if date.year not in keepYears]:
+        dict.pop(src, date)
+    src.years.intersection_update(keepYears)
+    for subSrc in getattr(src, "holidays", ()):
+        if hasattr(subSrc, "_populate"):
+            _forgetYears(subSrc, keepYears)
+
+
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
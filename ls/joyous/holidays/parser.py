@@ -3,6 +3,7 @@
 # ------------------------------------------------------------------------------
 from __future__ import unicode_literals
 import re
+from collections.abc import Mapping
 from holidays.holiday_base import HolidayBase
 from holidays import countries as country_holidays
 
@@ -22,14 +23,45 @@ def _createMap(symbols):
             and cls is not HolidayBase
         ):
             holidayMap[name] = cls
-            obj = cls()
-            if hasattr(obj, "country"):
-                holidayMap.setdefault(obj.country, cls)
+            if hasattr(cls, "country"):
+                country = cls.country
+            else:
+                # older versions of python-holidays only set it on the object
+                country = getattr(cls(), "country", None)
+            if country is not None:
+                holidayMap.setdefault(country, cls)
 
     return holidayMap
 
 
-_PYTHON_HOLIDAYS_MAP = _createMap(list(country_holidays.__dict__.items()))
+class _LazyHolidaysMap(Mapping):
+    """
+    The python-holidays country classes by name and country code.  The
+    country modules are already loaded with the holidays package, but older
+    versions of python-holidays need an object of each country created to find
+    its code, so the map is not built until it is first needed.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._map = None
+
+    def _getMap(self):
+        if self._map is None:
+            self._map = _createMap(list(country_holidays.__dict__.items()))
+        return self._map
+
+    def __getitem__(self, key):
+        return self._getMap()[key]
+
+    def __iter__(self):
+        return iter(self._getMap())
+
+    def __len__(self):
+        return len(self._getMap())
+
+
+_PYTHON_HOLIDAYS_MAP = _LazyHolidaysMap()
 # Special treatment for NZ
 _ALT_PROV_NAMES = {
     "NZ": {
@@ -82,7 +114,9 @@ def _parseSubdivisions(holidaysStr, cls):
             elif subdivision in subdivisions:
                 retval += cls(subdiv=subdivision)
             else:
-                country = getattr(cls(), "country", None)
+                country = getattr(cls, "country", None)
+                if country is None:
+                    country = getattr(cls(), "country", None)
                 if subdivision in _ALT_PROV_NAMES.get(country, {}):
                     retval += cls(prov=subdivision)
     return retval
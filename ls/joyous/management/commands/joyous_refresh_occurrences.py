@@ -0,0 +1,25 @@
+# ------------------------------------------------------------------------------
+# Joyous refresh occurrences command
+# ------------------------------------------------------------------------------
+from django.core.management.base import BaseCommand
+from ...models.occurrences import refreshAllOccurrences, getOccurrenceWindow
+
+
+# ------------------------------------------------------------------------------
+class Command(BaseCommand):
+    help = (
+        "Rematerialize the occurrences of every event, rolling the window of "
+        "dates forward.  Run this daily when JOYOUS_OCCURRENCES is enabled."
+    )
+
+    def handle(self, *args, **options):
+        windowFrom, windowTo = getOccurrenceWindow()
+        count = refreshAllOccurrences(window=(windowFrom, windowTo))
+        self.stdout.write(
+            "Refreshed {} occurrences from {} to {}".format(count, windowFrom, windowTo)
+        )
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
@@ -0,0 +1,40 @@
+# ------------------------------------------------------------------------------
+# Joyous refresh starts command
+# ------------------------------------------------------------------------------
+from django.core.management.base import BaseCommand
+from ...models import (
+    SimpleEventPage,
+    MultidayEventPage,
+    RecurringEventPage,
+    PostponementPage,
+)
+from ...models.calendar import _CalendarHolidays
+
+
+# ------------------------------------------------------------------------------
+class Command(BaseCommand):
+    help = (
+        "Recalculate the stored start times of the next and previous "
+        "occurrences of every event.  Use with JOYOUS_INDEXED_STARTS."
+    )
+
+    def handle(self, *args, **options):
+        calendarHolidays = _CalendarHolidays()
+        count = 0
+        for events in (
+            SimpleEventPage.events.all(),
+            MultidayEventPage.events.all(),
+            RecurringEventPage.events.all(),
+            PostponementPage.events.all(),
+        ):
+            for page in events:
+                if isinstance(page, RecurringEventPage):
+                    page.holidays = calendarHolidays(page)
+                page._refreshStarts()
+                count += 1
+        self.stdout.write("Refreshed the start times of {} events".format(count))
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
@@ -0,0 +1,37 @@
+# ------------------------------------------------------------------------------
+# Joyous run imports command
+# ------------------------------------------------------------------------------
+import time
+from django.core.management.base import BaseCommand
+from ...models.imports import runQueuedImports
+
+
+# ------------------------------------------------------------------------------
+class Command(BaseCommand):
+    help = (
+        "Import the calendar files that have been queued for import.  Use "
+        "with JOYOUS_IMPORT_JOBS, when JOYOUS_IMPORT_THREADS is 0."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--watch",
+            type=float,
+            metavar="SECONDS",
+            help="Keep looking for queued imports this often, rather than exiting",
+        )
+
+    def handle(self, *args, **options):
+        interval = options.get("watch")
+        while True:
+            count = runQueuedImports()
+            if count or not interval:
+                self.stdout.write("Ran {} import jobs".format(count))
+            if not interval:
+                break
+            time.sleep(interval)
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
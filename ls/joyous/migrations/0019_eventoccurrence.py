@@ -0,0 +1,77 @@
+# Generated by Django 4.2.16 on 2026-10-18 04:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wagtailcore", "0041_group_collection_permissions_verbose_name_plural"),
+        ("joyous", "0018_alter_closedfor_id_alter_eventcategory_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventOccurrence",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "cancelled",
+                    models.BooleanField(default=False, verbose_name="cancelled"),
+                ),
+                ("start", models.DateTimeField(verbose_name="start")),
+                ("finish", models.DateTimeField(verbose_name="finish")),
+                (
+                    "path",
+                    models.CharField(db_index=True, max_length=255, verbose_name="path"),
+                ),
+                (
+                    "event",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="wagtailcore.page",
+                        verbose_name="event",
+                    ),
+                ),
+                (
+                    "exception",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="wagtailcore.page",
+                        verbose_name="exception",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "event occurrence",
+                "verbose_name_plural": "event occurrences",
+                "ordering": ["start"],
+                "indexes": [
+                    models.Index(
+                        fields=["start", "finish"],
+                        name="joyous_even_start_f1de61_idx",
+                    ),
+                    models.Index(
+                        fields=["finish"], name="joyous_even_finish_2c4bdf_idx"
+                    ),
+                    models.Index(
+                        fields=["event", "start"],
+                        name="joyous_even_event_i_4ab2d7_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,143 @@
+# Generated by Django 4.2.16 on 2026-10-18 05:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("joyous", "0020_event_start_utc"),
+        ("wagtailcore", "0041_group_collection_permissions_verbose_name_plural"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportJob",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "upload",
+                    models.FileField(
+                        blank=True, upload_to="joyous/imports/", verbose_name="upload"
+                    ),
+                ),
+                (
+                    "filename",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="file name"
+                    ),
+                ),
+                (
+                    "utc2local",
+                    models.BooleanField(
+                        default=False, verbose_name="convert UTC to localtime"
+                    ),
+                ),
+                ("publish", models.BooleanField(default=False, verbose_name="publish")),
+                (
+                    "submit",
+                    models.BooleanField(
+                        default=False, verbose_name="submit for moderation"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="queued",
+                        max_length=10,
+                        verbose_name="status",
+                    ),
+                ),
+                (
+                    "success",
+                    models.PositiveIntegerField(default=0, verbose_name="loaded"),
+                ),
+                (
+                    "fail",
+                    models.PositiveIntegerField(default=0, verbose_name="not loaded"),
+                ),
+                (
+                    "error",
+                    models.PositiveIntegerField(default=0, verbose_name="not parsed"),
+                ),
+                (
+                    "messages",
+                    models.JSONField(blank=True, default=list, verbose_name="messages"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created at"),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="started at"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="finished at"
+                    ),
+                ),
+                (
+                    "calendar",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="wagtailcore.page",
+                        verbose_name="calendar",
+                    ),
+                ),
+                (
+                    "site",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="wagtailcore.site",
+                        verbose_name="site",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="user",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "import job",
+                "verbose_name_plural": "import jobs",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "created_at"],
+                        name="joyous_impo_status_79d3ac_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.16 on 2026-10-18 07:30
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def populate_heartbeat(apps, schema_editor):
+    # running jobs are taken to have last saved their progress when started
+    ImportJob = apps.get_model("joyous", "ImportJob")
+    ImportJob.objects.update(heartbeat_at=F("started_at"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("joyous", "0021_importjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="heartbeat_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="heartbeat at"
+            ),
+        ),
+        migrations.RunPython(populate_heartbeat, migrations.RunPython.noop),
+    ]
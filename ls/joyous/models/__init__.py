@@ -23,6 +23,11 @@ from .recurring_events import ExtCancellationPage
 from .recurring_events import ClosedForHolidaysPage
 from .recurring_events import ClosedFor
 
+# Occurrences
+from .occurrences import EventOccurrence
+from .occurrences import refreshOccurrences
+from .occurrences import refreshAllOccurrences
+
 # Events API
 from .events_api import getAllEventsByDay
 from .events_api import getAllEventsByWeek
@@ -30,7 +35,9 @@ from .events_api import getAllUpcomingEvents
 from .events_api import getAllPastEvents
 from .events_api import getGroupUpcomingEvents
 from .events_api import getEventFromUid
+from .events_api import getEventsFromUids
 from .events_api import getAllEvents
+from .events_api import iterAllEvents
 from .events_api import removeContentPanels
 
 # Calendars
@@ -39,6 +46,11 @@ from .calendar import CalendarPageForm
 from .calendar import SpecificCalendarPage
 from .calendar import GeneralCalendarPage
 
+# Import jobs
+from .imports import ImportJob
+from .imports import runImportJob
+from .imports import runQueuedImports
+
 # Groups
 from .groups import GroupPage
 from .groups import get_group_model
@@ -3,6 +3,8 @@
 # ------------------------------------------------------------------------------
 import datetime as dt
 import calendar
+from functools import partial
+from django.apps import apps
 from django.conf import settings
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.contrib.contenttypes.models import ContentType
@@ -12,6 +14,7 @@ from django import forms
 from django.shortcuts import redirect
 from django.template.response import TemplateResponse
 from django.utils import timezone
+from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.translation import gettext_lazy as _
 from wagtail.models import Page, Site
 from wagtail.fields import RichTextField
@@ -24,6 +27,7 @@ from ..utils.names import WEEKDAY_NAMES, MONTH_NAMES, MONTH_ABBRS
 from ..utils.weeks import week_info, gregorian_to_week_date, num_weeks_in_year
 from ..utils.weeks import weekday_abbr, weekday_name
 from ..utils.mixins import ProxyPageMixin
+from ..utils.lazy import LazyList, LazyPaginator, CursorPage
 from ..fields import MultipleSelectField
 from . import (
     getAllEventsByDay,
@@ -31,8 +35,14 @@ from . import (
     getAllUpcomingEvents,
     getAllPastEvents,
     getEventFromUid,
+    getEventsFromUids,
     getAllEvents,
+    iterAllEvents,
 )
+from .events_api import _getUpcomingCursor, _getPastCursor
+from .calendar_cache import getCalendarCacheKey, serveCalendarResponse
+from .calendar_cache import getCalendarValidators, serveConditionalResponse
+from .imports import importJobsEnabled, queueImport, ImportJobsPanel
 from ..forms import FormDefender, BorgPageForm
 
 
@@ -74,6 +84,7 @@ class CalendarPageForm(BorgPageForm):
                 [
                     FieldPanel("upload"),
                     FieldPanel("utc2local"),
+                    ImportJobsPanel(),
                 ],
                 heading=_("Import"),
             )
@@ -102,7 +113,9 @@ class CalendarPageForm(BorgPageForm):
             delattr(page, "__joyous_edit_request")
             utc2local = self.cleaned_data.get("utc2local")
             upload = self.cleaned_data.get("upload")
-            if upload is not None:
+            if upload is not None and importJobsEnabled():
+                queueImport(page, request, upload, utc2local=utc2local)
+            elif upload is not None:
                 self.importHandler.load(page, request, upload, utc2local=utc2local)
 
         if commit:
@@ -128,6 +141,31 @@ DatePictures = {
     "WW": r"(5[0-3]|[1-4]\d|0?[1-9])",
 }
 
+_CURSOR_EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+_1microsecond = dt.timedelta(microseconds=1)
+
+
+def _encodeCursor(cursor):
+    # An opaque token for the position (start, page id) of an event.  The
+    # start is given in microseconds from the epoch, which unlike strftime's
+    # %Y is the same width and meaning for every year.
+    when, pageId = cursor
+    stamp = (when - _CURSOR_EPOCH) // _1microsecond
+    return urlsafe_base64_encode("{}.{}".format(stamp, pageId).encode())
+
+
+def _decodeCursor(token):
+    if not token:
+        return None
+    try:
+        text = urlsafe_base64_decode(token).decode()
+        stamp, pageId = text.split(".")
+        when = _CURSOR_EPOCH + int(stamp) * _1microsecond
+        return (when, int(pageId))
+    except (ValueError, OverflowError, UnicodeDecodeError):
+        return None
+
+
 EVENTS_VIEW_CHOICES = [
     ("L", _("List View")),
     ("W", _("Weekly View")),
@@ -176,6 +214,22 @@ class CalendarPage(RoutablePageMixin, Page, metaclass=FormDefender):
         ),
     ]
 
+    def serve(self, request, view=None, args=None, kwargs=None):
+        """
+        Serve the calendar route, from the cache if JOYOUS_CALENDAR_CACHE is
+        enabled, and not at all if JOYOUS_CONDITIONAL_GET is enabled and the
+        client already has it.
+        """
+        serve = partial(super().serve, request, view, args, kwargs)
+        key = getCalendarCacheKey(self, request, view, args, kwargs)
+        if key is not None:
+            serve = partial(serveCalendarResponse, key, serve)
+        viewName = getattr(view, "__name__", None)
+        validators = getCalendarValidators(self, request, viewName)
+        if validators is not None:
+            return serveConditionalResponse(request, validators, serve)
+        return serve()
+
     @route(r"^$")
     @route(r"^{YYYY}/$".format(**DatePictures))
     def routeDefault(self, request, year=None):
@@ -400,8 +454,15 @@ class CalendarPage(RoutablePageMixin, Page, metaclass=FormDefender):
         weekYear, weekNum, dow = gregorian_to_week_date(today)
         weeklyUrl = myurl + self.reverse_subpage("serveWeek", args=[weekYear, weekNum])
         listUrl = myurl + self.reverse_subpage("servePast")
-        upcomingEvents = self._getUpcomingEvents(request)
-        eventsPage = self._paginate(request, upcomingEvents)
+        if "page" in request.GET:
+            upcomingEvents = self._getUpcomingEvents(request)
+            eventsPage = self._paginate(request, upcomingEvents)
+        else:
+            after = _decodeCursor(request.GET.get("after"))
+            upcomingEvents = self._getUpcomingEvents(request, after=after)
+            eventsPage = self._paginateByCursor(
+                upcomingEvents, "after", _getUpcomingCursor, after is None
+            )
 
         cxt = self._getCommonContext(request)
         cxt.update(
@@ -426,8 +487,15 @@ class CalendarPage(RoutablePageMixin, Page, metaclass=FormDefender):
         weekYear, weekNum, dow = gregorian_to_week_date(today)
         weeklyUrl = myurl + self.reverse_subpage("serveWeek", args=[weekYear, weekNum])
         listUrl = myurl + self.reverse_subpage("serveUpcoming")
-        pastEvents = self._getPastEvents(request)
-        eventsPage = self._paginate(request, pastEvents)
+        if "page" in request.GET:
+            pastEvents = self._getPastEvents(request)
+            eventsPage = self._paginate(request, pastEvents)
+        else:
+            before = _decodeCursor(request.GET.get("before"))
+            pastEvents = self._getPastEvents(request, before=before)
+            eventsPage = self._paginateByCursor(
+                pastEvents, "before", _getPastCursor, before is None
+            )
 
         cxt = self._getCommonContext(request)
         cxt.update(
@@ -527,31 +595,60 @@ class CalendarPage(RoutablePageMixin, Page, metaclass=FormDefender):
             request, year, month, home=home, holidays=self.holidays
         )
 
-    def _getUpcomingEvents(self, request):
+    def _getUpcomingEvents(self, request, after=None):
         """Return the upcoming events in this site."""
         home = Site.find_for_request(request).root_page
-        return getAllUpcomingEvents(request, home=home, holidays=self.holidays)
+        return getAllUpcomingEvents(
+            request, home=home, holidays=self.holidays, after=after
+        )
 
-    def _getPastEvents(self, request):
+    def _getPastEvents(self, request, before=None):
         """Return the past events in this site."""
         home = Site.find_for_request(request).root_page
-        return getAllPastEvents(request, home=home, holidays=self.holidays)
+        return getAllPastEvents(
+            request, home=home, holidays=self.holidays, before=before
+        )
 
     def _getEventFromUid(self, request, uid):
         """Try and find an event with the given UID in this site."""
         event = getEventFromUid(request, uid)  # might raise exception
         home = Site.find_for_request(request).root_page
-        if event.get_ancestors().filter(id=home.id).exists():
+        if event.is_descendant_of(home):
             # only return event if it is in the same site
             return event
 
+    def _getEventsFromUids(self, request, uids):
+        """
+        Find the events with the given UIDs, None for those which are not in
+        this site.
+        """
+        events = getEventsFromUids(request, uids)
+        home = Site.find_for_request(request).root_page
+        return {
+            uid: event if event is not None and event.is_descendant_of(home) else None
+            for uid, event in events.items()
+        }
+
     def _getAllEvents(self, request):
         """Return all the events in this site."""
         home = Site.find_for_request(request).root_page
         return getAllEvents(request, home=home, holidays=self.holidays)
 
+    def _iterAllEvents(self, request):
+        """Iterate through all the events in this site, in no particular order."""
+        home = Site.find_for_request(request).root_page
+        return iterAllEvents(request, home=home, holidays=self.holidays)
+
+    def _getEventPages(self, request):
+        """Return the pages in this site that events could come from."""
+        home = Site.find_for_request(request).root_page
+        return Page.objects.descendant_of(home, inclusive=True)
+
     def _paginate(self, request, events):
-        paginator = Paginator(events, self.EventsPerPage)
+        if isinstance(events, LazyList):
+            paginator = LazyPaginator(events, self.EventsPerPage)
+        else:
+            paginator = Paginator(events, self.EventsPerPage)
         try:
             eventsPage = paginator.page(request.GET.get("page"))
         except PageNotAnInteger:
@@ -560,6 +657,15 @@ class CalendarPage(RoutablePageMixin, Page, metaclass=FormDefender):
             eventsPage = paginator.page(paginator.num_pages)
         return eventsPage
 
+    def _paginateByCursor(self, events, cursorName, getCursor, isFirst):
+        return CursorPage(
+            events,
+            self.EventsPerPage,
+            cursorName,
+            lambda thisEvent: _encodeCursor(getCursor(thisEvent)),
+            isFirst,
+        )
+
 
 # ------------------------------------------------------------------------------
 class SpecificCalendarPage(ProxyPageMixin, CalendarPage):
@@ -592,25 +698,48 @@ class SpecificCalendarPage(ProxyPageMixin, CalendarPage):
             request, year, month, home=self, holidays=self.holidays
         )
 
-    def _getUpcomingEvents(self, request):
+    def _getUpcomingEvents(self, request, after=None):
         """Return my upcoming child events."""
-        return getAllUpcomingEvents(request, home=self, holidays=self.holidays)
+        return getAllUpcomingEvents(
+            request, home=self, holidays=self.holidays, after=after
+        )
 
-    def _getPastEvents(self, request):
+    def _getPastEvents(self, request, before=None):
         """Return my past child events."""
-        return getAllPastEvents(request, home=self, holidays=self.holidays)
+        return getAllPastEvents(
+            request, home=self, holidays=self.holidays, before=before
+        )
 
     def _getEventFromUid(self, request, uid):
         """Try and find a child event with the given UID."""
         event = getEventFromUid(request, uid)  # might raise exception
-        if event.get_ancestors().filter(id=self.id).exists():
+        if event.is_descendant_of(self):
             # only return event if it is a descendant
             return event
 
+    def _getEventsFromUids(self, request, uids):
+        """
+        Find the events with the given UIDs, None for those which are not my
+        descendants.
+        """
+        events = getEventsFromUids(request, uids)
+        return {
+            uid: event if event is not None and event.is_descendant_of(self) else None
+            for uid, event in events.items()
+        }
+
     def _getAllEvents(self, request):
         """Return all my child events."""
         return getAllEvents(request, home=self, holidays=self.holidays)
 
+    def _iterAllEvents(self, request):
+        """Iterate through all my child events, in no particular order."""
+        return iterAllEvents(request, home=self, holidays=self.holidays)
+
+    def _getEventPages(self, request):
+        """Return the pages that my child events could come from."""
+        return Page.objects.descendant_of(self)
+
 
 # ------------------------------------------------------------------------------
 class GeneralCalendarPage(ProxyPageMixin, CalendarPage):
@@ -639,22 +768,72 @@ class GeneralCalendarPage(ProxyPageMixin, CalendarPage):
         """Return all events for the given month grouped by week."""
         return getAllEventsByWeek(request, year, month, holidays=self.holidays)
 
-    def _getUpcomingEvents(self, request):
+    def _getUpcomingEvents(self, request, after=None):
         """Return all the upcoming events."""
-        return getAllUpcomingEvents(request, holidays=self.holidays)
+        return getAllUpcomingEvents(request, holidays=self.holidays, after=after)
 
-    def _getPastEvents(self, request):
+    def _getPastEvents(self, request, before=None):
         """Return all the past events."""
-        return getAllPastEvents(request, holidays=self.holidays)
+        return getAllPastEvents(request, holidays=self.holidays, before=before)
 
     def _getEventFromUid(self, request, uid):
         """Try and find an event with the given UID."""
         return getEventFromUid(request, uid)  # might raise exception
 
+    def _getEventsFromUids(self, request, uids):
+        """Find the events with the given UIDs."""
+        return getEventsFromUids(request, uids)
+
     def _getAllEvents(self, request):
         """Return all the events."""
         return getAllEvents(request, holidays=self.holidays)
 
+    def _iterAllEvents(self, request):
+        """Iterate through all the events, in no particular order."""
+        return iterAllEvents(request, holidays=self.holidays)
+
+    def _getEventPages(self, request):
+        """Return all the pages that events could come from."""
+        return Page.objects.all()
+
+
+# ------------------------------------------------------------------------------
+# Holidays of the calendars
+# ------------------------------------------------------------------------------
+class _CalendarHolidays:
+    """
+    The holidays of the calendar that a page is in, for working out what is
+    stored about events away from the calendar's own views.  The calendars
+    amongst the given pages (or else all of them) are looked up just once.
+    """
+
+    def __init__(self, pages=None):
+        if pages is None:
+            pages = Page.objects.all()
+        models = [
+            model for model in apps.get_models() if issubclass(model, CalendarPage)
+        ]
+        contentTypes = ContentType.objects.get_for_models(
+            *models, for_concrete_models=False
+        )
+        calendars = (
+            pages.filter(content_type__in=contentTypes.values())
+            .order_by("-depth")
+            .specific()
+        )
+        self.calendars = [(calendar.path, calendar.holidays) for calendar in calendars]
+
+    def __call__(self, page):
+        for path, holidays in self.calendars:
+            if page.path.startswith(path):
+                return holidays
+        return CalendarPage.holidays
+
+
+def _getHolidaysFor(page):
+    """The holidays of the calendar that this page is in."""
+    return _CalendarHolidays(Page.objects.ancestor_of(page))(page)
+
 
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
@@ -0,0 +1,469 @@
+# ------------------------------------------------------------------------------
+# Joyous calendar response cache
+# ------------------------------------------------------------------------------
+import datetime as dt
+import calendar
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Count, Max
+from django.utils import timezone, translation
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from wagtail.models import Page, PageViewRestriction, Site
+from .. import __version__
+from ..utils.names import MONTH_ABBRS
+from ..utils.weeks import week_info, gregorian_to_week_date
+from .one_off_events import SimpleEventPage, MultidayEventPage
+from .recurring_events import (
+    RecurringEventPage,
+    EventExceptionBase,
+    DateExceptionBase,
+    PostponementPage,
+    ExtCancellationPage,
+)
+from .occurrences import EVENT_TYPES, EXCEPTION_TYPES
+
+# ------------------------------------------------------------------------------
+# Helper types and constants
+# ------------------------------------------------------------------------------
+_1day = dt.timedelta(days=1)
+_VERSION_KEY = "joyous.calendar.version"
+_BUCKET_KEY = "joyous.calendar.bucket.{}"
+# Dates further away than this from today all share the "far" bucket
+_HORIZON = dt.timedelta(days=366)
+# How long a request may hold the lock on rendering a response
+_LOCK_TIMEOUT = 60
+_POLL_INTERVAL = 0.05
+
+# The calendar routes whose responses can be cached
+CACHED_VIEWS = (
+    "routeDefault",
+    "routeByMonthAbbr",
+    "serveMonth",
+    "serveWeek",
+    "serveDay",
+    "serveUpcoming",
+    "servePast",
+    "serveMiniMonth",
+)
+
+# The export formats whose responses can be cached, and their buckets
+_EXPORT_BUCKETS = {
+    "ical": {"export"},
+    "rss": {"upcoming"},
+}
+
+
+def calendarCacheEnabled():
+    """
+    Are the responses of the calendar routes cached?
+    """
+    return getattr(settings, "JOYOUS_CALENDAR_CACHE", False)
+
+
+def conditionalGetEnabled():
+    """
+    Do the calendar routes and exports answer conditional GET requests?
+    """
+    return getattr(settings, "JOYOUS_CONDITIONAL_GET", False)
+
+
+# ------------------------------------------------------------------------------
+# Caching
+# ------------------------------------------------------------------------------
+def getCalendarCacheKey(page, request, view, args, kwargs):
+    """
+    The cache key for the response of a calendar route, or None if the
+    response is not to be cached.
+    """
+    viewName = getattr(view, "__name__", None)
+    if viewName not in CACHED_VIEWS:
+        return None
+    buckets = _getRouteBuckets(viewName, args or ())
+    return _getCacheKey(page, request, viewName, args, kwargs, buckets)
+
+
+def getExportCacheKey(page, request, format):
+    """
+    The cache key for the response of exporting a page in this format, or
+    None if the response is not to be cached.
+    """
+    buckets = _EXPORT_BUCKETS.get(format)
+    return _getCacheKey(page, request, format, (), {}, buckets)
+
+
+def serveCalendarResponse(key, render):
+    """
+    Serve the response for this key from the cache, or render it.  Only one
+    request at a time renders the response, others are given the stale copy
+    of the response, or wait up to JOYOUS_CALENDAR_CACHE_WAIT seconds for it.
+    """
+    response = cache.get(key)
+    if response is not None:
+        return response
+    baseKey = key.rpartition(".")[0]
+    lockKey = baseKey + ".lock"
+    staleKey = baseKey + ".stale"
+    locked = cache.add(lockKey, True, _LOCK_TIMEOUT)
+    if not locked:
+        response = cache.get(staleKey)
+        if response is not None:
+            return response
+        wait = getattr(settings, "JOYOUS_CALENDAR_CACHE_WAIT", 2)
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(_POLL_INTERVAL)
+            response = cache.get(key)
+            if response is not None:
+                return response
+            locked = cache.add(lockKey, True, _LOCK_TIMEOUT)
+            if locked:
+                # whoever was rendering it gave up without caching it
+                break
+    try:
+        response = render()
+    except BaseException:
+        if locked:
+            cache.delete(lockKey)
+        raise
+    cacheCalendarResponse(key, response, staleKey, lockKey if locked else None)
+    return response
+
+
+def cacheCalendarResponse(key, response, staleKey=None, lockKey=None):
+    """
+    Keep a successful response in the cache until it is expired, or until
+    local midnight when what is today changes.  A stale copy that outlasts
+    expiry is also kept under staleKey, and the lockKey is released once the
+    response is rendered.
+    """
+    if (
+        response is None
+        or response.status_code != 200
+        or response.cookies
+        or response.streaming
+    ):
+        if lockKey:
+            cache.delete(lockKey)
+        return
+    untilMidnight = _getSecondsUntilMidnight()
+    timeout = getattr(settings, "JOYOUS_CALENDAR_CACHE_TIMEOUT", 3600)
+    if timeout is None or timeout > untilMidnight:
+        timeout = untilMidnight
+
+    def store(response):
+        cache.set(key, response, timeout)
+        if staleKey:
+            cache.set(staleKey, response, untilMidnight)
+        if lockKey:
+            cache.delete(lockKey)
+
+    if getattr(response, "is_rendered", True):
+        store(response)
+    else:
+        response.add_post_render_callback(store)
+
+
+def expireCalendarCache():
+    """
+    Throw away all of the cached calendar responses.
+    """
+    cache.set(_VERSION_KEY, time.time_ns(), None)
+
+
+def expireCalendarCacheFor(*pages, extraBuckets=()):
+    """
+    Throw away the cached calendar responses that these event or exception
+    pages could be shown in, and those in any extraBuckets.
+    """
+    buckets = set(extraBuckets)
+    for page in pages:
+        pageBuckets = getPageBuckets(page)
+        if pageBuckets is None:
+            expireCalendarCache()
+            return
+        buckets |= pageBuckets
+    if buckets:
+        version = time.time_ns()
+        cache.set_many(
+            {_BUCKET_KEY.format(bucket): version for bucket in buckets}, None
+        )
+
+
+def getPageBuckets(page):
+    """
+    The buckets of cached responses that this event or exception page could
+    be shown in, or None if we cannot tell.
+    """
+    today = timezone.localdate()
+    fromDate = today - _HORIZON
+    toDate = today + _HORIZON
+    try:
+        spans = _getPageSpans(page, fromDate, toDate)
+    except ObjectDoesNotExist:
+        # the event this is an exception for has gone
+        return None
+    if spans is None:
+        return None
+    buckets = {"export"}
+    for start, end in spans:
+        # allow for the event being shown in a different timezone
+        start -= _1day
+        if end is not None:
+            end += _1day
+        if end is None or end >= today - _1day:
+            buckets.add("upcoming")
+        if start <= today + _1day:
+            buckets.add("past")
+        if start < fromDate or end is None or end > toDate:
+            buckets.add("far")
+        first = max(start, fromDate)
+        last = min(end or toDate, toDate)
+        for ord in range(first.toordinal(), last.toordinal() + 1):
+            buckets.update(_getDateBuckets(dt.date.fromordinal(ord)))
+    return buckets
+
+
+# ------------------------------------------------------------------------------
+# Conditional GET
+# ------------------------------------------------------------------------------
+def getCalendarValidators(page, request, viewName):
+    """
+    The (ETag, Last-Modified) validators of the response to a calendar route
+    or export, worked out from the events without rendering it, or None if
+    conditional GET is not to be used.
+    """
+    if (
+        not conditionalGetEnabled()
+        or viewName not in CACHED_VIEWS + tuple(_EXPORT_BUCKETS)
+        or request.method not in ("GET", "HEAD")
+        or request.user.is_authenticated
+    ):
+        return None
+    getEventPages = getattr(page, "_getEventPages", None)
+    if getEventPages is not None:
+        pages = getEventPages(request)
+    elif isinstance(page, EVENT_TYPES + EXCEPTION_TYPES):
+        pages = Page.objects.descendant_of(page, inclusive=True)
+    else:
+        return None
+    events = (
+        pages.live()
+        .type(*EVENT_TYPES, *EXCEPTION_TYPES)
+        .aggregate(lastPublished=Max("last_published_at"), numPages=Count("id"))
+    )
+    restrictions = PageViewRestriction.objects.aggregate(
+        lastId=Max("id"), numRestrictions=Count("id")
+    )
+    today = timezone.localdate()
+    session = getattr(request, "session", {})
+    passed = session.get(PageViewRestriction.passed_view_restrictions_session_key, [])
+    parts = (
+        __version__,
+        page.pk,
+        page.last_published_at,
+        viewName,
+        sorted(events.items()),
+        sorted(restrictions.items()),
+        today,
+        sorted(passed),
+        request.headers.get("x-requested-with"),
+        timezone.get_current_timezone_name(),
+        translation.get_language(),
+    )
+    etag = '"{}"'.format(_getDigest(parts))
+    # what is shown changes at midnight too
+    midnight = timezone.make_aware(dt.datetime.combine(today, dt.time.min))
+    lastModified = max(
+        when
+        for when in (events["lastPublished"], page.last_published_at, midnight)
+        if when is not None
+    )
+    return (etag, lastModified)
+
+
+def serveConditionalResponse(request, validators, serve):
+    """
+    Answer with 304 Not Modified if the client already has the response with
+    these validators, otherwise serve it with them.
+    """
+    etag, lastModified = validators
+    timestamp = int(lastModified.timestamp())
+    response = get_conditional_response(request, etag, timestamp)
+    if response is None:
+        response = serve()
+        if response is not None and response.status_code == 200:
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(timestamp)
+    return response
+
+
+def _getPageSpans(page, fromDate, toDate):
+    # The (first, last or None) dates of each time the page could be shown in
+    # the calendar, from fromDate to toDate for recurring events
+    if isinstance(page, SimpleEventPage):
+        return [(page.date, page.date)]
+    if isinstance(page, MultidayEventPage):
+        return [(page.date_from, page.date_to)]
+    if isinstance(page, RecurringEventPage):
+        return _getRecurringSpans(page, fromDate, toDate)
+    if isinstance(page, PostponementPage):
+        return [
+            _getOccurrenceSpan(page.except_date, page.overrides.num_days),
+            _getOccurrenceSpan(page.date, page.num_days),
+        ]
+    if isinstance(page, DateExceptionBase):
+        return [_getOccurrenceSpan(page.except_date, page.overrides.num_days)]
+    if isinstance(page, ExtCancellationPage):
+        return [(page.cancelled_from_date, page.cancelled_to_date)]
+    if isinstance(page, EventExceptionBase):
+        return _getRecurringSpans(page.overrides, fromDate, toDate)
+    return None
+
+
+def _getRecurringSpans(page, fromDate, toDate):
+    repeat = page.repeat
+    numDays = page.num_days
+    spans = [
+        _getOccurrenceSpan(occurence, numDays)
+        for occurence in repeat.between(
+            fromDate - dt.timedelta(days=numDays), toDate, inc=True
+        )
+    ]
+    # the occurrences before and after are somewhere far away
+    if repeat.dtstart < fromDate:
+        spans.append((repeat.dtstart, repeat.dtstart))
+    if repeat.until is None or repeat.until > toDate:
+        spans.append((toDate + _1day, None))
+    return spans
+
+
+def _getOccurrenceSpan(date, numDays):
+    return (date, date + dt.timedelta(days=max(numDays, 1) - 1))
+
+
+def _getRouteBuckets(viewName, args):
+    # The buckets of the response from this route, or None if it is not cached
+    today = timezone.localdate()
+    try:
+        args = [int(arg) if str(arg).isdigit() else arg for arg in args]
+        if viewName == "routeDefault":
+            year = args[0] if args else today.year
+            thisYear, thisWeek, dow = gregorian_to_week_date(today)
+            return (
+                _getMonthBuckets(year, today.month)
+                | _getWeekBuckets(year, thisWeek)
+                | {"upcoming"}
+            )
+        if viewName == "routeByMonthAbbr":
+            year, monthAbbr = args
+            abbrs = [abbr.lower()[:3] for abbr in MONTH_ABBRS[1:]]
+            return _getMonthBuckets(year, abbrs.index(monthAbbr.lower()) + 1)
+        if viewName in ("serveMonth", "serveMiniMonth"):
+            year, month = args or (today.year, today.month)
+            return _getMonthBuckets(year, month)
+        if viewName == "serveWeek":
+            year, week = args or gregorian_to_week_date(today)[:2]
+            return _getWeekBuckets(year, week)
+        if viewName == "serveDay":
+            day = dt.date(*args) if args else today
+            return _getSpanBuckets(day, day, "day.{}".format(day))
+        if viewName == "serveUpcoming":
+            return {"upcoming"}
+        if viewName == "servePast":
+            return {"past"}
+    except (ValueError, TypeError, OverflowError):
+        pass
+    return None
+
+
+def _getMonthBuckets(year, month):
+    first = dt.date(year, month, 1)
+    last = dt.date(year, month, calendar.monthrange(year, month)[1])
+    return _getSpanBuckets(first, last, "month.{}.{}".format(year, month))
+
+
+def _getWeekBuckets(year, week):
+    first, last, prevYearNumWeeks, yearNumWeeks = week_info(year, week)
+    return _getSpanBuckets(first, last, "week.{}.{}".format(year, week))
+
+
+def _getSpanBuckets(first, last, bucket):
+    # The period's own bucket, and the far bucket if it goes over the horizon
+    today = timezone.localdate()
+    buckets = set()
+    if last >= today - _HORIZON and first <= today + _HORIZON:
+        buckets.add(bucket)
+    if first < today - _HORIZON or last > today + _HORIZON:
+        buckets.add("far")
+    return buckets
+
+
+def _getDateBuckets(date):
+    year, week, dow = gregorian_to_week_date(date)
+    return (
+        "month.{}.{}".format(date.year, date.month),
+        "week.{}.{}".format(year, week),
+        "day.{}".format(date),
+    )
+
+
+def _getVersions(buckets):
+    # The current versions of everything, and of these buckets
+    keys = [_VERSION_KEY] + sorted(_BUCKET_KEY.format(bucket) for bucket in buckets)
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # start from a version that has never been used before
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key, 0)
+    return [versions[key] for key in keys]
+
+
+def _getSecondsUntilMidnight():
+    now = timezone.localtime()
+    midnight = timezone.make_aware(dt.datetime.combine(now.date() + _1day, dt.time.min))
+    return int((midnight - now).total_seconds()) + 1
+
+
+def _getCacheKey(page, request, viewName, args, kwargs, buckets):
+    # The key is made of a part for what is asked for, and a part for the
+    # versions of the buckets it is in
+    if (
+        not calendarCacheEnabled()
+        or buckets is None
+        or request.method not in ("GET", "HEAD")
+        or request.user.is_authenticated
+    ):
+        return None
+    site = Site.find_for_request(request)
+    session = getattr(request, "session", {})
+    passed = session.get(PageViewRestriction.passed_view_restrictions_session_key, [])
+    parts = (
+        site.pk if site is not None else None,
+        request.get_host(),
+        request.scheme,
+        page.pk,
+        viewName,
+        tuple(args or ()),
+        sorted((kwargs or {}).items()),
+        sorted(request.GET.lists()),
+        sorted(passed),
+        request.headers.get("x-requested-with"),
+        timezone.get_current_timezone_name(),
+        translation.get_language(),
+    )
+    versions = _getVersions(buckets)
+    return "joyous.calendar.{}.{}".format(_getDigest(parts), _getDigest(versions))
+
+
+def _getDigest(value):
+    return hashlib.md5(repr(value).encode("utf-8")).hexdigest()
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
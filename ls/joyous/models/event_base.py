@@ -27,6 +27,7 @@ from wagtail.admin.panels import (
 )
 from wagtail.images import get_image_model_string
 from wagtail.search import index
+from ..holidays import Holidays
 from ..utils.telltime import getLocalDateAndTime
 from ..utils.telltime import getTimeFrom, getTimeTo
 from ..utils.telltime import timeFormat, dateFormat
@@ -49,6 +50,39 @@ def _filterContentPanels(panels, remove):
     return retval
 
 
+def indexedStartsEnabled():
+    """
+    Are upcoming and past events found using the stored start times?
+    """
+    return getattr(settings, "JOYOUS_INDEXED_STARTS", False)
+
+
+def _getFailedRestrictions(request):
+    """
+    The page view restrictions that this request does not pass.
+    """
+    PASSWORD = PageViewRestriction.PASSWORD
+    LOGIN = PageViewRestriction.LOGIN
+    GROUPS = PageViewRestriction.GROUPS
+    KEY = PageViewRestriction.passed_view_restrictions_session_key
+
+    restrictions = PageViewRestriction.objects.all()
+    passed = request.session.get(KEY, [])
+    if passed:
+        restrictions = restrictions.exclude(id__in=passed, restriction_type=PASSWORD)
+    if request.user.is_authenticated:
+        restrictions = restrictions.exclude(restriction_type=LOGIN)
+    if request.user.is_superuser:
+        restrictions = restrictions.exclude(restriction_type=GROUPS)
+    else:
+        membership = request.user.groups.all()
+        if membership:
+            restrictions = restrictions.exclude(
+                groups__in=membership, restriction_type=GROUPS
+            )
+    return restrictions
+
+
 # ------------------------------------------------------------------------------
 # Helper types and constants
 # ------------------------------------------------------------------------------
@@ -136,6 +170,9 @@ class EventsByDayList(list):
         self.fromOrd = fromDate.toordinal()
         self.toOrd = toDate.toordinal()
         days = [dt.date.fromordinal(ord) for ord in range(self.fromOrd, self.toOrd + 1)]
+        if isinstance(holidays, Holidays):
+            # look up the holidays for all the days at once
+            holidays = holidays.between(fromDate, toDate)
         super().__init__(EventsOnDay(day, holidays.get(day)) for day in days)
 
     def add(self, thisEvent, pageFromDate, pageToDate):
@@ -185,15 +222,20 @@ class EventManager(PageManager):
 
 
 class EventQuerySet(PageQuerySet):
+    # The date field that events are (nearly) ordered by their start with
+    startDateField = None
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.request = None
         self.postFilter = None
+        self.refreshStarts = False
 
     def _clone(self):
         qs = super()._clone()
         qs.request = self.request
         qs.postFilter = self.postFilter
+        qs.refreshStarts = self.refreshStarts
         return qs
 
     def _fetch_all(self):
@@ -201,16 +243,32 @@ class EventQuerySet(PageQuerySet):
         self._filterResults()
 
     def _fetchResults(self):
+        if self.refreshStarts and self._result_cache is None:
+            self._refreshStaleStarts()
         super()._fetch_all()
 
     def _filterResults(self):
         if self.postFilter:
             self._result_cache[:] = filter(self.postFilter, self._result_cache)
 
+    def iterator(self, *args, **kwargs):
+        if self.refreshStarts:
+            self._refreshStaleStarts()
+        results = self._prepareResults(super().iterator(*args, **kwargs))
+        if self.postFilter:
+            results = filter(self.postFilter, results)
+        return results
+
+    def _prepareResults(self, results):
+        # for subclasses to set up the results of iterator before filtering
+        return results
+
     def count(self):
         if self.postFilter and self._result_cache is None:
             # if we have a postFilter then force a call to _fetch_all
             self._fetch_all()
+        elif self.refreshStarts and self._result_cache is None:
+            self._refreshStaleStarts()
         return super().count()
 
     def upcoming(self):
@@ -225,15 +283,51 @@ class EventQuerySet(PageQuerySet):
         return qs
 
     def future(self):
+        if self._hasIndexedStarts():
+            qs = self.filter(next_start_utc__isnull=False)
+            qs = qs.order_by("next_start_utc", "id")
+            qs.refreshStarts = True
+            return qs
         qs = self._clone()
         qs.postFilter = self.__predicateBasedOn("_future_datetime_from")
         return qs
 
     def past(self):
+        if self._hasIndexedStarts():
+            qs = self.filter(last_start_utc__isnull=False)
+            qs = qs.order_by("-last_start_utc", "-id")
+            qs.refreshStarts = True
+            return qs
         qs = self._clone()
         qs.postFilter = self.__predicateBasedOn("_past_datetime_from")
         return qs
 
+    def _hasIndexedStarts(self):
+        return indexedStartsEnabled() and issubclass(self.model, EventBase)
+
+    def _refreshStaleStarts(self):
+        from .calendar import _CalendarHolidays
+
+        # The stored start times are good while last_start_utc < now <=
+        # next_start_utc, after that they need to be recalculated
+        now = timezone.now()
+        stale = self.model.events.filter(
+            Q(next_start_utc__lt=now)
+            | Q(last_start_utc__gte=now)
+            | Q(next_start_utc__isnull=True, last_start_utc__isnull=True)
+        )
+        holidays = getattr(self, "holidays", None)
+        if holidays is not None:
+            stale = stale.hols(holidays)
+        calendarHolidays = None
+        for page in stale:
+            if getattr(page, "holidays", ()) is None:
+                # look up the holidays of all the calendars just once
+                if calendarHolidays is None:
+                    calendarHolidays = _CalendarHolidays()
+                page.holidays = calendarHolidays(page)
+            page._refreshStarts()
+
     def __predicateBasedOn(self, attribute):
         def predicate(item):
             # If used after byDay [ e.g. qry.byDay(from, to).upcoming() ] then
@@ -260,29 +354,8 @@ class EventQuerySet(PageQuerySet):
         return qs
 
     def authorized_q(self, request):
-        PASSWORD = PageViewRestriction.PASSWORD
-        LOGIN = PageViewRestriction.LOGIN
-        GROUPS = PageViewRestriction.GROUPS
-        KEY = PageViewRestriction.passed_view_restrictions_session_key
-
-        restrictions = PageViewRestriction.objects.all()
-        passed = request.session.get(KEY, [])
-        if passed:
-            restrictions = restrictions.exclude(
-                id__in=passed, restriction_type=PASSWORD
-            )
-        if request.user.is_authenticated:
-            restrictions = restrictions.exclude(restriction_type=LOGIN)
-        if request.user.is_superuser:
-            restrictions = restrictions.exclude(restriction_type=GROUPS)
-        else:
-            membership = request.user.groups.all()
-            if membership:
-                restrictions = restrictions.exclude(
-                    groups__in=membership, restriction_type=GROUPS
-                )
         q = Q()
-        for restriction in restrictions:
+        for restriction in _getFailedRestrictions(request):
             q &= ~self.descendant_of_q(restriction.page, inclusive=True)
         return q
 
@@ -353,6 +426,15 @@ class EventBase(models.Model):
     location = models.CharField(_("location"), max_length=255, blank=True)
     website = models.URLField(_("website"), blank=True)
 
+    # The start of the next and the previous occurrence, as calculated by
+    # _refreshStarts, so that upcoming and past events can be found by SQL
+    next_start_utc = models.DateTimeField(
+        null=True, blank=True, editable=False, db_index=True
+    )
+    last_start_utc = models.DateTimeField(
+        null=True, blank=True, editable=False, db_index=True
+    )
+
     # Init these variables to prevent template DEBUG messages
     # Yes, this is very ugly.  An alternative solution would be welcome.
     cancellation_details = None
@@ -472,6 +554,21 @@ class EventBase(models.Model):
                 remove.extend(arg)
         cls.content_panels = _filterContentPanels(cls.content_panels, remove)
 
+    def _refreshStarts(self):
+        """
+        Recalculate and store the start of the next and previous occurrences.
+        """
+        if getattr(self, "holidays", ()) is None:
+            # closed for holidays needs some holidays, use the calendar's
+            from .calendar import _getHolidaysFor
+
+            self.holidays = _getHolidaysFor(self)
+        self.next_start_utc = self._future_datetime_from
+        self.last_start_utc = self._past_datetime_from
+        type(self).objects.filter(pk=self.pk).update(
+            next_start_utc=self.next_start_utc, last_start_utc=self.last_start_utc
+        )
+
     def isAuthorized(self, request):
         """
         Is the user authorized for the requested action with this event?
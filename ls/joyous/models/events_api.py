@@ -3,9 +3,9 @@
 # ------------------------------------------------------------------------------
 import datetime as dt
 import calendar
-from contextlib import suppress
+from collections import defaultdict
 from functools import partial
-from itertools import chain, groupby
+from itertools import chain, dropwhile, groupby
 from operator import attrgetter
 from django.conf import settings
 from django.core.exceptions import (
@@ -13,8 +13,12 @@ from django.core.exceptions import (
     ObjectDoesNotExist,
     PermissionDenied,
 )
+from django.db.models import IntegerField, Q, Value
+from django.utils import timezone
+from ..utils.lazy import mergeSorted, sortNearlySorted
+from ..utils.telltime import getLocalDatetime
 from ..utils.weeks import week_of_month
-from .event_base import EventsOnDay
+from .event_base import EventsOnDay, EventBase, indexedStartsEnabled
 from .one_off_events import SimpleEventPage, MultidayEventPage
 from .recurring_events import (
     RecurringEventPage,
@@ -25,7 +29,28 @@ from .recurring_events import (
     CancellationPage,
     ClosedForHolidaysPage,
     ExtCancellationPage,
+    _ViewRestrictionChecker,
 )
+from .occurrences import (
+    occurrencesEnabled,
+    isWithinWindow,
+    getOccurrencesByDay,
+    getUpcomingOccurrences,
+    getPastOccurrences,
+)
+
+
+# ------------------------------------------------------------------------------
+# Helper types and constants
+# ------------------------------------------------------------------------------
+# The models that have iCal uids
+_UID_MODELS = (SimpleEventPage, MultidayEventPage, RecurringEventPage)
+
+# Keep within the limit of 999 query parameters of older SQLite
+_UID_BATCH_SIZE = 999 // len(_UID_MODELS)
+
+# How many events iterAllEvents fetches from the database at a time
+_ITER_CHUNK_SIZE = 500
 
 
 # ------------------------------------------------------------------------------
@@ -43,6 +68,11 @@ def getAllEventsByDay(request, fromDate, toDate, *, home=None, holidays=None):
     :param holidays: the holidays that are celebrated for these dates
     :rtype: list of :class:`EventsOnDay <ls.joyous.models.events.EventsOnDay>` objects
     """
+    if isWithinWindow(fromDate, toDate):
+        evods = getOccurrencesByDay(
+            request, fromDate, toDate, home=home, holidays=holidays
+        )
+        return _getEventsByDay(fromDate, [evods], holidays)
     qrys = [
         SimpleEventPage.events(request).byDay(fromDate, toDate),
         MultidayEventPage.events(request).byDay(fromDate, toDate),
@@ -76,15 +106,21 @@ def getAllEventsByWeek(request, year, month, *, home=None, holidays=None):
     )
 
 
-def getAllUpcomingEvents(request, *, home=None, holidays=None):
+def getAllUpcomingEvents(request, *, home=None, holidays=None, after=None):
     """
-    Return all the upcoming events (under home if given).
+    Return all the upcoming events (under home if given).  The events are
+    only fetched as they are needed.
 
     :param request: Django request object
     :param home: only include events that are under this page (if given)
     :param holidays: holidays that may affect these events
-    :rtype: list of ThisEvents
+    :param after: only include events that come after this (start, page id)
+    :rtype: :class:`LazyList <ls.joyous.utils.lazy.LazyList>` of ThisEvents
     """
+    if occurrencesEnabled():
+        return getUpcomingOccurrences(
+            request, home=home, holidays=holidays, after=after
+        )
     qrys = [
         SimpleEventPage.events(request).upcoming().this(),
         MultidayEventPage.events(request).upcoming().this(),
@@ -106,7 +142,7 @@ def getAllUpcomingEvents(request, *, home=None, holidays=None):
     ]
     if home is not None:
         qrys = [qry.descendant_of(home) for qry in qrys]
-    events = sorted(chain.from_iterable(qrys), key=_getUpcomingSort())
+    events = _mergeEvents(qrys, _getUpcomingSort(), cursor=after)
     return events
 
 
@@ -212,15 +248,19 @@ def getGroupUpcomingEvents(request, group, holidays=None):
     return events
 
 
-def getAllPastEvents(request, *, home=None, holidays=None):
+def getAllPastEvents(request, *, home=None, holidays=None, before=None):
     """
-    Return all the past events (under home if given).
+    Return all the past events (under home if given).  The events are only
+    fetched as they are needed.
 
     :param request: Django request object
     :param home: only include events that are under this page (if given)
     :param holidays: holidays that may affect these events
-    :rtype: list of the ThisEvents
+    :param before: only include events that come before this (start, page id)
+    :rtype: :class:`LazyList <ls.joyous.utils.lazy.LazyList>` of ThisEvents
     """
+    if occurrencesEnabled():
+        return getPastOccurrences(request, home=home, holidays=holidays, before=before)
     qrys = [
         SimpleEventPage.events(request).past().this(),
         MultidayEventPage.events(request).past().this(),
@@ -239,11 +279,7 @@ def getAllPastEvents(request, *, home=None, holidays=None):
     ]
     if home is not None:
         qrys = [qry.descendant_of(home) for qry in qrys]
-    events = sorted(
-        chain.from_iterable(qrys),
-        key=attrgetter("page._past_datetime_from"),
-        reverse=True,
-    )
+    events = _mergeEvents(qrys, _getPastSort(), reverse=True, cursor=before)
     return events
 
 
@@ -257,26 +293,57 @@ def getEventFromUid(request, uid):
     :param uid: iCal unique identifier
     :rtype: event page
     """
-    events = []
-    with suppress(ObjectDoesNotExist):
-        events.append(SimpleEventPage.objects.get(uid=uid))
-    with suppress(ObjectDoesNotExist):
-        events.append(MultidayEventPage.objects.get(uid=uid))
-    with suppress(ObjectDoesNotExist):
-        events.append(RecurringEventPage.objects.get(uid=uid))
     # Exceptions do not have uids and are not returned by this function
-
-    if len(events) == 1:
-        if events[0].isAuthorized(request):
-            return events[0]
+    found = list(_getUidIndex([uid]))
+    if len(found) == 1:
+        _, pageId, kind = found[0]
+        event = _UID_MODELS[kind].objects.get(id=pageId)
+        if event.isAuthorized(request):
+            return event
         else:
             raise PermissionDenied("No authority for uid={}".format(uid))
-    elif len(events) == 0:
+    elif len(found) == 0:
         raise ObjectDoesNotExist("No event with uid={}".format(uid))
     else:
         raise MultipleObjectsReturned("Multiple events with uid={}".format(uid))
 
 
+def getEventsFromUids(request, uids):
+    """
+    Get the events for many UIDs at once.
+
+    :param request: Django request object
+    :param uids: iCal unique identifiers
+    :returns: a dict of each uid that was found to its event page, or to None
+      if we have no authority for the event or there are multiple events with
+      that uid.
+    :rtype: dict
+    """
+    found = defaultdict(list)
+    for uid, pageId, kind in _getUidIndex(uids):
+        found[uid].append((pageId, kind))
+    idsByKind = defaultdict(list)
+    for locations in found.values():
+        if len(locations) == 1:
+            pageId, kind = locations[0]
+            idsByKind[kind].append(pageId)
+    pages = {}
+    for kind, ids in idsByKind.items():
+        pages.update(_UID_MODELS[kind].objects.in_bulk(ids))
+
+    isAuthorized = _ViewRestrictionChecker(request)
+    events = {}
+    for uid, locations in found.items():
+        event = None
+        if len(locations) == 1:
+            pageId, kind = locations[0]
+            event = pages.get(pageId)
+            if event is not None and not isAuthorized(event):
+                event = None
+        events[uid] = event
+    return events
+
+
 def getAllEvents(request, *, home=None, holidays=None):
     """
     Return all the events (under home if given).
@@ -298,6 +365,29 @@ def getAllEvents(request, *, home=None, holidays=None):
     return events
 
 
+def iterAllEvents(request, *, home=None, holidays=None):
+    """
+    Iterate through all the events (under home if given), fetching them from
+    the database in chunks rather than all at once.  Unlike
+    :func:`getAllEvents` the events are not sorted.
+
+    :param request: Django request object
+    :param home: only include events that are under this page (if given)
+    :param holidays: holidays that may affect these events
+    :rtype: iterator of event pages
+    """
+    qrys = [
+        SimpleEventPage.events(request).all(),
+        MultidayEventPage.events(request).all(),
+        RecurringEventPage.events(request, holidays).all(),
+    ]
+    # Does not return exceptions
+    if home is not None:
+        qrys = [qry.descendant_of(home) for qry in qrys]
+    for qry in qrys:
+        yield from qry.order_by("path").iterator(chunk_size=_ITER_CHUNK_SIZE)
+
+
 # ------------------------------------------------------------------------------
 # API UI functions
 # ------------------------------------------------------------------------------
@@ -374,10 +464,127 @@ def _getEventsByWeek(year, month, eventsByDaySrc):
 def _getUpcomingSort():
     if getattr(settings, "JOYOUS_UPCOMING_INCLUDES_STARTED", False):
         return attrgetter("page._current_datetime_from")
+    elif indexedStartsEnabled():
+        return _getStoredSort("next_start_utc", "_future_datetime_from")
     else:
         return attrgetter("page._future_datetime_from")
 
 
+def _getPastSort():
+    if indexedStartsEnabled():
+        return _getStoredSort("last_start_utc", "_past_datetime_from")
+    else:
+        return attrgetter("page._past_datetime_from")
+
+
+def _mergeEvents(qrys, key, reverse=False, cursor=None):
+    # Each query gives its events in order, and those are merged as needed
+    sortKey = _withPageId(key)
+    srcs = [_getEventsInOrder(qry, sortKey, reverse, cursor) for qry in qrys]
+    return mergeSorted(srcs, sortKey, reverse)
+
+
+def _getEventsInOrder(qry, key, reverse, cursor):
+    if cursor is not None:
+        qry = _seekCursor(qry, cursor, reverse)
+    events = _getOrdered(qry, key, reverse)
+    if cursor is not None:
+        if reverse:
+            events = dropwhile(lambda thisEvent: key(thisEvent) >= cursor, events)
+        else:
+            events = dropwhile(lambda thisEvent: key(thisEvent) <= cursor, events)
+    return events
+
+
+def _getOrdered(qry, key, reverse):
+    if qry.refreshStarts:
+        # Already ordered by the stored start times
+        return qry.iterator()
+    field = qry.startDateField
+    if field is None:
+        # Starts are only known once calculated
+        return iter(sorted(qry, key=key, reverse=reverse))
+    # The start date in the event's timezone can be up to 2 days away from
+    # the start date in the local timezone
+    if reverse:
+        qry = qry.order_by("-" + field)
+        limitTime, limitDays = dt.time.max, 2
+    else:
+        qry = qry.order_by(field)
+        limitTime, limitDays = dt.time.min, -2
+
+    def bound(thisEvent):
+        limitDate = getattr(thisEvent.page, field) + dt.timedelta(days=limitDays)
+        return (getLocalDatetime(limitDate, limitTime), 0)
+
+    return sortNearlySorted(qry.iterator(), key, bound, reverse)
+
+
+def _seekCursor(qry, cursor, reverse):
+    # Leave out what is certainly on the wrong side of the cursor
+    when, pageId = cursor
+    if qry.refreshStarts:
+        if reverse:
+            return qry.filter(
+                Q(last_start_utc__lt=when) | Q(last_start_utc=when, id__lt=pageId)
+            )
+        else:
+            return qry.filter(
+                Q(next_start_utc__gt=when) | Q(next_start_utc=when, id__gt=pageId)
+            )
+    field = qry.startDateField
+    if field is None:
+        return qry
+    myDate = timezone.localtime(when).date()
+    if reverse:
+        return qry.filter(**{field + "__lte": myDate + dt.timedelta(days=2)})
+    else:
+        return qry.filter(**{field + "__gte": myDate - dt.timedelta(days=2)})
+
+
+def _getUidIndex(uids):
+    # Look up the uids in all the event tables at once, a batch at a time
+    uids = list(set(uids))
+    for start in range(0, len(uids), _UID_BATCH_SIZE):
+        batch = uids[start:start + _UID_BATCH_SIZE]
+        qrys = [
+            model.objects.filter(uid__in=batch)
+            .annotate(kind=Value(kind, output_field=IntegerField()))
+            .values_list("uid", "id", "kind")
+            .order_by()
+            for kind, model in enumerate(_UID_MODELS)
+        ]
+        yield from qrys[0].union(*qrys[1:], all=True)
+
+
+def _withPageId(key):
+    # The page id breaks ties between events that start at the same time
+    def sortKey(thisEvent):
+        return (key(thisEvent), thisEvent.page.id)
+
+    return sortKey
+
+
+def _getUpcomingCursor(thisEvent):
+    return _withPageId(_getUpcomingSort())(thisEvent)
+
+
+def _getPastCursor(thisEvent):
+    return _withPageId(_getPastSort())(thisEvent)
+
+
+def _getStoredSort(stored, attribute):
+    # Use the stored start times of events, and calculate those of exceptions
+    def key(thisEvent):
+        page = thisEvent.page
+        if isinstance(page, EventBase):
+            return getattr(page, stored)
+        else:
+            return getattr(page, attribute)
+
+    return key
+
+
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
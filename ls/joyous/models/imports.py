@@ -0,0 +1,344 @@
+# ------------------------------------------------------------------------------
+# Joyous background import jobs
+# ------------------------------------------------------------------------------
+import datetime as dt
+import inspect
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection, models, transaction
+from django.db.models import Q
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from wagtail.admin.panels import HelpPanel
+from wagtail.models import Page, Site
+
+logger = logging.getLogger(__name__)
+
+# How often the progress of a running job is saved, in seconds
+_PROGRESS_INTERVAL = 1
+# How many of the latest jobs are shown on the calendar's settings tab
+_NUM_JOBS_SHOWN = 5
+# How long a running job may go without saving its progress before it is
+# taken to have been abandoned
+_DEFAULT_IMPORT_TIMEOUT = 60 * 60
+
+_executor = None
+_executorLock = Lock()
+
+
+def importJobsEnabled():
+    """
+    Are uploaded calendars imported in the background?
+    """
+    return getattr(settings, "JOYOUS_IMPORT_JOBS", False)
+
+
+def _getImportTimeout():
+    return getattr(settings, "JOYOUS_IMPORT_TIMEOUT", _DEFAULT_IMPORT_TIMEOUT)
+
+
+# ------------------------------------------------------------------------------
+# Import job model
+# ------------------------------------------------------------------------------
+class ImportJob(models.Model):
+    """
+    An uploaded calendar file that is waiting to be, or has been, imported.
+    """
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = _("import job")
+        verbose_name_plural = _("import jobs")
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, _("Queued")),
+        (RUNNING, _("Running")),
+        (DONE, _("Done")),
+        (FAILED, _("Failed")),
+    ]
+
+    calendar = models.ForeignKey(
+        Page, related_name="+", verbose_name=_("calendar"), on_delete=models.CASCADE
+    )
+    site = models.ForeignKey(
+        Site,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name=_("site"),
+        on_delete=models.SET_NULL,
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name=_("user"),
+        on_delete=models.SET_NULL,
+    )
+    upload = models.FileField(_("upload"), upload_to="joyous/imports/", blank=True)
+    filename = models.CharField(_("file name"), max_length=255, blank=True)
+    utc2local = models.BooleanField(_("convert UTC to localtime"), default=False)
+    publish = models.BooleanField(_("publish"), default=False)
+    submit = models.BooleanField(_("submit for moderation"), default=False)
+    status = models.CharField(
+        _("status"), max_length=10, choices=STATUS_CHOICES, default=QUEUED
+    )
+    success = models.PositiveIntegerField(_("loaded"), default=0)
+    fail = models.PositiveIntegerField(_("not loaded"), default=0)
+    error = models.PositiveIntegerField(_("not parsed"), default=0)
+    # the messages the import would have shown, as [tag, message] pairs
+    messages = models.JSONField(_("messages"), default=list, blank=True)
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    started_at = models.DateTimeField(_("started at"), null=True, blank=True)
+    # when the running job last saved its progress
+    heartbeat_at = models.DateTimeField(_("heartbeat at"), null=True, blank=True)
+    finished_at = models.DateTimeField(_("finished at"), null=True, blank=True)
+
+    def __str__(self):
+        return "{} {}".format(self.filename, self.get_status_display())
+
+    def _makeRequest(self):
+        # The parts of the uploader's request that the import looks at
+        request = HttpRequest()
+        request.user = self.user or AnonymousUser()
+        request.session = {}
+        request._messages = _JobMessages(self)
+        request.POST = QueryDict(mutable=True)
+        if self.publish:
+            request.POST["action-publish"] = "action-publish"
+        if self.submit:
+            request.POST["action-submit"] = "action-submit"
+        request._wagtail_site = self.site
+        return request
+
+    def _addProgress(self, results):
+        # Count the results of another part of the import, saving them now
+        # and then so they can be watched
+        self.success += results.success
+        self.fail += results.fail
+        self.error += results.error
+        now = time.monotonic()
+        if now - getattr(self, "_progressSaved", 0) >= _PROGRESS_INTERVAL:
+            self._progressSaved = now
+            self.heartbeat_at = timezone.now()
+            self.save(
+                update_fields=["success", "fail", "error", "messages", "heartbeat_at"]
+            )
+
+
+class _JobMessages:
+    """Keeps the messages of an import with its job"""
+
+    def __init__(self, job):
+        self.job = job
+
+    def add(self, level, message, extra_tags=""):
+        tag = messages.DEFAULT_TAGS.get(level, "")
+        self.job.messages.append([tag, str(message)])
+
+
+# ------------------------------------------------------------------------------
+# Queueing and running the jobs
+# ------------------------------------------------------------------------------
+def queueImport(page, request, upload, *, utc2local=False):
+    """
+    Store an uploaded calendar file as a job to be imported into this page.
+    It is run by a thread of this process once the request's transaction is
+    committed, or by ``manage.py joyous_run_imports`` if
+    JOYOUS_IMPORT_THREADS is 0.
+
+    :param page: the CalendarPage to import the events into
+    :param request: the request the file was uploaded with
+    :param upload: the uploaded .ics or .zip file
+    :param utc2local: convert UTC times to the local time zone?
+    :returns: the ImportJob
+    """
+    filename = getattr(upload, "name", "") or ""
+    job = ImportJob(
+        calendar=page,
+        site=Site.find_for_request(request),
+        user=request.user if request.user.is_authenticated else None,
+        filename=filename[-255:],
+        utc2local=bool(utc2local),
+        publish=bool(request.POST.get("action-publish")),
+        submit=bool(request.POST.get("action-submit")),
+    )
+    job.upload.save(filename or "upload.ics", upload, save=False)
+    job.save()
+    messages.info(
+        request, _("{} has been queued for import").format(filename or _("The file"))
+    )
+    if getattr(settings, "JOYOUS_IMPORT_THREADS", 1) > 0:
+        transaction.on_commit(partial(_submitImport, job.pk))
+    return job
+
+
+def runImportJob(job):
+    """
+    Run a queued import job, unless some other worker has already started it.
+    A running job that has not saved its progress for longer than
+    JOYOUS_IMPORT_TIMEOUT is taken to have been abandoned, e.g. by a worker
+    that was killed, and is run again.
+
+    :param job: the ImportJob
+    :returns: True if the job was run here
+    """
+    now = timezone.now()
+    claimed = (
+        ImportJob.objects.filter(pk=job.pk)
+        .filter(_isRunnable(now))
+        .update(
+            status=ImportJob.RUNNING,
+            started_at=now,
+            heartbeat_at=now,
+            success=0,
+            fail=0,
+            error=0,
+            messages=[],
+        )
+    )
+    if not claimed:
+        return False
+    job.refresh_from_db()
+    request = job._makeRequest()
+    handler = _getImportHandler()
+    try:
+        with job.upload.open("rb") as upload:
+            results = handler.load(
+                job.calendar.specific,
+                request,
+                upload,
+                **_getLoadOptions(handler, job),
+            )
+    except Exception:
+        logger.exception("Import of %s failed", job.filename)
+        job.status = ImportJob.FAILED
+        job.messages.append(["error", str(_("The import failed"))])
+    else:
+        job.status = ImportJob.DONE
+        if results is not None:
+            job.success = results.success
+            job.fail = results.fail
+            job.error = results.error
+        # the events are all in now, so the file is no longer needed
+        job.upload.delete(save=False)
+    job.finished_at = timezone.now()
+    job.save()
+    return True
+
+
+def runQueuedImports():
+    """
+    Run all the queued, and abandoned, import jobs, oldest first.
+
+    :returns: the number of jobs run
+    """
+    count = 0
+    jobs = ImportJob.objects.filter(_isRunnable(timezone.now()))
+    for job in jobs.order_by("created_at"):
+        if runImportJob(job):
+            count += 1
+    return count
+
+
+def _isRunnable(now):
+    # Queued jobs, and those that have gone too long without saving their
+    # progress to still be running
+    timeout = dt.timedelta(seconds=_getImportTimeout())
+    return Q(status=ImportJob.QUEUED) | Q(
+        status=ImportJob.RUNNING, heartbeat_at__lt=now - timeout
+    )
+
+
+def _submitImport(jobId):
+    global _executor
+    with _executorLock:
+        if _executor is None:
+            numThreads = getattr(settings, "JOYOUS_IMPORT_THREADS", 1)
+            _executor = ThreadPoolExecutor(
+                max_workers=numThreads, thread_name_prefix="joyous-import"
+            )
+    _executor.submit(_runImportInThread, jobId)
+
+
+def _runImportInThread(jobId):
+    # Nothing waits on the future, so exceptions must be logged here
+    try:
+        job = ImportJob.objects.filter(pk=jobId).first()
+        if job is not None:
+            runImportJob(job)
+        # pick up any jobs left behind by a worker process that has gone
+        runQueuedImports()
+    except Exception:
+        logger.exception("Import job %s failed", jobId)
+    finally:
+        # threads get their own database connection, which we must close
+        connection.close()
+
+
+def _getImportHandler():
+    # The handler registered for the calendar page form, which the worker
+    # command may not have had registered
+    from ..formats import ICalHandler
+    from .calendar import CalendarPageForm
+
+    return CalendarPageForm.importHandler or ICalHandler()
+
+
+def _getLoadOptions(handler, job):
+    # The keyword arguments for the handler's load.  An ICalHandler saves the
+    # pages in bulk, as saving them one by one patches DateTimeField for all
+    # the threads of the process.  Other handlers are only given the progress
+    # callback if their load takes it.
+    from ..formats import ICalHandler
+
+    options = {"utc2local": job.utc2local}
+    if isinstance(handler, ICalHandler):
+        options["bulk"] = True
+        options["progress"] = job._addProgress
+    elif "progress" in inspect.signature(handler.load).parameters:
+        options["progress"] = job._addProgress
+    return options
+
+
+# ------------------------------------------------------------------------------
+# Import job panel
+# ------------------------------------------------------------------------------
+class ImportJobsPanel(HelpPanel):
+    """
+    Shows the progress of the latest import jobs of a calendar.
+    """
+
+    def __init__(
+        self, template="joyous/edit_handlers/import_jobs_panel.html", **kwargs
+    ):
+        super().__init__(template=template, **kwargs)
+
+    class BoundPanel(HelpPanel.BoundPanel):
+        def is_shown(self):
+            page = self.instance
+            return importJobsEnabled() and page is not None and page.pk is not None
+
+        def get_context_data(self, parent_context=None):
+            context = super().get_context_data(parent_context)
+            jobs = ImportJob.objects.filter(calendar_id=self.instance.pk)
+            context["jobs"] = jobs[:_NUM_JOBS_SHOWN]
+            return context
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
@@ -0,0 +1,453 @@
+# ------------------------------------------------------------------------------
+# Joyous materialized occurrences
+# ------------------------------------------------------------------------------
+import datetime as dt
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from wagtail.models import Page
+from ..utils.telltime import getAwareDatetime
+from .event_base import ThisEvent, EventsByDayList, _getFailedRestrictions
+from .one_off_events import SimpleEventPage, MultidayEventPage
+from .recurring_events import (
+    RecurringEventPage,
+    EventExceptionBase,
+    PostponementPage,
+    ExtraInfoPage,
+    CancellationPage,
+    ClosedForHolidaysPage,
+    ExtCancellationPage,
+    _ViewRestrictionChecker,
+)
+
+# ------------------------------------------------------------------------------
+# Helper types and constants
+# ------------------------------------------------------------------------------
+_1day = dt.timedelta(days=1)
+_2days = dt.timedelta(days=2)
+# How stale the window can get before we stop trusting it
+_WINDOW_SLACK = dt.timedelta(days=7)
+
+EVENT_TYPES = (SimpleEventPage, MultidayEventPage, RecurringEventPage, PostponementPage)
+EXCEPTION_TYPES = (EventExceptionBase,)
+
+
+def occurrencesEnabled():
+    """
+    Are the events API queries answered from the occurrences table?
+    """
+    return getattr(settings, "JOYOUS_OCCURRENCES", False)
+
+
+def getOccurrenceWindow(today=None):
+    """
+    The range of dates that are materialized in the occurrences table.
+    """
+    if today is None:
+        today = timezone.localdate()
+    pastDays, futureDays = getattr(settings, "JOYOUS_OCCURRENCES_WINDOW", (365, 730))
+    return (today - dt.timedelta(days=pastDays), today + dt.timedelta(days=futureDays))
+
+
+def isWithinWindow(fromDate, toDate):
+    """
+    Can the occurrences table answer queries for these dates?
+    """
+    if not occurrencesEnabled():
+        return False
+    windowFrom, windowTo = getOccurrenceWindow()
+    return windowFrom + _WINDOW_SLACK <= fromDate and toDate <= windowTo - _WINDOW_SLACK
+
+
+# ------------------------------------------------------------------------------
+# Occurrence model
+# ------------------------------------------------------------------------------
+class EventOccurrenceQuerySet(models.QuerySet):
+    def auth(self, request):
+        if request is None:
+            return self
+        q = Q()
+        for restriction in _getFailedRestrictions(request):
+            q &= ~Q(path__startswith=restriction.page.path)
+        return self.filter(q)
+
+    def under(self, home):
+        if home is None:
+            return self
+        return self.filter(path__startswith=home.path)
+
+    def between(self, fromDate, toDate):
+        tz = timezone.get_current_timezone()
+        fromDt = getAwareDatetime(fromDate - _2days, None, tz, dt.time.min)
+        toDt = getAwareDatetime(toDate + _2days, None, tz, dt.time.max)
+        return self.filter(start__lte=toDt, finish__gte=fromDt)
+
+
+class EventOccurrence(models.Model):
+    """
+    One occurrence of an event, as materialized by :func:`refreshOccurrences`.
+    """
+
+    class Meta:
+        ordering = ["start"]
+        verbose_name = _("event occurrence")
+        verbose_name_plural = _("event occurrences")
+        indexes = [
+            models.Index(fields=["start", "finish"]),
+            models.Index(fields=["finish"]),
+            models.Index(fields=["event", "start"]),
+        ]
+
+    objects = EventOccurrenceQuerySet.as_manager()
+
+    event = models.ForeignKey(
+        Page, related_name="+", verbose_name=_("event"), on_delete=models.CASCADE
+    )
+    exception = models.ForeignKey(
+        Page,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name=_("exception"),
+        on_delete=models.CASCADE,
+    )
+    cancelled = models.BooleanField(_("cancelled"), default=False)
+    start = models.DateTimeField(_("start"))
+    finish = models.DateTimeField(_("finish"))
+    # the path of the event, used for authorization and finding events by home
+    path = models.CharField(_("path"), max_length=255, db_index=True)
+
+    def __str__(self):
+        return "{} {}".format(self.event_id, self.start)
+
+
+# ------------------------------------------------------------------------------
+# Refreshing the occurrences
+# ------------------------------------------------------------------------------
+def refreshOccurrences(page, *, holidays=None, window=None):
+    """
+    Rematerialize the occurrences of this event page.
+
+    :param page: a SimpleEventPage, MultidayEventPage, RecurringEventPage or
+                 PostponementPage
+    :param holidays: the holidays that ClosedForHolidaysPages are closed for,
+                     by default those of the calendar the event is in
+    :param window: the range of dates to materialize
+    """
+    if window is None:
+        window = getOccurrenceWindow()
+    occurrences = []
+    if page.live:
+        if isinstance(page, RecurringEventPage):
+            if holidays is None:
+                from .calendar import _getHolidaysFor
+
+                holidays = _getHolidaysFor(page)
+            page.holidays = holidays
+            occurrences = _getRecurringOccurrences(page, holidays, window)
+        elif isinstance(page, PostponementPage):
+            daysDelta = dt.timedelta(days=page.num_days - 1)
+            occurrences = [_makeOccurrence(page, page.date, page.date + daysDelta)]
+        elif isinstance(page, SimpleEventPage):
+            occurrences = [_makeOccurrence(page, page.date, page.date)]
+        elif isinstance(page, MultidayEventPage):
+            occurrences = [_makeOccurrence(page, page.date_from, page.date_to)]
+    with transaction.atomic():
+        EventOccurrence.objects.filter(event_id=page.id).delete()
+        EventOccurrence.objects.bulk_create(occurrences)
+    return occurrences
+
+
+def refreshAllOccurrences(*, holidays=None, window=None):
+    """
+    Rematerialize the occurrences of every event, rolling the window forward.
+    """
+    from .calendar import _CalendarHolidays
+
+    if window is None:
+        window = getOccurrenceWindow()
+    calendarHolidays = _CalendarHolidays()
+    count = 0
+    eventIds = set()
+    for model in EVENT_TYPES:
+        for page in model.objects.live():
+            eventIds.add(page.id)
+            pageHolidays = calendarHolidays(page) if holidays is None else holidays
+            count += len(refreshOccurrences(page, holidays=pageHolidays, window=window))
+    EventOccurrence.objects.exclude(event_id__in=eventIds).delete()
+    return count
+
+
+def refreshOccurrencesUnder(page, *, holidays=None):
+    """
+    Rematerialize the occurrences of every event at or below this page.
+    """
+    from .calendar import _CalendarHolidays
+
+    calendarHolidays = _CalendarHolidays()
+    for model in EVENT_TYPES:
+        for event in model.objects.descendant_of(page, inclusive=True):
+            eventHolidays = calendarHolidays(event) if holidays is None else holidays
+            refreshOccurrences(event, holidays=eventHolidays)
+
+
+def refreshOccurrencesFor(page, *, holidays=None):
+    """
+    Rematerialize the occurrences affected by a change to this page.
+    """
+    page = page.specific
+    if isinstance(page, EVENT_TYPES):
+        refreshOccurrences(page, holidays=holidays)
+    if isinstance(page, EXCEPTION_TYPES):
+        refreshOccurrencesAt(page.path[: -Page.steplen], holidays=holidays)
+
+
+def refreshOccurrencesAt(path, *, holidays=None):
+    """
+    Rematerialize the occurrences of the recurring event at this path, if
+    there still is one.
+    """
+    page = RecurringEventPage.objects.filter(path=path).first()
+    if page is not None:
+        refreshOccurrences(page, holidays=holidays)
+
+
+def _makeOccurrence(page, fromDate, toDate, exception=None):
+    cancelled = exception is not None and not isinstance(exception, ExtraInfoPage)
+    return EventOccurrence(
+        event_id=page.id,
+        exception_id=getattr(exception, "id", None),
+        cancelled=cancelled,
+        start=getAwareDatetime(fromDate, page.time_from, page.tz),
+        finish=getAwareDatetime(toDate, page.time_to, page.tz),
+        path=page.path,
+    )
+
+
+def _getRecurringOccurrences(page, holidays, window):
+    windowFrom, windowTo = window
+    exceptions = {}
+    for extraInfo in ExtraInfoPage.events.child_of(page):
+        exceptions[extraInfo.except_date] = extraInfo
+    for cancellation in CancellationPage.events.child_of(page):
+        exceptions[cancellation.except_date] = cancellation
+    shutdowns = list(ExtCancellationPage.events.child_of(page))
+    closedHols = ClosedForHolidaysPage.events.hols(holidays).child_of(page).first()
+
+    def getException(myDate):
+        # same precedence as RecurringEventQuerySet.byDay
+        exception = exceptions.get(myDate)
+        for shutdown in shutdowns:
+            if shutdown._closedOn(myDate):
+                exception = shutdown
+        if exception is None and closedHols and closedHols._closedOn(myDate):
+            exception = closedHols
+        return exception
+
+    def getAnchors(occurrences, pending):
+        # The nearest occurrence outside of the window for the event and each
+        # of its extended exceptions, so that upcoming and past are complete
+        for n, occurence in enumerate(occurrences):
+            if not pending or n > page.MAX_REPEAT_COUNT:
+                break
+            exception = getException(occurence)
+            # like _future_datetime_from, extra info dates are excluded
+            key = exception.id if exception is not None else page.id
+            if key in pending:
+                pending.discard(key)
+                yield occurence
+
+    repeat = page.repeat
+    myDates = set(repeat.between(windowFrom, windowTo, inc=True))
+    for exceptDate in exceptions:
+        if exceptDate not in myDates and exceptDate in repeat:
+            myDates.add(exceptDate)
+    extended = [closedHols] if closedHols else []
+    pending = {page.id}
+    pending.update(
+        item.id
+        for item in shutdowns + extended
+        if getattr(item, "cancelled_from_date", dt.date.min) < windowFrom
+    )
+    myDates.update(getAnchors(_getDatesBefore(repeat, windowFrom), pending))
+    pending = {page.id}
+    pending.update(
+        item.id
+        for item in shutdowns + extended
+        if (getattr(item, "cancelled_to_date", None) or dt.date.max) > windowTo
+    )
+    myDates.update(getAnchors(repeat.xafter(windowTo), pending))
+
+    daysDelta = dt.timedelta(days=page.num_days - 1)
+    return [
+        _makeOccurrence(page, myDate, myDate + daysDelta, getException(myDate))
+        for myDate in sorted(myDates)
+    ]
+
+
+def _getDatesBefore(repeat, myDate):
+    # the occurrences before myDate, latest first
+    span = dt.timedelta(days=32)
+    toDate = myDate - _1day
+    while toDate >= repeat.dtstart:
+        fromDate = max(toDate - span, repeat.dtstart)
+        yield from reversed(repeat.between(fromDate, toDate, inc=True))
+        toDate = fromDate - _1day
+        span *= 2
+
+
+# ------------------------------------------------------------------------------
+# Querying the occurrences
+# ------------------------------------------------------------------------------
+def getOccurrencesByDay(request, fromDate, toDate, *, home=None, holidays=None):
+    """
+    Return the materialized occurrences for the dates given, as an
+    EventsByDayList.
+    """
+    occurrences = list(
+        EventOccurrence.objects.auth(request).under(home).between(fromDate, toDate)
+    )
+    events = _getPages(
+        Page.objects.specific(),
+        (occurrence.event_id for occurrence in occurrences),
+        holidays,
+    )
+    exceptionIds = {occurrence.exception_id for occurrence in occurrences}
+    exceptionIds.discard(None)
+    exceptions = {}
+    for model in (ExtraInfoPage, CancellationPage, ExtCancellationPage):
+        exceptions.update(_getPages(model.objects, exceptionIds))
+    exceptions.update(_getPages(ClosedForHolidaysPage.objects, exceptionIds, holidays))
+
+    isAuthorized = _ViewRestrictionChecker(request)
+    evods = EventsByDayList(fromDate, toDate)
+    for occurrence in occurrences:
+        page = events.get(occurrence.event_id)
+        if page is None:
+            continue
+        exception = exceptions.get(occurrence.exception_id)
+        thisEvent = _getThisEvent(request, page, exception, isAuthorized)
+        if thisEvent:
+            pageFromDate = timezone.localtime(occurrence.start).date()
+            pageToDate = timezone.localtime(occurrence.finish).date()
+            evods.add(thisEvent, pageFromDate, pageToDate)
+    return evods
+
+
+def getUpcomingOccurrences(request, *, home=None, holidays=None, after=None):
+    """
+    Return the upcoming events, found from their materialized occurrences.
+    """
+    now = timezone.now()
+    occurrences = EventOccurrence.objects.auth(request).under(home)
+    if getattr(settings, "JOYOUS_UPCOMING_INCLUDES_STARTED", False):
+        occurrences = occurrences.filter(finish__gte=now)
+    else:
+        occurrences = occurrences.filter(start__gte=now)
+    events = sorted(
+        (start, thisEvent.page.id, thisEvent)
+        for start, thisEvent in _getThisEvents(request, occurrences, Min, holidays)
+    )
+    return [
+        thisEvent
+        for start, pageId, thisEvent in events
+        if after is None or (start, pageId) > after
+    ]
+
+
+def getPastOccurrences(request, *, home=None, holidays=None, before=None):
+    """
+    Return the past events, found from their materialized occurrences.
+    """
+    now = timezone.now()
+    occurrences = (
+        EventOccurrence.objects.auth(request).under(home).filter(start__lt=now)
+    )
+    events = sorted(
+        (
+            (start, thisEvent.page.id, thisEvent)
+            for start, thisEvent in _getThisEvents(request, occurrences, Max, holidays)
+        ),
+        reverse=True,
+    )
+    return [
+        thisEvent
+        for start, pageId, thisEvent in events
+        if before is None or (start, pageId) < before
+    ]
+
+
+def _getPages(qs, ids, holidays=None):
+    pages = {page.id: page for page in qs.filter(id__in=set(ids))}
+    if holidays is not None:
+        for page in pages.values():
+            if hasattr(page, "holidays"):
+                page.holidays = holidays
+    return pages
+
+
+def _getThisEvent(request, page, exception, isAuthorized):
+    if exception is None or not isAuthorized(exception):
+        if isinstance(exception, ExtraInfoPage):
+            exception = None
+        elif exception is not None:
+            # The cancellation still affects the event, even if the
+            # user is not authorized to view the cancellation.
+            return None
+    if exception is None:
+        if isinstance(page, PostponementPage):
+            return ThisEvent(page.postponement_title, page, page.get_url(request))
+        else:
+            return ThisEvent(page, url=page.get_url(request))
+    elif isinstance(exception, ExtraInfoPage):
+        title = exception.extra_title or page.title
+        return ThisEvent(title, exception, exception.get_url(request))
+    elif exception.cancellation_title:
+        if isinstance(exception, CancellationPage):
+            url = exception.getCancellationUrl(request)
+        else:
+            url = exception.get_url(request)
+        return ThisEvent(exception.cancellation_title, exception, url)
+
+
+def _getThisEvents(request, occurrences, aggregate, holidays):
+    occurrences = occurrences.order_by()
+    eventStarts = dict(
+        occurrences.filter(exception=None)
+        .values_list("event")
+        .annotate(aggregate("start"))
+    )
+    exceptionStarts = dict(
+        occurrences.exclude(exception=None)
+        .values_list("exception")
+        .annotate(aggregate("start"))
+    )
+    eventIds = list(eventStarts)
+    exceptionIds = list(exceptionStarts)
+    eventQrys = [
+        SimpleEventPage.events(request),
+        MultidayEventPage.events(request),
+        RecurringEventPage.events(request, holidays),
+        PostponementPage.events(request),
+    ]
+    exceptionQrys = [
+        ExtraInfoPage.events(request).exclude(extra_title=""),
+        CancellationPage.events(request).exclude(cancellation_title=""),
+        ExtCancellationPage.events(request).exclude(cancellation_title=""),
+        ClosedForHolidaysPage.events(request, holidays).exclude(cancellation_title=""),
+    ]
+    events = []
+    for qry in eventQrys:
+        for thisEvent in qry.filter(id__in=eventIds).this():
+            events.append((eventStarts[thisEvent.page.id], thisEvent))
+    for qry in exceptionQrys:
+        for thisEvent in qry.filter(id__in=exceptionIds).this():
+            events.append((exceptionStarts[thisEvent.page.id], thisEvent))
+    return events
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
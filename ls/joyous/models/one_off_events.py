@@ -32,6 +32,8 @@ _2days = dt.timedelta(days=2)
 # Event models
 # ------------------------------------------------------------------------------
 class SimpleEventQuerySet(EventQuerySet):
+    startDateField = "date"
+
     def current(self):
         qs = super().current()
         return qs.filter(date__gte=todayUtc() - _1day)
@@ -127,6 +129,8 @@ class SimpleEventPage(EventBase, Page, metaclass=FormDefender):
 
 # ------------------------------------------------------------------------------
 class MultidayEventQuerySet(EventQuerySet):
+    startDateField = "date_from"
+
     def current(self):
         qs = super().current()
         return qs.filter(date_to__gte=todayUtc() - _1day)
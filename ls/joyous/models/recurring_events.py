@@ -8,6 +8,7 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.admin.widgets import FilteredSelectMultiple
 from django.db import models
 from django.db.models import Q
+from django.db.models.functions import Length, Substr
 from django.db.models.query import ModelIterable
 from django import forms
 from django.forms import widgets
@@ -17,7 +18,7 @@ from django.utils import translation
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from django.utils.translation import gettext, gettext_noop
-from wagtail.models import Page
+from wagtail.models import Page, PageViewRestriction
 from wagtail.fields import RichTextField
 from wagtail.admin.panels import FieldPanel, MultiFieldPanel, PageChooserPanel
 from wagtail.contrib.routable_page.models import RoutablePageMixin, route
@@ -25,6 +26,8 @@ from wagtail.search import index
 from modelcluster.fields import ParentalKey
 from ..utils.manythings import hrJoin
 from ..utils.mixins import ProxyPageMixin
+from ..utils.intervals import DateIntervals
+from ..utils.recurrence import expandMany
 from ..utils.telltime import (
     todayUtc,
     getAwareDatetime,
@@ -58,6 +61,97 @@ _1day = dt.timedelta(days=1)
 _2days = dt.timedelta(days=2)
 
 
+def _childrenOf(qs, pages):
+    """
+    Filter qs to the children of any of the given pages, annotating each
+    child with the path of its parent as ``parent_path``.
+    """
+    parentPath = Substr("path", 1, Length("path") - Page.steplen)
+    return qs.annotate(parent_path=parentPath).filter(
+        parent_path__in=[page.path for page in pages]
+    )
+
+
+class _Timeline:
+    """
+    The exceptions to a recurring event: its cancelled and extra info dates,
+    shutdowns, closed for holidays and postponements.  These are fetched
+    together once, so that the event's next and previous dates, status and so
+    on do not each query its children again.
+    """
+
+    # Bumped whenever an exception is saved or deleted, expiring every timeline
+    generation = 0
+
+    @classmethod
+    def expire(cls):
+        cls.generation += 1
+
+    def __init__(self, page):
+        self.generation = _Timeline.generation
+        self.holidays = page.holidays
+        self.cancelled = set(
+            CancellationPage.events.child_of(page).values_list("except_date", flat=True)
+        )
+        self.extraInfo = set(
+            ExtraInfoPage.events.child_of(page)
+            .exclude(extra_title="")
+            .values_list("except_date", flat=True)
+        )
+        self.shutdowns = DateIntervals(
+            (shutdown.cancelled_from_date, shutdown.cancelled_to_date, shutdown)
+            for shutdown in ExtCancellationPage.events.child_of(page)
+        )
+        self.closedHols = (
+            ClosedForHolidaysPage.events.hols(page.holidays).child_of(page).first()
+        )
+        self.postponements = list(
+            PostponementPage.events.child_of(page).order_by("date", "time_from")
+        )
+
+    def isCurrentFor(self, page):
+        return (
+            self.generation == _Timeline.generation and self.holidays is page.holidays
+        )
+
+    def shutdownOn(self, myDate):
+        """The shutdown which cancels myDate, or None."""
+        return self.shutdowns.get(myDate)
+
+    def closedOn(self, myDate):
+        """Is myDate closed for holidays?"""
+        return bool(self.closedHols and self.closedHols._closedOn(myDate))
+
+
+class _ViewRestrictionChecker:
+    """
+    Is the user authorized to view a page?  Like ``isAuthorized``, but
+    fetches all the view restrictions just once, rather than once per page.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.restrictions = None
+
+    def __call__(self, page):
+        if self.restrictions is None:
+            self.restrictions = list(
+                PageViewRestriction.objects.select_related("page")
+            )
+        restrictions = [
+            restriction
+            for restriction in self.restrictions
+            if page.path.startswith(restriction.page.path)
+        ]
+        if restrictions and self.request is None:
+            return False
+        else:
+            return all(
+                restriction.accept_request(self.request)
+                for restriction in restrictions
+            )
+
+
 # ------------------------------------------------------------------------------
 # Event models
 # ------------------------------------------------------------------------------
@@ -85,11 +179,20 @@ class EventWithHolidaysQuerySet(EventQuerySet):
         # make sure we all have the same holidays
         if self.holidays is not None:
             for item in self._result_cache:
-                for event in getattr(item, "all_events", [item]):
-                    page = getattr(event, "page", event)
-                    page.holidays = self.holidays
+                self._setHolidays(item)
         super()._filterResults()
 
+    def _prepareResults(self, results):
+        if self.holidays is not None:
+            results = map(self._setHolidays, results)
+        return results
+
+    def _setHolidays(self, item):
+        for event in getattr(item, "all_events", [item]):
+            page = getattr(event, "page", event)
+            page.holidays = self.holidays
+        return item
+
     def hols(self, holidays):
         qs = self._clone()
         qs.holidays = holidays
@@ -116,62 +219,75 @@ class RecurringEventQuerySet(EventWithHolidaysQuerySet):
         class ByDayIterable(ModelIterable):
             def __iter__(self):
                 evods = EventsByDayList(fromDate, toDate, holidays)
-                for page in super().__iter__():
-                    exceptions = self.__getExceptionsFor(page)
-                    closedHols = self.__getClosedForHolidays(page)
+                pages = list(super().__iter__())
+                isAuthorized = _ViewRestrictionChecker(request)
+                allExceptions = self.__getExceptionsFor(pages, isAuthorized)
+                allClosedHols = self.__getClosedForHolidays(pages)
+                # Expand all the recurrences together, over a range wide
+                # enough for the longest event
+                maxDays = max((page.num_days for page in pages), default=1)
+                allOccurences = expandMany(
+                    [page.repeat for page in pages],
+                    fromDate - dt.timedelta(days=maxDays + 1),
+                    toDate + _2days,
+                )
+                for pageNum, occurence in allOccurences:
+                    page = pages[pageNum]
                     startDelta = dt.timedelta(days=page.num_days + 1)
-                    for occurence in page.repeat.between(
-                        fromDate - startDelta, toDate + _2days, inc=True
-                    ):
-                        thisEvent = None
-                        exception = exceptions.get(occurence)
-                        if exception:
-                            if exception.title:
-                                thisEvent = exception
-                        elif closedHols and closedHols._closedOn(occurence):
-                            # ClosedForHolidaysPage still affects the event,
-                            # even if the user is not authorized
-                            if (
-                                closedHols.isAuthorized(request)
-                                and closedHols.cancellation_title
-                            ):
-                                thisEvent = ThisEvent(
-                                    closedHols.cancellation_title,
-                                    closedHols,
-                                    closedHols.get_url(request),
-                                )
-                        else:
-                            thisEvent = ThisEvent(page, url=page.get_url(request))
-                        if thisEvent:
-                            pageFromDate = getLocalDate(
-                                occurence, page.time_from, page.tz
-                            )
-                            daysDelta = dt.timedelta(days=page.num_days - 1)
-                            pageToDate = getLocalDate(
-                                occurence + daysDelta, page.time_to, page.tz
+                    if occurence < fromDate - startDelta:
+                        continue
+                    exceptions = allExceptions.get(page.path, {})
+                    closedHols = allClosedHols.get(page.path)
+                    thisEvent = None
+                    exception = exceptions.get(occurence)
+                    if exception:
+                        if exception.title:
+                            thisEvent = exception
+                    elif closedHols and closedHols._closedOn(occurence):
+                        # ClosedForHolidaysPage still affects the event,
+                        # even if the user is not authorized
+                        if isAuthorized(closedHols) and closedHols.cancellation_title:
+                            thisEvent = ThisEvent(
+                                closedHols.cancellation_title,
+                                closedHols,
+                                closedHols.get_url(request),
                             )
-                            evods.add(thisEvent, pageFromDate, pageToDate)
+                    else:
+                        thisEvent = ThisEvent(page, url=page.get_url(request))
+                    if thisEvent:
+                        pageFromDate = getLocalDate(occurence, page.time_from, page.tz)
+                        daysDelta = dt.timedelta(days=page.num_days - 1)
+                        pageToDate = getLocalDate(
+                            occurence + daysDelta, page.time_to, page.tz
+                        )
+                        evods.add(thisEvent, pageFromDate, pageToDate)
                 yield from evods
 
-            def __getExceptionsFor(self, page):
+            def __getExceptionsFor(self, pages, isAuthorized):
+                # Fetch the exceptions of all the pages at once, one query
+                # per exception type, and group them by their parent's path
+                allExceptions = {}
+                if not pages:
+                    return allExceptions
                 dateRange = (fromDate - _2days, toDate + _2days)
-                exceptions = {}
-                for extraInfo in (
-                    ExtraInfoPage.events(request)
-                    .child_of(page)
-                    .filter(except_date__range=dateRange)
-                ):
+                pageByPath = {page.path: page for page in pages}
+                for extraInfo in _childrenOf(
+                    ExtraInfoPage.events(request), pages
+                ).filter(except_date__range=dateRange):
+                    exceptions = allExceptions.setdefault(extraInfo.parent_path, {})
+                    page = pageByPath[extraInfo.parent_path]
                     title = extraInfo.extra_title or page.title
                     exceptDate = extraInfo.except_date
                     exceptions[exceptDate] = ThisEvent(
                         title, extraInfo, extraInfo.get_url(request)
                     )
-                for cancellation in CancellationPage.events.child_of(page).filter(
+                for cancellation in _childrenOf(CancellationPage.events, pages).filter(
                     except_date__range=dateRange
                 ):
+                    exceptions = allExceptions.setdefault(cancellation.parent_path, {})
                     # The cancellation still affects the event, even if the
                     # user is not authorized to view the cancellation.
-                    if cancellation.isAuthorized(request):
+                    if isAuthorized(cancellation):
                         title = cancellation.cancellation_title
                         url = cancellation.getCancellationUrl(request)
                     else:
@@ -179,31 +295,45 @@ class RecurringEventQuerySet(EventWithHolidaysQuerySet):
                         url = None
                     exceptDate = cancellation.except_date
                     exceptions[exceptDate] = ThisEvent(title, cancellation, url)
-                # TODO consider storing extended cancellations in an interval tree?
+                allShutdowns = {}
                 for shutdown in (
-                    ExtCancellationPage.events.child_of(page)
+                    _childrenOf(ExtCancellationPage.events, pages)
                     .filter(cancelled_from_date__lte=dateRange[1])
                     .filter(
                         Q(cancelled_to_date__gte=dateRange[0])
                         | Q(cancelled_to_date__isnull=True)
                     )
                 ):
-                    if shutdown.isAuthorized(request):
+                    if isAuthorized(shutdown):
                         title = shutdown.cancellation_title
                         url = shutdown.get_url(request)
                     else:
                         title = None
                         url = None
                     thisEvent = ThisEvent(title, shutdown, url)
-                    for myDate in shutdown._getMyRawDates(*dateRange):
+                    allShutdowns.setdefault(shutdown.parent_path, []).append(
+                        (
+                            shutdown.cancelled_from_date,
+                            shutdown.cancelled_to_date,
+                            thisEvent,
+                        )
+                    )
+                for path, shutdowns in allShutdowns.items():
+                    exceptions = allExceptions.setdefault(path, {})
+                    shutdowns = DateIntervals(shutdowns)
+                    for myDate, thisEvent in shutdowns.within(*dateRange):
                         exceptions[myDate] = thisEvent
-                return exceptions
-
-            def __getClosedForHolidays(self, page):
-                closedHols = (
-                    ClosedForHolidaysPage.events.hols(holidays).child_of(page).first()
-                )
-                return closedHols
+                return allExceptions
+
+            def __getClosedForHolidays(self, pages):
+                allClosedHols = {}
+                if not pages:
+                    return allClosedHols
+                for closedHols in _childrenOf(
+                    ClosedForHolidaysPage.events.hols(holidays), pages
+                ).order_by("pk"):
+                    allClosedHols.setdefault(closedHols.parent_path, closedHols)
+                return allClosedHols
 
         qs = self._clone()
         qs._iterable_class = ByDayIterable
@@ -307,6 +437,17 @@ class RecurringEventPage(EventBase, Page, metaclass=FormDefender):
     def __init__(self, *args, **kwargs):
         self.holidays = kwargs.pop("holidays", None)
         super().__init__(*args, **kwargs)
+        self.__timeline = None
+
+    @property
+    def _timeline(self):
+        """
+        The exceptions to this event, fetched once and then kept until any
+        exception is changed.
+        """
+        if self.__timeline is None or not self.__timeline.isCurrentFor(self):
+            self.__timeline = _Timeline(self)
+        return self.__timeline
 
     @property
     def next_date(self):
@@ -493,9 +634,11 @@ class RecurringEventPage(EventBase, Page, metaclass=FormDefender):
         for this recurring event
         """
         retval = []
-        for extraInfo in ExtraInfoPage.events(request).child_of(self).future():
+        for extraInfo in self.__futureDateExceptions(ExtraInfoPage.events(request)):
             retval.append(extraInfo)
-        for cancellation in CancellationPage.events(request).child_of(self).future():
+        for cancellation in self.__futureDateExceptions(
+            CancellationPage.events(request)
+        ):
             postponement = getattr(cancellation, "postponementpage", None)
             if postponement:
                 retval.append(postponement)
@@ -512,6 +655,15 @@ class RecurringEventPage(EventBase, Page, metaclass=FormDefender):
         # notice these are events not ThisEvents
         return retval
 
+    def __futureDateExceptions(self, qs):
+        # Like qs.child_of(self).future(), but with each exception given this
+        # page as its parent, so they share its timeline
+        qs = qs.child_of(self).filter(except_date__gte=todayUtc() - _1day)
+        for exception in qs:
+            exception.overrides = self
+            if exception._future_datetime_from:
+                yield exception
+
     def _nextOn(self, request):
         """
         Formatted date/time of when this event (including any postponements)
@@ -542,21 +694,12 @@ class RecurringEventPage(EventBase, Page, metaclass=FormDefender):
         """
         if myDate not in self.repeat:
             return False
-        if CancellationPage.events.child_of(self).filter(except_date=myDate).exists():
+        timeline = self._timeline
+        if myDate in timeline.cancelled:
             return False
-        if (
-            ExtCancellationPage.events.child_of(self)
-            .filter(cancelled_from_date__lte=myDate)
-            .filter(
-                Q(cancelled_to_date__gte=myDate) | Q(cancelled_to_date__isnull=True)
-            )
-            .exists()
-        ):
+        if timeline.shutdownOn(myDate) is not None:
             return False
-        closedHols = (
-            ClosedForHolidaysPage.events.hols(self.holidays).child_of(self).first()
-        )
-        if closedHols and closedHols._closedOn(myDate):
+        if timeline.closedOn(myDate):
             return False
         return True
 
@@ -601,12 +744,11 @@ class RecurringEventPage(EventBase, Page, metaclass=FormDefender):
         if after:
             # is there a postponed event before that?
             # nb: range is inclusive
-            dateRange = (fromDt.date(), after.date())
-            postponements = (
-                PostponementPage.events.child_of(self)
-                .filter(date__range=(dateRange))
-                .order_by("date", "time_from")
-            )
+            postponements = [
+                postponement
+                for postponement in self._timeline.postponements
+                if fromDt.date() <= postponement.date <= after.date()
+            ]
             for postponement in postponements:
                 postDt = getAwareDatetime(
                     postponement.date, postponement.time_from, self.tz, dt.time.min
@@ -618,11 +760,11 @@ class RecurringEventPage(EventBase, Page, metaclass=FormDefender):
                     return (postDt, postponement)
         else:
             # is there a postponed event then?
-            postponements = (
-                PostponementPage.events.child_of(self)
-                .filter(date__gte=fromDt.date())
-                .order_by("date", "time_from")
-            )
+            postponements = [
+                postponement
+                for postponement in self._timeline.postponements
+                if postponement.date >= fromDt.date()
+            ]
             for postponement in postponements:
                 postDt = getAwareDatetime(
                     postponement.date, postponement.time_from, self.tz, dt.time.min
@@ -642,85 +784,61 @@ class RecurringEventPage(EventBase, Page, metaclass=FormDefender):
         fromDate = fromDt.date()
         if self.time_from and self.time_from < fromDt.time():
             fromDate += _1day
-        exceptions = set()
-        shutdowns = []
-        closedHols = None
-        if excludeCancellations:
-            for cancelled in CancellationPage.events.child_of(self).filter(
-                except_date__gte=fromDate
-            ):
-                exceptions.add(cancelled.except_date)
-            # TODO consider storing extended cancellations in an interval tree?
-            shutdowns = ExtCancellationPage.events.child_of(self).filter(
-                Q(cancelled_to_date__gte=fromDate) | Q(cancelled_to_date__isnull=True)
-            )
-            closedHols = (
-                ClosedForHolidaysPage.events.hols(self.holidays).child_of(self).first()
-            )
-        if excludeExtraInfo:
-            for info in (
-                ExtraInfoPage.events.child_of(self)
-                .filter(except_date__gte=fromDate)
-                .exclude(extra_title="")
-            ):
-                exceptions.add(info.except_date)
+        exceptions = self.__getExceptionDates(excludeCancellations, excludeExtraInfo)
         for occurence in self.repeat.xafter(
             fromDate, count=self.MAX_REPEAT_COUNT, inc=True
         ):
             if occurence in exceptions:
                 continue
-            shutdown = next(
-                (shutdown for shutdown in shutdowns if shutdown._closedOn(occurence)),
-                None,
-            )
-            if shutdown is not None:
-                if shutdown.cancelled_to_date is None:
-                    break
-                else:
-                    # the next line is run; coverage is wrong
-                    continue  # pragma: no cover
-            if closedHols and closedHols._closedOn(occurence):
-                continue
+            if excludeCancellations:
+                shutdown = self._timeline.shutdownOn(occurence)
+                if shutdown is not None:
+                    if shutdown.cancelled_to_date is None:
+                        break
+                    else:
+                        # the next line is run; coverage is wrong
+                        continue  # pragma: no cover
+                if self._timeline.closedOn(occurence):
+                    continue
             return getAwareDatetime(occurence, self.time_from, self.tz, dt.time.min)
 
     def __before(self, fromDt, excludeCancellations=True, excludeExtraInfo=False):
         fromDate = fromDt.date()
         if self.time_from and self.time_from > fromDt.time():
             fromDate -= _1day
-        exceptions = set()
-        shutdowns = []
-        if excludeCancellations:
-            for cancelled in CancellationPage.events.child_of(self).filter(
-                except_date__lte=fromDate
-            ):
-                exceptions.add(cancelled.except_date)
-            shutdowns = ExtCancellationPage.events.child_of(self).filter(
-                cancelled_from_date__lte=fromDate
-            )
-            closedHols = (
-                ClosedForHolidaysPage.events.hols(self.holidays).child_of(self).first()
-            )
-        if excludeExtraInfo:
-            for info in (
-                ExtraInfoPage.events.child_of(self)
-                .filter(except_date__lte=fromDate)
-                .exclude(extra_title="")
-            ):
-                exceptions.add(info.except_date)
-        last = None
-        for occurence in self.repeat:
-            if occurence > fromDate:
-                break
+        exceptions = self.__getExceptionDates(excludeCancellations, excludeExtraInfo)
+        for occurence in self.__occurencesBackFrom(fromDate):
             if occurence in exceptions:
                 continue
-            if any(shutdown._closedOn(occurence) for shutdown in shutdowns):
-                continue
-            if closedHols and closedHols._closedOn(occurence):
-                continue
-            last = occurence
+            if excludeCancellations:
+                if self._timeline.shutdownOn(occurence) is not None:
+                    continue
+                if self._timeline.closedOn(occurence):
+                    continue
+            return getAwareDatetime(occurence, self.time_from, self.tz, dt.time.min)
+
+    def __occurencesBackFrom(self, fromDate):
+        # Step backwards through the occurrences on or before fromDate
+        if self.repeat._canSeek():
+            occurence = self.repeat.before(fromDate, inc=True)
+            while occurence is not None:
+                yield occurence
+                occurence = self.repeat.before(occurence)
+        else:
+            occurences = []
+            for occurence in self.repeat:
+                if occurence > fromDate:
+                    break
+                occurences.append(occurence)
+            yield from reversed(occurences)
 
-        if last is not None:
-            return getAwareDatetime(last, self.time_from, self.tz, dt.time.min)
+    def __getExceptionDates(self, excludeCancellations, excludeExtraInfo):
+        exceptions = set()
+        if excludeCancellations:
+            exceptions |= self._timeline.cancelled
+        if excludeExtraInfo:
+            exceptions |= self._timeline.extraInfo
+        return exceptions
 
 
 # ------------------------------------------------------------------------------
@@ -845,6 +963,8 @@ class EventExceptionBase(models.Model):
 
 # ------------------------------------------------------------------------------
 class DateExceptionQuerySet(EventQuerySet):
+    startDateField = "except_date"
+
     def current(self):
         qs = super().current()
         return qs.filter(except_date__gte=todayUtc() - _1day)
@@ -1256,6 +1376,8 @@ class CancellationPage(CancellationBase, DateExceptionBase, Page):
 
 # ------------------------------------------------------------------------------
 class PostponementQuerySet(EventQuerySet):
+    startDateField = "date"
+
     def current(self):
         qs = super().current()
         return qs.filter(date__gte=todayUtc() - _1day)
@@ -1751,23 +1873,106 @@ class ClosedForHolidaysPage(
         for occurence in self._getMyDates():
             yield getLocalDate(occurence, self.time_from, self.tz)
 
-    def _getMyDates(self):
+    def _getMyDates(self, fromDate=None, toDate=None):
         """
-        Return all the dates which we are closed for in the event timezone
+        Return all the dates which we are closed for in the event timezone.
+        Limited by fromDate and toDate if given.
         """
-        if self.holidays is not None:
-            self._cacheClosedSet()
-            if not self.__closedSet:
-                return None
-            n = 0
-            for occurence in self.overrides.repeat:
-                n += 1
-                if n > self.MAX_REPEAT_COUNT:
+        if self.holidays is None:
+            return None
+        self._cacheClosedSet()
+        if not self.__closedSet:
+            return None
+        repeat = self.overrides.repeat
+        if fromDate is None or fromDate < repeat.dtstart:
+            fromDate = repeat.dtstart
+        if repeat.until is not None and (toDate is None or toDate > repeat.until):
+            toDate = repeat.until
+        if not self.__canIterHolidays():
+            yield from self.__scanOccurrences(fromDate, toDate)
+            return None
+        lastDate = fromDate
+        lastYear = None
+        for year in range(fromDate.year, (toDate or dt.date.max).year + 1):
+            if toDate is None and year > lastDate.year + 1:
+                # give up once MAX_REPEAT_COUNT occurrences have gone by
+                # without one that we are closed for
+                if lastYear is None:
+                    lastYear = self.__getLastYearToTry(lastDate)
+                if year > lastYear:
                     # that's enough, bailing out
                     return None
-                if self._closedOn(occurence):
-                    n = 0
-                    yield occurence
+            for occurence in self.__getClosedDatesIn(
+                max(fromDate, dt.date(year, 1, 1)),
+                min(toDate or dt.date.max, dt.date(year, 12, 31)),
+            ):
+                lastDate = occurence
+                lastYear = None
+                yield occurence
+
+    def __getMyDatesBackFrom(self, fromDate):
+        # The dates which we are closed for in the event timezone, going
+        # backwards from fromDate
+        if self.holidays is None or not self.__closedSet:
+            return None
+        repeat = self.overrides.repeat
+        if not self.__canIterHolidays():
+            yield from reversed(
+                [
+                    occurence
+                    for occurence in repeat.between(repeat.dtstart, fromDate, inc=True)
+                    if self._closedOn(occurence)
+                ]
+            )
+            return None
+        for year in range(fromDate.year, repeat.dtstart.year - 1, -1):
+            yield from reversed(
+                self.__getClosedDatesIn(
+                    max(repeat.dtstart, dt.date(year, 1, 1)),
+                    min(fromDate, dt.date(year, 12, 31)),
+                )
+            )
+
+    def __canIterHolidays(self):
+        # Can we go through the holidays we are closed for and check if the
+        # event occurs on them, rather than checking every occurrence?
+        return (
+            isinstance(self.holidays, Holidays)
+            and self.holidays._isIndexable()
+            and self.overrides.repeat._canSeek()
+        )
+
+    def __getLastYearToTry(self, fromDate):
+        # The year of the MAX_REPEAT_COUNT'th occurrence from fromDate
+        occurence = fromDate
+        repeat = self.overrides.repeat
+        for occurence in repeat.xafter(fromDate, self.MAX_REPEAT_COUNT, inc=True):
+            pass
+        return occurence.year
+
+    def __getClosedDatesIn(self, fromDate, toDate):
+        # The occurrences from fromDate to toDate that we are closed for
+        if self.all_holidays:
+            dates = self.holidays.between(fromDate, toDate)
+        else:
+            dates = self.holidays.datesOf(self.__closedSet, fromDate, toDate)
+        repeat = self.overrides.repeat
+        return [myDate for myDate in dates if myDate in repeat]
+
+    def __scanOccurrences(self, fromDate, toDate):
+        # Check every occurrence from fromDate to toDate to see if we are
+        # closed for it
+        n = 0
+        for occurence in self.overrides.repeat.xafter(fromDate, inc=True):
+            if toDate is not None and occurence > toDate:
+                return None
+            n += 1
+            if n > self.MAX_REPEAT_COUNT:
+                # that's enough, bailing out
+                return None
+            if self._closedOn(occurence):
+                n = 0
+                yield occurence
 
     def _getFromTime(self, atDate=None):
         """
@@ -1819,12 +2024,7 @@ class ClosedForHolidaysPage(
             shutdowns = ExtCancellationPage.events.child_of(self.overrides).filter(
                 Q(cancelled_to_date__gte=fromDate) | Q(cancelled_to_date__isnull=True)
             )
-        repeat = self.overrides.repeat
-        for n, occurence in enumerate(repeat.xafter(fromDate, inc=True)):
-            if n > self.MAX_REPEAT_COUNT:
-                # that's enough, bailing out, return two days before max
-                # (so we can still do TZ conversions on the result)
-                return self.MAX_DATETIME
+        for occurence in self._getMyDates(fromDate):
             if occurence in exceptions:
                 continue
             shutdown = next(
@@ -1833,13 +2033,16 @@ class ClosedForHolidaysPage(
             )
             if shutdown is not None:
                 if shutdown.cancelled_to_date is None:
-                    break
+                    return None
                 else:
                     # the next line is run; coverage is wrong
                     continue  # pragma: no cover
-            if not self._closedOn(occurence):
-                continue
             return getAwareDatetime(occurence, self.time_from, self.tz, dt.time.min)
+        repeat = self.overrides.repeat
+        if repeat.until is None and repeat.count is None:
+            # we must have bailed out, return two days before max
+            # (so we can still do TZ conversions on the result)
+            return self.MAX_DATETIME
 
     def __before(self, fromDt, excludeCancellations=True):
         fromDate = fromDt.date()
@@ -1856,20 +2059,12 @@ class ClosedForHolidaysPage(
             shutdowns = ExtCancellationPage.events.child_of(self.overrides).filter(
                 cancelled_from_date__lte=fromDate
             )
-        last = None
-        repeat = self.overrides.repeat
-        for occurence in repeat:
-            if occurence > fromDate:
-                break
+        for occurence in self.__getMyDatesBackFrom(fromDate):
             if occurence in exceptions:
                 continue
             if any(shutdown._closedOn(occurence) for shutdown in shutdowns):
                 continue
-            if not self._closedOn(occurence):
-                continue
-            last = occurence
-        if last is not None:
-            return getAwareDatetime(last, self.time_from, self.tz, dt.time.min)
+            return getAwareDatetime(occurence, self.time_from, self.tz, dt.time.min)
 
 
 # ------------------------------------------------------------------------------
@@ -1,9 +1,30 @@
 # ------------------------------------------------------------------------------
 # Joyous models
 # ------------------------------------------------------------------------------
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from wagtail.admin.signals import init_new_page
-from .models import RecurringEventPage, EventExceptionBase
+from wagtail.models import Page, PageViewRestriction
+from wagtail.signals import page_published, page_unpublished, post_page_move
+from .models import RecurringEventPage, EventExceptionBase, EventBase, CalendarPage
+from .models.calendar_cache import (
+    calendarCacheEnabled,
+    expireCalendarCache,
+    expireCalendarCacheFor,
+    getPageBuckets,
+)
+from .models.event_base import indexedStartsEnabled
+from .models.recurring_events import _Timeline
+from .models.occurrences import (
+    EVENT_TYPES,
+    EXCEPTION_TYPES,
+    occurrencesEnabled,
+    refreshOccurrencesFor,
+    refreshOccurrencesUnder,
+    refreshOccurrencesAt,
+)
 
 
 # ------------------------------------------------------------------------------
@@ -23,5 +44,113 @@ def identifyExpectantParent(sender, **kwargs):
         page._copyFieldsFromParent(parent)
 
 
+# Keep the materialized occurrences up to date
+@receiver(page_published)
+@receiver(page_unpublished)
+def refreshPublishedOccurrences(sender, instance, **kwargs):
+    if occurrencesEnabled() and isinstance(instance, EVENT_TYPES + EXCEPTION_TYPES):
+        refreshOccurrencesFor(instance)
+
+
+@receiver(post_page_move)
+def refreshMovedOccurrences(sender, instance, parent_page_before=None, **kwargs):
+    if occurrencesEnabled():
+        refreshOccurrencesUnder(instance)
+        if isinstance(instance.specific, EXCEPTION_TYPES):
+            refreshOccurrencesFor(instance)
+            if parent_page_before is not None:
+                refreshOccurrencesFor(parent_page_before)
+
+
+@receiver(post_delete)
+def refreshDeletedOccurrences(sender, instance, **kwargs):
+    # Events take their occurrences with them, but deleting an exception
+    # restores the occurrences it was hiding
+    if occurrencesEnabled() and isinstance(instance, EXCEPTION_TYPES):
+        parentPath = instance.path[: -Page.steplen]
+        transaction.on_commit(partial(refreshOccurrencesAt, parentPath))
+
+
+# Expire the cached calendar responses when the events shown change
+@receiver(pre_save)
+def rememberCalendarBuckets(sender, instance, update_fields=None, **kwargs):
+    # An event that is moved to another date must also leave its old dates
+    if (
+        calendarCacheEnabled()
+        and update_fields is None
+        and instance.pk is not None
+        and isinstance(instance, EVENT_TYPES + EXCEPTION_TYPES)
+    ):
+        old = type(instance)._default_manager.filter(pk=instance.pk).first()
+        if old is not None:
+            instance._joyousOldBuckets = getPageBuckets(old)
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+@receiver(post_delete)
+def expireCalendarResponses(sender, instance, **kwargs):
+    if not calendarCacheEnabled():
+        return
+    if isinstance(instance, EVENT_TYPES + EXCEPTION_TYPES):
+        oldBuckets = getattr(instance, "_joyousOldBuckets", set())
+        if oldBuckets is None:
+            expireCalendarCache()
+        else:
+            expireCalendarCacheFor(instance, extraBuckets=oldBuckets)
+    elif isinstance(instance, CalendarPage):
+        expireCalendarCache()
+
+
+@receiver(post_page_move)
+@receiver(post_save, sender=PageViewRestriction)
+@receiver(post_delete, sender=PageViewRestriction)
+def expireMovedCalendarResponses(sender, **kwargs):
+    # any page that is moved or restricted might have events under it
+    if calendarCacheEnabled():
+        expireCalendarCache()
+
+
+# Expire the timelines of recurring events when their exceptions change
+@receiver(post_save)
+@receiver(post_delete)
+def expireTimelines(sender, instance, **kwargs):
+    if isinstance(instance, (RecurringEventPage, EventExceptionBase)):
+        _Timeline.expire()
+
+
+# Keep the stored start times up to date
+@receiver(post_save)
+def refreshSavedStarts(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not indexedStartsEnabled():
+        return
+    if isinstance(instance, EventBase):
+        if update_fields is None:
+            instance._refreshStarts()
+        else:
+            # save_revision only saves some fields of a draft, so the other
+            # fields of this instance might not be what is in the database
+            _refreshStartsOf(type(instance), pk=instance.pk)
+    if isinstance(instance, EventExceptionBase):
+        _refreshStartsAt(instance.path[: -Page.steplen])
+
+
+@receiver(post_delete)
+def refreshDeletedStarts(sender, instance, **kwargs):
+    if indexedStartsEnabled() and isinstance(instance, EventExceptionBase):
+        parentPath = instance.path[: -Page.steplen]
+        transaction.on_commit(partial(_refreshStartsAt, parentPath))
+
+
+def _refreshStartsAt(path):
+    _refreshStartsOf(RecurringEventPage, path=path)
+
+
+def _refreshStartsOf(model, **lookup):
+    page = model.objects.filter(**lookup).first()
+    if page is not None:
+        page._refreshStarts()
+
+
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
@@ -15,7 +15,8 @@ from ls.joyous.models import (
     CalendarPageForm,
     GeneralCalendarPage,
 )
-from ls.joyous.models import SimpleEventPage
+from ls.joyous.models import SimpleEventPage, ClosedForHolidaysPage
+from ls.joyous.models.calendar import _encodeCursor, _decodeCursor
 from ls.joyous.models import get_group_model
 from .testutils import freeze_timetz, getPage
 
@@ -152,6 +153,47 @@ class TestCalendar(TestCase):
             when.string.strip(), "Sunday 5th of June 2011 at 9:30am to 11am"
         )
 
+    def testPastEventsCursor(self):
+        calendar = CalendarPage.objects.get(slug="events")
+        for num in range(30):
+            event = SimpleEventPage(
+                owner=self.user,
+                slug="talk-{}".format(num),
+                title="Talk {}".format(num),
+                date=dt.date(2012, 1, 1) + dt.timedelta(days=num),
+                time_from=dt.time(18),
+            )
+            calendar.add_child(instance=event)
+        response = self.client.get("/events/past/")
+        select = response.soup.select
+        self.assertEqual(response.status_code, 200)
+        titles = [
+            link.string.strip() for link in select(".joy-ev-item a.joy-title__link")
+        ]
+        self.assertEqual(titles, ["Talk {}".format(num) for num in range(29, 4, -1)])
+        nextLink = select(".joy-pg a.joy-pg__ctrl")[0]
+        self.assertTrue(nextLink["href"].startswith("?before="))
+        response = self.client.get("/events/past/" + nextLink["href"])
+        select = response.soup.select
+        titles = [
+            link.string.strip() for link in select(".joy-ev-item a.joy-title__link")
+        ]
+        self.assertEqual(
+            titles, ["Talk 4", "Talk 3", "Talk 2", "Talk 1", "Talk 0", "Tree Planting"]
+        )
+        firstLink = select(".joy-pg a.joy-pg__ctrl")[0]
+        self.assertEqual(firstLink["href"], "?")
+
+    def testCursorEarlyYears(self):
+        when = ClosedForHolidaysPage.MIN_DATETIME
+        self.assertEqual(_decodeCursor(_encodeCursor((when, 42))), (when, 42))
+
+    def testPastEventsInvalidCursor(self):
+        response = self.client.get("/events/past/?before=rubbish")
+        select = response.soup.select
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(select(".joy-cal-list--past .joy-ev-item")), 1)
+
     def testPastEventsInvalidPage(self):
         response = self.client.get("/events/past/?page=99")
         select = response.soup.select
@@ -0,0 +1,199 @@
+# ------------------------------------------------------------------------------
+# Test Calendar Cache
+# ------------------------------------------------------------------------------
+import datetime as dt
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from wagtail.models import Page
+from ls.joyous.models import CalendarPage, SimpleEventPage
+
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+# ------------------------------------------------------------------------------
+@override_settings(JOYOUS_CALENDAR_CACHE=True, CACHES=CACHES)
+class Test(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("i", "i@j.test", "s3(r3t")
+        self.calendar = CalendarPage(owner=self.user, slug="events", title="Events")
+        Page.objects.get(slug="home").add_child(instance=self.calendar)
+        self.calendar.save_revision().publish()
+        self.event = SimpleEventPage(
+            owner=self.user,
+            slug="tree-planting",
+            title="Tree Planting",
+            date=dt.date(2011, 6, 5),
+            time_from=dt.time(9, 30),
+            time_to=dt.time(11, 0),
+        )
+        self.calendar.add_child(instance=self.event)
+        self.event.save_revision().publish()
+
+    def testCached(self):
+        response = self.client.get("/events/2011/06/")
+        self.assertContains(response, "Tree Planting")
+        SimpleEventPage.objects.filter(pk=self.event.pk).update(title="Tree Felling")
+        response = self.client.get("/events/2011/06/")
+        self.assertContains(response, "Tree Planting")
+
+    def testPublishExpires(self):
+        response = self.client.get("/events/2011/06/")
+        self.assertContains(response, "Tree Planting")
+        self.event.title = "Tree Felling"
+        self.event.save_revision().publish()
+        response = self.client.get("/events/2011/06/")
+        self.assertContains(response, "Tree Felling")
+
+    def testUnpublishExpires(self):
+        response = self.client.get("/events/2011/06/")
+        self.assertContains(response, "Tree Planting")
+        self.event.unpublish()
+        response = self.client.get("/events/2011/06/")
+        self.assertNotContains(response, "Tree Planting")
+
+    def testStaleWhileRendering(self):
+        response = self.client.get("/events/2011/06/")
+        self.assertContains(response, "Tree Planting")
+        self.event.title = "Tree Felling"
+        self.event.save_revision().publish()
+        # another request holds the lock on rendering the new response
+        with patch("ls.joyous.models.calendar_cache.cache.add", return_value=False):
+            response = self.client.get("/events/2011/06/")
+        self.assertContains(response, "Tree Planting")
+        response = self.client.get("/events/2011/06/")
+        self.assertContains(response, "Tree Felling")
+
+    def testExportCached(self):
+        response = self.client.get("/events/?format=ical")
+        self.assertContains(response, "Tree Planting")
+        SimpleEventPage.objects.filter(pk=self.event.pk).update(title="Tree Felling")
+        response = self.client.get("/events/?format=ical")
+        self.assertContains(response, "Tree Planting")
+        self.event.title = "Tree Felling"
+        self.event.save_revision().publish()
+        response = self.client.get("/events/?format=ical")
+        self.assertContains(response, "Tree Felling")
+
+    def testLoggedInNotCached(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/events/2011/06/")
+        self.assertContains(response, "Tree Planting")
+        SimpleEventPage.objects.filter(pk=self.event.pk).update(title="Tree Felling")
+        response = self.client.get("/events/2011/06/")
+        self.assertContains(response, "Tree Felling")
+
+    @override_settings(JOYOUS_CALENDAR_CACHE=False)
+    def testDisabled(self):
+        response = self.client.get("/events/2011/06/")
+        self.assertContains(response, "Tree Planting")
+        SimpleEventPage.objects.filter(pk=self.event.pk).update(title="Tree Felling")
+        response = self.client.get("/events/2011/06/")
+        self.assertContains(response, "Tree Felling")
+
+    def testOtherMonthsKept(self):
+        today = timezone.localdate()
+        soon = today.replace(day=15) + dt.timedelta(days=45)
+        later = soon + dt.timedelta(days=62)
+        event2 = SimpleEventPage(
+            owner=self.user,
+            slug="weeding",
+            title="Weeding",
+            date=later,
+            time_from=dt.time(9, 30),
+        )
+        self.calendar.add_child(instance=event2)
+        event2.save_revision().publish()
+        soonUrl = "/events/{}/{:02}/".format(soon.year, soon.month)
+        laterUrl = "/events/{}/{:02}/".format(later.year, later.month)
+        self.assertNotContains(self.client.get(soonUrl), "Weeding")
+        self.assertContains(self.client.get(laterUrl), "Weeding")
+        SimpleEventPage.objects.filter(pk=self.event.pk).update(date=soon)
+        event2.title = "Mulching"
+        event2.save_revision().publish()
+        self.assertNotContains(self.client.get(soonUrl), "Tree Planting")
+        self.assertContains(self.client.get(laterUrl), "Mulching")
+
+    def testMovedEventExpiresOldMonth(self):
+        today = timezone.localdate()
+        soon = today.replace(day=15) + dt.timedelta(days=45)
+        later = soon + dt.timedelta(days=62)
+        self.event.date = soon
+        self.event.save_revision().publish()
+        soonUrl = "/events/{}/{:02}/".format(soon.year, soon.month)
+        laterUrl = "/events/{}/{:02}/".format(later.year, later.month)
+        self.assertContains(self.client.get(soonUrl), "Tree Planting")
+        self.assertNotContains(self.client.get(laterUrl), "Tree Planting")
+        event = SimpleEventPage.objects.get(pk=self.event.pk)
+        event.date = later
+        event.save_revision().publish()
+        self.assertNotContains(self.client.get(soonUrl), "Tree Planting")
+        self.assertContains(self.client.get(laterUrl), "Tree Planting")
+
+
+# ------------------------------------------------------------------------------
+@override_settings(JOYOUS_CONDITIONAL_GET=True)
+class TestConditionalGet(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("i", "i@j.test", "s3(r3t")
+        self.calendar = CalendarPage(owner=self.user, slug="events", title="Events")
+        Page.objects.get(slug="home").add_child(instance=self.calendar)
+        self.calendar.save_revision().publish()
+        self.event = SimpleEventPage(
+            owner=self.user,
+            slug="tree-planting",
+            title="Tree Planting",
+            date=dt.date(2011, 6, 5),
+            time_from=dt.time(9, 30),
+            time_to=dt.time(11, 0),
+        )
+        self.calendar.add_child(instance=self.event)
+        self.event.save_revision().publish()
+
+    def testNotModified(self):
+        response = self.client.get("/events/2011/06/")
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        response = self.client.get("/events/2011/06/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def testNotModifiedSince(self):
+        response = self.client.get("/events/2011/06/")
+        lastModified = response["Last-Modified"]
+        response = self.client.get(
+            "/events/2011/06/", HTTP_IF_MODIFIED_SINCE=lastModified
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def testPublishModifies(self):
+        response = self.client.get("/events/2011/06/")
+        etag = response["ETag"]
+        self.event.title = "Tree Felling"
+        self.event.save_revision().publish()
+        response = self.client.get("/events/2011/06/", HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "Tree Felling")
+
+    def testUnpublishModifies(self):
+        response = self.client.get("/events/2011/06/")
+        etag = response["ETag"]
+        self.event.unpublish()
+        response = self.client.get("/events/2011/06/", HTTP_IF_NONE_MATCH=etag)
+        self.assertNotContains(response, "Tree Planting")
+
+    def testExportNotModified(self):
+        response = self.client.get("/events/?format=ical")
+        self.assertContains(response, "Tree Planting")
+        etag = response["ETag"]
+        response = self.client.get("/events/?format=ical", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def testLoggedIn(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/events/2011/06/")
+        self.assertFalse(response.has_header("ETag"))
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
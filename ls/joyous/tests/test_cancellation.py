@@ -10,7 +10,7 @@ from wagtail.models import Page, PageViewRestriction
 from ls.joyous.formats.google import get_timezone_name
 from ls.joyous.models import CalendarPage
 from ls.joyous.models import RecurringEventPage
-from ls.joyous.models import CancellationPage
+from ls.joyous.models import CancellationPage, ClosedForHolidaysPage
 from ls.joyous.utils.recurrence import Recurrence, WEEKLY, MO, WE, FR
 from .testutils import freeze_timetz, datetimetz
 
@@ -64,6 +64,54 @@ class Test(TestCase):
         self.assertEqual(len(evod2.days_events), 0)
         self.assertEqual(len(evod2.continuing_events), 0)
 
+    def testGetEventsByDayManyEvents(self):
+        otherEvent = RecurringEventPage(
+            slug="other-meeting",
+            title="Other Meeting",
+            repeat=Recurrence(
+                dtstart=dt.date(1989, 1, 1), freq=WEEKLY, byweekday=[MO, WE, FR]
+            ),
+            time_from=dt.time(9),
+            time_to=dt.time(10),
+        )
+        self.calendar.add_child(instance=otherEvent)
+        otherCancellation = CancellationPage(
+            owner=self.user,
+            overrides=otherEvent,
+            except_date=dt.date(1989, 2, 3),
+            cancellation_title="Other Meeting Cancelled",
+        )
+        otherEvent.add_child(instance=otherCancellation)
+        otherCancellation.save_revision().publish()
+        closedHols = ClosedForHolidaysPage(
+            owner=self.user,
+            overrides=otherEvent,
+            all_holidays=True,
+            cancellation_title="Closed for the holiday",
+            holidays=self.calendar.holidays,
+        )
+        otherEvent.add_child(instance=closedHols)
+        closedHols.save_revision().publish()
+        with self.assertNumQueries(13):
+            events = list(
+                RecurringEventPage.events.hols(self.calendar.holidays).byDay(
+                    dt.date(1989, 2, 1), dt.date(1989, 2, 28)
+                )
+            )
+        self.assertEqual(len(events), 28)
+        evod1 = events[0]
+        self.assertEqual(evod1.date, dt.date(1989, 2, 1))
+        titles = sorted(event.title for event in evod1.days_events)
+        self.assertEqual(titles, ["Meeting Cancelled", "Other Meeting"])
+        evod3 = events[2]
+        self.assertEqual(evod3.date, dt.date(1989, 2, 3))
+        titles = sorted(event.title for event in evod3.days_events)
+        self.assertEqual(titles, ["Other Meeting Cancelled", "Test Meeting"])
+        evod6 = events[5]
+        self.assertEqual(evod6.date, dt.date(1989, 2, 6))
+        titles = sorted(event.title for event in evod6.days_events)
+        self.assertEqual(titles, ["Closed for the holiday", "Test Meeting"])
+
     def testOccursOn(self):
         self.assertIs(self.event._occursOn(dt.date(1989, 2, 1)), False)
         self.assertIs(self.event._occursOn(dt.date(1989, 2, 3)), True)
@@ -13,7 +13,7 @@ from ls.joyous.models import CalendarPage
 from ls.joyous.models import RecurringEventPage, CancellationPage, ExtCancellationPage
 from ls.joyous.models import ClosedForHolidaysPage, ClosedFor
 from ls.joyous.utils.recurrence import Recurrence
-from ls.joyous.utils.recurrence import WEEKLY, MONTHLY, MO, WE, FR
+from ls.joyous.utils.recurrence import DAILY, WEEKLY, MONTHLY, MO, WE, FR
 from .testutils import freeze_timetz, datetimetz
 
 
@@ -230,6 +230,37 @@ class Test(TestCase):
         dates = list(islice(closedHols._getMyDates(), 10))
         self.assertEqual(dates, [])
 
+    def testGetMyDatesBetween(self):
+        event = RecurringEventPage(
+            slug="ABC",
+            title="Aardvark bicycle club",
+            repeat=Recurrence(dtstart=dt.date(2019, 1, 1), freq=DAILY),
+            time_from=dt.time(7),
+        )
+        self.calendar.add_child(instance=event)
+        closedHols = ClosedForHolidaysPage(
+            owner=self.user,
+            overrides=event,
+            all_holidays=False,
+            holidays=self.calendar.holidays,
+        )
+        closedHols.closed_for = [
+            ClosedFor(name="Christmas Day"),
+            ClosedFor(name="Boxing Day"),
+        ]
+        event.add_child(instance=closedHols)
+        closedHols.save_revision().publish()
+        dates = list(closedHols._getMyDates(dt.date(2019, 6, 1), dt.date(2021, 6, 1)))
+        self.assertEqual(
+            dates,
+            [
+                dt.date(2019, 12, 25),
+                dt.date(2019, 12, 26),
+                dt.date(2020, 12, 25),
+                dt.date(2020, 12, 26),
+            ],
+        )
+
     def testClosedOn(self):
         event = RecurringEventPage(
             slug="XYZ",
@@ -30,6 +30,7 @@ from ls.joyous.models import (
     getAllPastEvents,
     getGroupUpcomingEvents,
     getEventFromUid,
+    getEventsFromUids,
 )
 from ls.joyous.models import get_group_model
 
@@ -217,6 +218,25 @@ class Test(TestCase):
         events0 = getAllUpcomingEvents(self.request)
         self.assertEqual(len(events0), 1)
 
+    def testGetAllUpcomingEventsTimezones(self):
+        today = timezone.localdate()
+        for num, tz in enumerate(["Pacific/Kiritimati", "Pacific/Pago_Pago"] * 3):
+            event = SimpleEventPage(
+                owner=self.user,
+                slug="event-{}".format(num),
+                title="Event {}".format(num),
+                date=today + dt.timedelta(days=num + 2),
+                time_from=dt.time(23),
+                tz=pytz.timezone(tz),
+            )
+            self.calendar.add_child(instance=event)
+        events = getAllUpcomingEvents(self.request)
+        self.assertEqual(events.evaluated, 0)
+        self.assertEqual(events[0].title, "Event 0")
+        starts = [event.page._future_datetime_from for event in events]
+        self.assertEqual(starts, sorted(starts))
+        self.assertEqual(len(events), 6)
+
     def testGetAllPastEvents(self):
         events = getAllPastEvents(self.request)
         self.assertEqual(len(events), 5)
@@ -313,6 +333,23 @@ class Test(TestCase):
         self.assertIsNotNone(event.title)
         self.assertEqual(event.title, "Private Rendezvous")
 
+    def testGetEventsFromUids(self):
+        uids = [
+            "29daefed-fed1-4e47-9408-43ec9b06a06d",
+            "initiative+technology",
+            "d12971fb-e694-4a04-aba2-fb1a4a7166b9",
+            "80af64e7-84e6-40d9-8b4f-7edf92aab9f7",
+        ]
+        events = getEventsFromUids(self.request, uids)
+        self.assertEqual(len(events), 3)
+        self.assertEqual(events[uids[0]].title, "Pet Show")
+        self.assertIsNone(events[uids[1]])
+        self.assertNotIn(uids[2], events)
+        self.assertIsNone(events[uids[3]])
+        self.request.user.groups.set([self.friends])
+        events = getEventsFromUids(self.request, uids[3:])
+        self.assertEqual(events[uids[3]].title, "Private Rendezvous")
+
 
 # ------------------------------------------------------------------------------
 class TestTZ(TestCase):
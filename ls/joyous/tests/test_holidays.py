@@ -2,7 +2,9 @@
 # Test Holidays
 # ------------------------------------------------------------------------------
 import datetime as dt
-from unittest.mock import Mock
+import random
+from threading import Thread
+from unittest.mock import Mock, patch
 from django.conf import settings
 from django.test import TestCase, override_settings
 from holidays import NZ, AU
@@ -51,6 +53,85 @@ class TestHolidays(TestCase):
             hols.get(dt.date(1999, 1, 1)), "Gliffy, Whatnot, New Year's Day"
         )
 
+    def testBetween(self):
+        hols = Holidays()
+        hols.add(dt.date(2019, 12, 31), "Hogmanay")
+        self.assertEqual(
+            hols.between(dt.date(2019, 12, 24), dt.date(2020, 1, 3)),
+            {
+                dt.date(2019, 12, 25): "Christmas Day",
+                dt.date(2019, 12, 26): "Boxing Day",
+                dt.date(2019, 12, 31): "Hogmanay",
+                dt.date(2020, 1, 1): "New Year's Day",
+                dt.date(2020, 1, 2): "Day after New Year's Day",
+            },
+        )
+
+    def testDatesOf(self):
+        hols = Holidays()
+        self.assertEqual(
+            hols.datesOf(
+                ["Anzac Day", "Waitangi Day"], dt.date(2019, 1, 1), dt.date(2020, 3, 1)
+            ),
+            [dt.date(2019, 2, 6), dt.date(2019, 4, 25), dt.date(2020, 2, 6)],
+        )
+
+    def testAddAfterIndexed(self):
+        hols = Holidays()
+        self.assertEqual(hols.get(dt.date(2021, 3, 17)), "")
+        hols.add(dt.date(2021, 3, 17), "St Patrick's Day")
+        self.assertEqual(hols.get(dt.date(2021, 3, 17)), "St Patrick's Day")
+
+    @override_settings(JOYOUS_HOLIDAYS_CACHED_YEARS=2)
+    def testCachedYears(self):
+        hols = Holidays()
+        nz = hols.srcs[1]
+        self.assertEqual(hols.get(dt.date(2019, 4, 25)), "Anzac Day")
+        self.assertEqual(hols.get(dt.date(2020, 4, 25)), "Anzac Day")
+        self.assertEqual(hols.get(dt.date(2019, 12, 25)), "Christmas Day")
+        self.assertEqual(hols.get(dt.date(2021, 4, 25)), "Anzac Day")
+        self.assertEqual(list(hols._years), [2019, 2021])
+        self.assertNotIn(2020, nz.years)
+        self.assertEqual({date.year for date in nz.keys()}, {2019, 2021})
+        self.assertEqual(hols.get(dt.date(2020, 12, 25)), "Christmas Day")
+        self.assertEqual(list(hols._years), [2021, 2020])
+        self.assertNotIn(2019, nz.years)
+
+    @override_settings(JOYOUS_HOLIDAYS_CACHED_YEARS=4)
+    def testThreads(self):
+        hols = Holidays()
+        errors = []
+
+        def getHolidays(seed):
+            years = random.Random(seed)
+            try:
+                for _ in range(300):
+                    hols.get(dt.date(years.randint(1990, 2060), 4, 25))
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [Thread(target=getHolidays, args=(num,)) for num in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    @override_settings(JOYOUS_HOLIDAYS=None)
+    def testWorkalendarBetween(self):
+        class Woral:
+            get_holiday_label = Mock(return_value=None)
+
+        woral = Woral()
+        hols = Holidays()
+        hols.add(dt.date(1999, 4, 30), "HAPPY HAPPY")
+        hols.register(woral)
+        self.assertEqual(
+            hols.between(dt.date(1999, 4, 29), dt.date(1999, 5, 1)),
+            {dt.date(1999, 4, 30): "HAPPY HAPPY"},
+        )
+        self.assertEqual(woral.get_holiday_label.call_count, 3)
+
     @override_settings(JOYOUS_HOLIDAYS=None)
     def testNoNames(self):
         hols = Holidays()
@@ -97,6 +178,17 @@ class TestHolidays(TestCase):
             ],
         )
 
+    @freeze_timetz("2017-05-31")
+    def testNamesCached(self):
+        names = Holidays().names()
+        hols = Holidays()
+        with patch.object(hols, "_findNames") as findNames:
+            self.assertEqual(hols.names(), names)
+            findNames.assert_not_called()
+        hols.add(dt.date(2017, 6, 1), "HAPPY HAPPY")
+        self.assertIn("HAPPY HAPPY", hols.names())
+        self.assertNotIn("HAPPY HAPPY", Holidays().names())
+
     @override_settings(JOYOUS_HOLIDAYS=None)
     def testSimpleNames(self):
         hols = Holidays()
@@ -169,6 +261,16 @@ class TestParser(TestCase):
         classes = [hol.__class__ for hol in hols.holidays if hol.country]
         self.assertCountEqual(classes, _PYTHON_HOLIDAYS_MAP.values())
 
+    def testLazyCountryMap(self):
+        from ls.joyous.holidays.parser import _LazyHolidaysMap
+
+        holidayMap = _LazyHolidaysMap()
+        self.assertIsNone(holidayMap._map)
+        self.assertEqual(holidayMap["NZ"].country, "NZ")
+        self.assertEqual(holidayMap["NewZealand"].country, "NZ")
+        self.assertIsNone(holidayMap.get("Ruritania"))
+        self.assertIsNotNone(holidayMap._map)
+
     def testCountriesNE(self):
         hols = parseHolidays("*[NE]")
         self.assertEqual(
@@ -10,9 +10,9 @@ from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.messages.storage.fallback import FallbackStorage
 from django.contrib import messages
-from django.test import TestCase, RequestFactory
+from django.test import TestCase, RequestFactory, override_settings
 from django.utils import timezone
-from wagtail.models import Site, Page
+from wagtail.models import Site, Page, PageLogEntry
 from ls.joyous.formats.google import get_timezone_name
 from ls.joyous.models.calendar import CalendarPage
 from ls.joyous.models import (
@@ -20,6 +20,7 @@ from ls.joyous.models import (
     RecurringEventPage,
     MultidayRecurringEventPage,
     RescheduleMultidayEventPage,
+    CancellationPage,
 )
 from ls.joyous.models import getAllEvents
 from ls.joyous.formats.ical import ICalHandler
@@ -917,6 +918,155 @@ END:VCALENDAR"""
         self.assertEqual(msg.message, "Could not load 1 iCal events")
 
 
+# ------------------------------------------------------------------------------
+@override_settings(JOYOUS_ICAL_BULK_IMPORT=True)
+class TestBulkImport(TestCase):
+    def setUp(self):
+        Site.objects.update(hostname="joy.test")
+        self.home = Page.objects.get(slug="home")
+        self.user = User.objects.create_user("i", "i@joy.test", "s3cr3t")
+        self.requestFactory = RequestFactory()
+        self.calendar = CalendarPage(owner=self.user, slug="events", title="Events")
+        self.home.add_child(instance=self.calendar)
+        self.calendar.save_revision().publish()
+        self.handler = ICalHandler()
+
+    def _getRequest(self, path="/"):
+        request = self.requestFactory.get(path)
+        request.user = self.user
+        request.site = self.home.get_site()
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        request.POST = request.POST.copy()
+        request.POST["action-publish"] = "action-publish"
+        return request
+
+    def _getStream(
+        self, modified="20190331T203219Z", title="Exercise", stamp="20190331T203301Z"
+    ):
+        return BytesIO(
+            """\
+BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//Bulk//Test//EN
+X-WR-TIMEZONE:Pacific/Auckland
+BEGIN:VEVENT
+DTSTART:20310101T050000
+DTEND:20310101T070000
+RRULE:FREQ=DAILY;COUNT=7
+EXDATE:20310103T050000
+DTSTAMP:{stamp}
+UID:exercise@joy.test
+LAST-MODIFIED:{modified}
+SUMMARY:{title}
+END:VEVENT
+BEGIN:VEVENT
+DTSTART:20310102T050000
+DTEND:20310102T070000
+DTSTAMP:20190331T203301Z
+UID:meeting1@joy.test
+LAST-MODIFIED:20190331T203219Z
+SUMMARY:Meeting
+END:VEVENT
+BEGIN:VEVENT
+DTSTART:20310109T050000
+DTEND:20310109T070000
+DTSTAMP:20190331T203301Z
+UID:meeting2@joy.test
+LAST-MODIFIED:20190331T203219Z
+SUMMARY:Meeting
+END:VEVENT
+END:VCALENDAR""".format(
+                modified=modified, title=title, stamp=stamp
+            ).encode()
+        )
+
+    def testCreate(self):
+        request = self._getRequest()
+        self.handler.load(self.calendar, request, self._getStream())
+        msgs = list(messages.get_messages(request))
+        self.assertEqual(len(msgs), 1)
+        self.assertEqual(msgs[0].message, "3 iCal events loaded")
+        events = self.calendar.get_children().live().specific()
+        self.assertEqual(
+            [event.slug for event in events], ["exercise", "meeting", "meeting-2"]
+        )
+        self.assertEqual(self.calendar.numchild, 3)
+        self.assertEqual(Page.objects.get(pk=self.calendar.pk).numchild, 3)
+        exercise = events[0]
+        self.assertIs(type(exercise), RecurringEventPage)
+        self.assertFalse(exercise._occursOn(dt.date(2031, 1, 3)))
+        cancellation = exercise.get_children().live().specific().get()
+        self.assertEqual(cancellation.slug, "2031-01-03-cancellation")
+        self.assertEqual(cancellation.live_revision, cancellation.latest_revision)
+        self.assertFalse(cancellation.has_unpublished_changes)
+        self.assertEqual(Page.find_problems(), ([], [], [], [], []))
+
+    @freeze_time("2019-04-01 08:00:00")
+    def testUpdate(self):
+        self.handler.load(self.calendar, self._getRequest(), self._getStream())
+        stream = self._getStream(modified="20190401T090000Z", title="Workout")
+        self.handler.load(self.calendar, self._getRequest(), stream)
+        events = self.calendar.get_children().live().specific()
+        self.assertEqual(
+            [event.title for event in events], ["Workout", "Meeting", "Meeting"]
+        )
+        self.assertEqual(events[0].revisions.count(), 2)
+        self.assertEqual(events[1].revisions.count(), 1)
+        self.assertEqual(events[0].get_children().count(), 1)
+        self.assertEqual(Page.find_problems(), ([], [], [], [], []))
+
+    def testPublishLog(self):
+        self.handler.load(self.calendar, self._getRequest(), self._getStream())
+        exercise = RecurringEventPage.objects.get(slug="exercise")
+        entries = PageLogEntry.objects.filter(
+            action="wagtail.publish", page__path__startswith=self.calendar.path
+        ).exclude(page=self.calendar)
+        self.assertEqual(entries.count(), 4)
+        entry = entries.get(page=exercise)
+        self.assertEqual(entry.label, "Exercise")
+        self.assertEqual(entry.user, self.user)
+        self.assertEqual(entry.revision, exercise.live_revision)
+        self.assertEqual(entry.content_type.model_class(), RecurringEventPage)
+
+    @freeze_time("2019-04-01 08:00:00")
+    def testDuplicateException(self):
+        self.handler.load(self.calendar, self._getRequest(), self._getStream())
+        exercise = RecurringEventPage.objects.get(slug="exercise")
+        first = CancellationPage.objects.child_of(exercise).get()
+        duplicate = CancellationPage(
+            owner=self.user, overrides=exercise, except_date=dt.date(2031, 1, 4)
+        )
+        exercise.add_child(instance=duplicate)
+        duplicate.save_revision().publish()
+        # the model won't save a second cancellation for the same date
+        CancellationPage.objects.filter(pk=duplicate.pk).update(
+            except_date=dt.date(2031, 1, 3)
+        )
+        stream = self._getStream(
+            modified="20190401T090000Z", title="Workout", stamp="20190401T090000Z"
+        )
+        self.handler.load(self.calendar, self._getRequest(), stream)
+        self.assertEqual(first.revisions.count(), 2)
+        self.assertEqual(duplicate.revisions.count(), 1)
+        self.assertEqual(exercise.get_children().count(), 2)
+
+    def testDraft(self):
+        request = self._getRequest()
+        del request.POST["action-publish"]
+        self.handler.load(self.calendar, request, self._getStream())
+        events = self.calendar.get_children().specific()
+        self.assertEqual(len(events), 3)
+        self.assertFalse(any(event.live for event in events))
+        self.assertTrue(all(event.has_unpublished_changes for event in events))
+        self.assertIsNone(events[0].live_revision)
+        self.assertFalse(
+            PageLogEntry.objects.filter(
+                action="wagtail.publish", page__in=events
+            ).exists()
+        )
+
+
 # ------------------------------------------------------------------------------
 class TestExport(TestCase):
     def setUp(self):
@@ -965,6 +1115,48 @@ class TestExport(TestCase):
         )
         self.assertEqual(response.content.count(b"BEGIN:VEVENT"), 2)
 
+    @override_settings(JOYOUS_ICAL_STREAMING=True)
+    def testServeCalendarStreaming(self):
+        response = self.handler.serve(self.calendar, self._getRequest("/events/"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response.get("Content-Type"), "text/calendar")
+        self.assertEqual(
+            response.get("Content-Disposition"), "attachment; filename=events.ics"
+        )
+        content = b"".join(response.streaming_content)
+        self.assertTrue(content.startswith(b"BEGIN:VCALENDAR\r\n"))
+        self.assertTrue(content.endswith(b"END:VEVENT\r\nEND:VCALENDAR\r\n"))
+        self.assertEqual(content.count(b"BEGIN:VEVENT"), 2)
+        self.assertEqual(content.count(b"BEGIN:VTIMEZONE"), 1)
+        self.assertLess(
+            content.index(b"TZID:Asia/Tokyo"), content.index(b"BEGIN:VEVENT")
+        )
+        self.assertIn(b"SUMMARY:Mercy Dice Run", content)
+        self.assertIn(b"SUMMARY:Workshop", content)
+
+    @override_settings(
+        JOYOUS_ICAL_FRAGMENT_CACHE=True,
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        },
+    )
+    def testServeCalendarFragments(self):
+        response = self.handler.serve(self.calendar, self._getRequest("/events/"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.count(b"BEGIN:VEVENT"), 2)
+        self.assertEqual(response.content.count(b"BEGIN:VTIMEZONE"), 1)
+        self.assertTrue(response.content.endswith(b"END:VEVENT\r\nEND:VCALENDAR\r\n"))
+        self.assertIn(b"SUMMARY:Mercy Dice Run", response.content)
+        SimpleEventPage.objects.filter(pk=self.dicerun.pk).update(title="Dice Walk")
+        response = self.handler.serve(self.calendar, self._getRequest("/events/"))
+        self.assertIn(b"SUMMARY:Mercy Dice Run", response.content)
+        self.dicerun.title = "Dice Walk"
+        self.dicerun.save_revision().publish()
+        response = self.handler.serve(self.calendar, self._getRequest("/events/"))
+        self.assertIn(b"SUMMARY:Dice Walk", response.content)
+        self.assertNotIn(b"SUMMARY:Mercy Dice Run", response.content)
+
     def testServeEvent(self):
         response = self.handler.serve(
             self.dicerun, self._getRequest("/events/mercy-dice-run/")
@@ -0,0 +1,213 @@
+# ------------------------------------------------------------------------------
+# Test Import Jobs
+# ------------------------------------------------------------------------------
+import datetime as dt
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, RequestFactory, override_settings
+from django.utils import timezone
+from wagtail.admin.panels import get_form_for_model
+from wagtail.models import Site, Page
+from ls.joyous.models import CalendarPage, CalendarPageForm, SimpleEventPage
+from ls.joyous.models import ImportJob, runImportJob, runQueuedImports
+from ls.joyous.models.imports import queueImport, _runImportInThread
+from ls.joyous.formats.ical import ICalHandler, VResults
+
+ICS = b"""\
+BEGIN:VCALENDAR\r
+VERSION:2.0\r
+PRODID:-//Joy//Test//EN\r
+BEGIN:VEVENT\r
+DTSTART:20310101T050000Z\r
+DTEND:20310101T070000Z\r
+DTSTAMP:20190331T203301Z\r
+UID:working-bee@joy.test\r
+SUMMARY:Working Bee\r
+END:VEVENT\r
+END:VCALENDAR\r
+"""
+
+
+# ------------------------------------------------------------------------------
+@override_settings(JOYOUS_IMPORT_JOBS=True, JOYOUS_IMPORT_THREADS=0)
+class Test(TestCase):
+    def setUp(self):
+        self.mediaRoot = tempfile.mkdtemp()
+        self.mediaSettings = override_settings(MEDIA_ROOT=self.mediaRoot)
+        self.mediaSettings.enable()
+        Site.objects.update(hostname="joy.test")
+        self.home = Page.objects.get(slug="home")
+        self.user = User.objects.create_superuser("i", "i@joy.test", "s3cr3t")
+        self.calendar = CalendarPage(owner=self.user, slug="events", title="Events")
+        self.home.add_child(instance=self.calendar)
+        self.calendar.save_revision().publish()
+
+    def tearDown(self):
+        self.mediaSettings.disable()
+        shutil.rmtree(self.mediaRoot, ignore_errors=True)
+
+    def _getRequest(self):
+        request = RequestFactory().get("/")
+        request.user = self.user
+        request.site = self.home.get_site()
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        request.POST = request.POST.copy()
+        request.POST["action-publish"] = "action-publish"
+        return request
+
+    def _queue(self, data=ICS, name="bees.ics"):
+        upload = SimpleUploadedFile(name, data, content_type="text/calendar")
+        return queueImport(self.calendar, self._getRequest(), upload, utc2local=True)
+
+    def testQueued(self):
+        job = self._queue()
+        self.assertEqual(job.status, ImportJob.QUEUED)
+        self.assertEqual(job.filename, "bees.ics")
+        self.assertTrue(job.publish)
+        self.assertTrue(job.utc2local)
+        self.assertEqual(job.user, self.user)
+        self.assertEqual(SimpleEventPage.objects.count(), 0)
+
+    # saving one at a time patches DateTimeField for all the threads
+    @patch("ls.joyous.formats.ical._saveRevision", side_effect=AssertionError)
+    def testRun(self, saveRevision):
+        job = self._queue()
+        self.assertTrue(runImportJob(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.DONE)
+        self.assertEqual(job.success, 1)
+        self.assertEqual(job.fail, 0)
+        self.assertEqual(job.messages, [["success", "1 iCal events loaded"]])
+        self.assertFalse(job.upload)
+        self.assertIsNotNone(job.finished_at)
+        event = SimpleEventPage.objects.get()
+        self.assertEqual(event.title, "Working Bee")
+        self.assertTrue(event.live)
+        self.assertEqual(event.get_parent().pk, self.calendar.pk)
+
+    def testRunOnce(self):
+        job = self._queue()
+        self.assertTrue(runImportJob(job))
+        self.assertFalse(runImportJob(job))
+        self.assertEqual(SimpleEventPage.objects.count(), 1)
+
+    def testAbandoned(self):
+        job = self._queue()
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.RUNNING,
+            started_at=timezone.now() - dt.timedelta(hours=3),
+            heartbeat_at=timezone.now() - dt.timedelta(hours=2),
+            success=3,
+        )
+        self.assertEqual(runQueuedImports(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.DONE)
+        self.assertEqual(job.success, 1)
+        self.assertEqual(SimpleEventPage.objects.count(), 1)
+
+    def testStillRunning(self):
+        job = self._queue()
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.RUNNING,
+            started_at=timezone.now() - dt.timedelta(hours=2),
+            heartbeat_at=timezone.now(),
+        )
+        self.assertEqual(runQueuedImports(), 0)
+        self.assertFalse(runImportJob(job))
+
+    def testHeartbeat(self):
+        job = self._queue()
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.RUNNING,
+            started_at=timezone.now() - dt.timedelta(hours=3),
+            heartbeat_at=timezone.now() - dt.timedelta(hours=2),
+        )
+        job = ImportJob.objects.get(pk=job.pk)
+        job._addProgress(VResults(success=1))
+        job.refresh_from_db()
+        self.assertEqual(job.success, 1)
+        self.assertGreater(job.heartbeat_at, timezone.now() - dt.timedelta(minutes=1))
+        self.assertEqual(runQueuedImports(), 0)
+
+    def testHandlerWithoutProgress(self):
+        class Handler:
+            def load(self, page, request, upload, utc2local=False):
+                pass
+
+        job = self._queue()
+        handler = Handler()
+        with patch.object(CalendarPageForm, "importHandler", handler):
+            self.assertTrue(runImportJob(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.DONE)
+
+    @patch("ls.joyous.models.imports.connection")
+    def testThreadLogsErrors(self, connection):
+        job = self._queue()
+        with patch(
+            "ls.joyous.models.imports.runImportJob", side_effect=RuntimeError
+        ), self.assertLogs("ls.joyous.models.imports", "ERROR"):
+            _runImportInThread(job.pk)
+        connection.close.assert_called_once_with()
+
+    def testNotParsed(self):
+        job = self._queue(b"This is not a calendar", "bad.ics")
+        self.assertEqual(runQueuedImports(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.DONE)
+        self.assertEqual(job.error, 1)
+        self.assertEqual(job.messages[0][0], "error")
+
+    @override_settings(JOYOUS_ICAL_BULK_IMPORT=True)
+    def testProgress(self):
+        job = self._queue()
+        progress = []
+        handler = ICalHandler()
+        with job.upload.open("rb") as upload:
+            results = handler.load(
+                self.calendar,
+                job._makeRequest(),
+                upload,
+                progress=progress.append,
+            )
+        self.assertEqual(results.success, 1)
+        self.assertEqual(sum(part.success for part in progress), 1)
+
+    def testCommand(self):
+        self._queue()
+        out = StringIO()
+        call_command("joyous_run_imports", stdout=out)
+        self.assertEqual(out.getvalue().strip(), "Ran 1 import jobs")
+        self.assertEqual(ImportJob.objects.get().status, ImportJob.DONE)
+
+    @override_settings(JOYOUS_IMPORT_THREADS=1)
+    def testThreadStartedOnCommit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self._queue()
+        self.assertEqual(len(callbacks), 1)
+
+    def testFormSave(self):
+        request = self._getRequest()
+        Form = get_form_for_model(CalendarPage, form_class=CalendarPageForm)
+        setattr(self.calendar, "__joyous_edit_request", request)
+        form = Form(instance=self.calendar, parent_page=self.home)
+        upload = SimpleUploadedFile("bees.ics", ICS, content_type="text/calendar")
+        form.cleaned_data = {"utc2local": False, "upload": upload}
+        with patch.object(CalendarPageForm, "importHandler", ICalHandler()):
+            form.save()
+        self.assertEqual(SimpleEventPage.objects.count(), 0)
+        job = ImportJob.objects.get()
+        self.assertEqual(job.calendar_id, self.calendar.pk)
+        self.assertFalse(job.utc2local)
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
@@ -0,0 +1,147 @@
+# ------------------------------------------------------------------------------
+# Test Indexed Start Times
+# ------------------------------------------------------------------------------
+import datetime as dt
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.contrib.auth.models import User
+from wagtail.models import Page
+from ls.joyous.holidays import Holidays
+from ls.joyous.utils.recurrence import Recurrence
+from ls.joyous.utils.recurrence import WEEKLY, MO, WE
+from ls.joyous.models import (
+    CalendarPage,
+    GeneralCalendarPage,
+    SimpleEventPage,
+    RecurringEventPage,
+    CancellationPage,
+    ClosedForHolidaysPage,
+    getAllUpcomingEvents,
+    getAllPastEvents,
+)
+from .testutils import freeze_timetz, datetimetz
+
+
+# ------------------------------------------------------------------------------
+@override_settings(JOYOUS_INDEXED_STARTS=True)
+class Test(TestCase):
+    @freeze_timetz("2013-01-08 10:00")
+    def setUp(self):
+        self.home = Page.objects.get(slug="home")
+        self.user = User.objects.create_user("i", "i@foo.test", "s3cr3t")
+        self.request = RequestFactory().get("/test")
+        self.request.user = self.user
+        self.request.session = {}
+        self.calendar = GeneralCalendarPage(
+            owner=self.user, slug="events", title="Events"
+        )
+        self.home.add_child(instance=self.calendar)
+        self.show = SimpleEventPage(
+            owner=self.user,
+            slug="pet-show",
+            title="Pet Show",
+            date=dt.date(2013, 1, 5),
+            time_from=dt.time(11),
+            time_to=dt.time(17, 30),
+        )
+        self.calendar.add_child(instance=self.show)
+        self.meeting = RecurringEventPage(
+            owner=self.user,
+            slug="meeting",
+            title="Meeting",
+            repeat=Recurrence(
+                dtstart=dt.date(2012, 6, 1), freq=WEEKLY, byweekday=[MO, WE]
+            ),
+            time_from=dt.time(13),
+            time_to=dt.time(15, 30),
+        )
+        self.calendar.add_child(instance=self.meeting)
+
+    def testStoredOnSave(self):
+        show = SimpleEventPage.objects.get(id=self.show.id)
+        self.assertIsNone(show.next_start_utc)
+        self.assertEqual(show.last_start_utc, datetimetz(2013, 1, 5, 11, 0))
+        meeting = RecurringEventPage.objects.get(id=self.meeting.id)
+        self.assertEqual(meeting.next_start_utc, datetimetz(2013, 1, 9, 13, 0))
+        self.assertEqual(meeting.last_start_utc, datetimetz(2013, 1, 7, 13, 0))
+
+    @freeze_timetz("2013-01-08 10:00")
+    def testCancellationRefreshesParent(self):
+        cancellation = CancellationPage(
+            owner=self.user,
+            overrides=self.meeting,
+            except_date=dt.date(2013, 1, 9),
+            cancellation_title="Meeting Cancelled",
+        )
+        self.meeting.add_child(instance=cancellation)
+        meeting = RecurringEventPage.objects.get(id=self.meeting.id)
+        self.assertEqual(meeting.next_start_utc, datetimetz(2013, 1, 14, 13, 0))
+
+    @freeze_timetz("2013-01-08 10:00")
+    def testDraftNotStored(self):
+        self.show.save_revision().publish()
+        self.show.date = dt.date(2013, 2, 5)
+        self.show.save_revision()
+        show = SimpleEventPage.objects.get(id=self.show.id)
+        self.assertIsNone(show.next_start_utc)
+        self.assertEqual(show.last_start_utc, datetimetz(2013, 1, 5, 11, 0))
+        self.assertEqual(SimpleEventPage.events.past().count(), 1)
+        show.get_latest_revision().publish()
+        show = SimpleEventPage.objects.get(id=self.show.id)
+        self.assertEqual(show.next_start_utc, datetimetz(2013, 2, 5, 11, 0))
+        self.assertEqual(SimpleEventPage.events.upcoming().count(), 1)
+
+    @freeze_timetz("2013-01-08 10:00")
+    def testCalendarHolidays(self):
+        holidays = Holidays()
+        holidays.add(dt.date(2013, 1, 9), "Meeting Free Day")
+        closedHols = ClosedForHolidaysPage(
+            owner=self.user,
+            overrides=self.meeting,
+            all_holidays=True,
+            holidays=holidays,
+        )
+        with patch.object(CalendarPage, "holidays", holidays):
+            self.meeting.add_child(instance=closedHols)
+        meeting = RecurringEventPage.objects.get(id=self.meeting.id)
+        self.assertEqual(meeting.next_start_utc, datetimetz(2013, 1, 14, 13, 0))
+        RecurringEventPage.objects.filter(id=self.meeting.id).update(
+            next_start_utc=None
+        )
+        with patch.object(CalendarPage, "holidays", holidays):
+            call_command("joyous_refresh_starts", stdout=StringIO())
+        meeting = RecurringEventPage.objects.get(id=self.meeting.id)
+        self.assertEqual(meeting.next_start_utc, datetimetz(2013, 1, 14, 13, 0))
+
+    @freeze_timetz("2013-01-08 10:00")
+    def testUpcomingInSql(self):
+        qs = RecurringEventPage.events.upcoming()
+        self.assertIsNone(qs.postFilter)
+        self.assertEqual(qs.count(), 1)
+        self.assertEqual(SimpleEventPage.events.upcoming().count(), 0)
+        self.assertEqual(SimpleEventPage.events.past().count(), 1)
+
+    @freeze_timetz("2013-01-10 10:00")
+    def testStaleRefreshed(self):
+        qs = RecurringEventPage.events.upcoming()
+        self.assertEqual(list(qs), [self.meeting])
+        meeting = RecurringEventPage.objects.get(id=self.meeting.id)
+        self.assertEqual(meeting.next_start_utc, datetimetz(2013, 1, 14, 13, 0))
+        self.assertEqual(meeting.last_start_utc, datetimetz(2013, 1, 9, 13, 0))
+
+    @freeze_timetz("2012-12-01 10:00")
+    def testTimeGoesBackwards(self):
+        events = getAllUpcomingEvents(self.request, home=self.calendar)
+        self.assertEqual([event.page for event in events], [self.meeting, self.show])
+
+    @freeze_timetz("2013-01-08 10:00")
+    def testGetAllPastEvents(self):
+        events = getAllPastEvents(self.request, home=self.calendar)
+        self.assertEqual([event.page for event in events], [self.meeting, self.show])
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
@@ -0,0 +1,62 @@
+# ------------------------------------------------------------------------------
+# Test Date Intervals
+# ------------------------------------------------------------------------------
+import datetime as dt
+from django.test import TestCase
+from ls.joyous.utils.intervals import DateIntervals
+
+
+# ------------------------------------------------------------------------------
+class TestDateIntervals(TestCase):
+    def setUp(self):
+        self.intervals = DateIntervals(
+            [
+                (dt.date(2020, 1, 10), dt.date(2020, 1, 20), "a"),
+                (dt.date(2020, 1, 15), dt.date(2020, 1, 16), "b"),
+                (dt.date(2020, 3, 1), None, "c"),
+            ]
+        )
+
+    def testGet(self):
+        self.assertIsNone(self.intervals.get(dt.date(2020, 1, 9)))
+        self.assertEqual(self.intervals.get(dt.date(2020, 1, 10)), "a")
+        self.assertEqual(self.intervals.get(dt.date(2020, 1, 15)), "b")
+        self.assertEqual(self.intervals.get(dt.date(2020, 1, 17)), "a")
+        self.assertEqual(self.intervals.get(dt.date(2020, 1, 20)), "a")
+        self.assertEqual(self.intervals.get(dt.date(2020, 2, 1), "-"), "-")
+        self.assertEqual(self.intervals.get(dt.date(2020, 3, 1)), "c")
+        self.assertEqual(self.intervals.get(dt.date(9999, 12, 31)), "c")
+
+    def testContains(self):
+        self.assertIn(dt.date(2020, 1, 12), self.intervals)
+        self.assertNotIn(dt.date(2020, 1, 21), self.intervals)
+        self.assertIn(dt.date(2525, 1, 1), self.intervals)
+
+    def testWithin(self):
+        within = list(self.intervals.within(dt.date(2020, 1, 14), dt.date(2020, 1, 17)))
+        self.assertEqual(
+            within,
+            [
+                (dt.date(2020, 1, 14), "a"),
+                (dt.date(2020, 1, 15), "b"),
+                (dt.date(2020, 1, 16), "b"),
+                (dt.date(2020, 1, 17), "a"),
+            ],
+        )
+        within = list(self.intervals.within(dt.date(2020, 2, 27), dt.date(2020, 3, 2)))
+        self.assertEqual(
+            within, [(dt.date(2020, 3, 1), "c"), (dt.date(2020, 3, 2), "c")]
+        )
+
+    def testEmpty(self):
+        intervals = DateIntervals()
+        self.assertFalse(intervals)
+        self.assertIsNone(intervals.get(dt.date(2020, 1, 1)))
+        self.assertEqual(
+            list(intervals.within(dt.date(2020, 1, 1), dt.date(2020, 12, 31))), []
+        )
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
@@ -0,0 +1,115 @@
+# ------------------------------------------------------------------------------
+# Test Lazy Evaluation Utilities
+# ------------------------------------------------------------------------------
+from django.core.paginator import EmptyPage
+from django.test import TestCase
+from ls.joyous.utils.lazy import LazyList, LazyPaginator, CursorPage
+from ls.joyous.utils.lazy import mergeSorted, sortNearlySorted
+
+
+# ------------------------------------------------------------------------------
+class TestLazyList(TestCase):
+    def testGetItem(self):
+        items = LazyList(iter(range(100)))
+        self.assertEqual(items.evaluated, 0)
+        self.assertEqual(items[5], 5)
+        self.assertEqual(items.evaluated, 6)
+        self.assertEqual(items[10:20], list(range(10, 20)))
+        self.assertEqual(items.evaluated, 20)
+        self.assertFalse(items.exhausted)
+        self.assertEqual(items[-1], 99)
+        self.assertTrue(items.exhausted)
+
+    def testIter(self):
+        items = LazyList(iter("abc"))
+        self.assertEqual(list(items), ["a", "b", "c"])
+        self.assertEqual(list(items), ["a", "b", "c"])
+        self.assertEqual(len(items), 3)
+
+    def testEmpty(self):
+        items = LazyList(iter([]))
+        self.assertFalse(items)
+        self.assertEqual(len(items), 0)
+        with self.assertRaises(IndexError):
+            items[0]
+
+
+# ------------------------------------------------------------------------------
+class TestSorting(TestCase):
+    def testSortNearlySorted(self):
+        # each item is (key, bound) in order of bound
+        items = [(3, 1), (2, 2), (5, 3), (4, 4), (9, 5), (6, 6)]
+        ordered = sortNearlySorted(
+            iter(items), key=lambda i: i[0], bound=lambda i: i[1]
+        )
+        self.assertEqual([i[0] for i in ordered], [2, 3, 4, 5, 6, 9])
+
+    def testSortNearlySortedReverse(self):
+        items = [(7, 9), (9, 9), (5, 6), (6, 6), (1, 3)]
+        ordered = sortNearlySorted(
+            iter(items), key=lambda i: i[0], bound=lambda i: i[1], reverse=True
+        )
+        self.assertEqual([i[0] for i in ordered], [9, 7, 6, 5, 1])
+
+    def testMergeSorted(self):
+        merged = mergeSorted([iter([1, 4, 7]), iter([2, 3, 8])], key=lambda i: i)
+        self.assertIsInstance(merged, LazyList)
+        self.assertEqual(merged[:3], [1, 2, 3])
+        self.assertEqual(list(merged), [1, 2, 3, 4, 7, 8])
+
+
+# ------------------------------------------------------------------------------
+class TestLazyPaginator(TestCase):
+    def testFirstPage(self):
+        items = LazyList(iter(range(1000)))
+        page = LazyPaginator(items, 25).page(1)
+        self.assertEqual(list(page), list(range(25)))
+        self.assertTrue(page.has_next())
+        self.assertEqual(page.paginator.num_pages, 2)
+        self.assertEqual(items.evaluated, 26)
+
+    def testLastPage(self):
+        items = LazyList(iter(range(60)))
+        paginator = LazyPaginator(items, 25)
+        page = paginator.page(3)
+        self.assertEqual(list(page), list(range(50, 60)))
+        self.assertFalse(page.has_next())
+        self.assertEqual(paginator.num_pages, 3)
+
+    def testEmptyPage(self):
+        items = LazyList(iter(range(30)))
+        paginator = LazyPaginator(items, 25)
+        with self.assertRaises(EmptyPage):
+            paginator.page(3)
+        self.assertEqual(paginator.num_pages, 2)
+
+    def testNoItems(self):
+        paginator = LazyPaginator(LazyList(iter([])), 25)
+        page = paginator.page(1)
+        self.assertEqual(list(page), [])
+        self.assertFalse(page.has_other_pages())
+
+
+# ------------------------------------------------------------------------------
+class TestCursorPage(TestCase):
+    def testFirstPage(self):
+        items = LazyList(iter(range(1000)))
+        page = CursorPage(items, 25, "after", str)
+        self.assertEqual(list(page), list(range(25)))
+        self.assertEqual(items.evaluated, 26)
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+        self.assertEqual(page.next_cursor, "24")
+
+    def testLastPage(self):
+        items = LazyList(iter(range(10)))
+        page = CursorPage(items, 25, "before", str, isFirst=False)
+        self.assertEqual(len(page), 10)
+        self.assertFalse(page.has_next())
+        self.assertTrue(page.has_other_pages())
+        self.assertIsNone(page.next_cursor)
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
@@ -0,0 +1,171 @@
+# ------------------------------------------------------------------------------
+# Test Materialized Occurrences
+# ------------------------------------------------------------------------------
+import datetime as dt
+from unittest.mock import patch
+from django.test import RequestFactory, TestCase, override_settings
+from django.contrib.auth.models import User
+from wagtail.models import Page
+from ls.joyous.holidays import Holidays
+from ls.joyous.utils.recurrence import Recurrence
+from ls.joyous.utils.recurrence import WEEKLY, MO, WE
+from ls.joyous.models import (
+    CalendarPage,
+    GeneralCalendarPage,
+    SimpleEventPage,
+    RecurringEventPage,
+    CancellationPage,
+    ExtraInfoPage,
+    ClosedForHolidaysPage,
+    EventOccurrence,
+    refreshOccurrences,
+    refreshAllOccurrences,
+    getAllEventsByDay,
+    getAllUpcomingEvents,
+    getAllPastEvents,
+)
+from .testutils import freeze_timetz
+
+
+# ------------------------------------------------------------------------------
+@override_settings(JOYOUS_OCCURRENCES=True, JOYOUS_OCCURRENCES_WINDOW=(60, 60))
+class Test(TestCase):
+    def setUp(self):
+        self.home = Page.objects.get(slug="home")
+        self.user = User.objects.create_user("i", "i@foo.test", "s3cr3t")
+        self.request = RequestFactory().get("/test")
+        self.request.user = self.user
+        self.request.session = {}
+        self.calendar = GeneralCalendarPage(
+            owner=self.user, slug="events", title="Events"
+        )
+        self.home.add_child(instance=self.calendar)
+        self.show = SimpleEventPage(
+            owner=self.user,
+            slug="pet-show",
+            title="Pet Show",
+            date=dt.date(2013, 1, 5),
+            time_from=dt.time(11),
+            time_to=dt.time(17, 30),
+        )
+        self.calendar.add_child(instance=self.show)
+        self.meeting = RecurringEventPage(
+            owner=self.user,
+            slug="meeting",
+            title="Meeting",
+            repeat=Recurrence(
+                dtstart=dt.date(2012, 6, 1), freq=WEEKLY, byweekday=[MO, WE]
+            ),
+            time_from=dt.time(13),
+            time_to=dt.time(15, 30),
+        )
+        self.calendar.add_child(instance=self.meeting)
+        self.cancellation = CancellationPage(
+            owner=self.user,
+            overrides=self.meeting,
+            except_date=dt.date(2013, 1, 9),
+            cancellation_title="Meeting Cancelled",
+        )
+        self.meeting.add_child(instance=self.cancellation)
+        self.info = ExtraInfoPage(
+            owner=self.user,
+            overrides=self.meeting,
+            except_date=dt.date(2013, 1, 14),
+            extra_title="Annual Meeting",
+        )
+        self.meeting.add_child(instance=self.info)
+
+    @freeze_timetz("2013-01-08 10:00")
+    def testRefresh(self):
+        occurrences = refreshOccurrences(self.meeting)
+        self.assertEqual(
+            EventOccurrence.objects.filter(event=self.meeting).count(),
+            len(occurrences),
+        )
+        cancelled = EventOccurrence.objects.get(exception=self.cancellation)
+        self.assertTrue(cancelled.cancelled)
+        info = EventOccurrence.objects.get(exception=self.info)
+        self.assertFalse(info.cancelled)
+        self.assertEqual(info.path, self.meeting.path)
+        # the window and the anchor either side of it
+        self.assertEqual(occurrences[0].start.date(), dt.date(2012, 11, 7))
+        self.assertEqual(occurrences[-1].start.date(), dt.date(2013, 3, 11))
+
+    @freeze_timetz("2013-01-08 10:00")
+    def testCalendarHolidays(self):
+        holidays = Holidays()
+        holidays.add(dt.date(2013, 1, 16), "Meeting Free Day")
+        closedHols = ClosedForHolidaysPage(
+            owner=self.user,
+            overrides=self.meeting,
+            all_holidays=True,
+            cancellation_title="No Meeting",
+            holidays=holidays,
+        )
+        self.meeting.add_child(instance=closedHols)
+        with patch.object(CalendarPage, "holidays", holidays):
+            refreshAllOccurrences()
+        closed = EventOccurrence.objects.filter(exception=closedHols)
+        self.assertIn(dt.date(2013, 1, 16), [item.start.date() for item in closed])
+        self.assertTrue(all(item.cancelled for item in closed))
+
+    @freeze_timetz("2013-01-08 10:00")
+    def testRefreshUnpublished(self):
+        refreshOccurrences(self.meeting)
+        self.meeting.unpublish()
+        self.assertFalse(EventOccurrence.objects.filter(event=self.meeting).exists())
+
+    @freeze_timetz("2013-01-08 10:00")
+    def testRefreshAll(self):
+        count = refreshAllOccurrences()
+        self.assertEqual(EventOccurrence.objects.count(), count)
+        self.assertEqual(EventOccurrence.objects.filter(event=self.show).count(), 1)
+
+    @freeze_timetz("2013-01-08 10:00")
+    def testGetAllEventsByDay(self):
+        refreshAllOccurrences()
+        events = getAllEventsByDay(
+            self.request, dt.date(2013, 1, 1), dt.date(2013, 1, 31)
+        )
+        self.assertEqual(len(events), 31)
+        self.assertEqual([e.title for e in events[4].days_events], ["Pet Show"])
+        self.assertEqual(
+            [e.title for e in events[8].days_events], ["Meeting Cancelled"]
+        )
+        self.assertEqual([e.title for e in events[13].days_events], ["Annual Meeting"])
+        self.assertEqual([e.title for e in events[20].days_events], ["Meeting"])
+        with self.settings(JOYOUS_OCCURRENCES=False):
+            expanded = getAllEventsByDay(
+                self.request, dt.date(2013, 1, 1), dt.date(2013, 1, 31)
+            )
+        self.assertEqual(
+            [[e.page.id for e in evod.days_events] for evod in events],
+            [[e.page.id for e in evod.days_events] for evod in expanded],
+        )
+
+    @freeze_timetz("2013-01-08 10:00")
+    def testGetAllUpcomingEvents(self):
+        refreshAllOccurrences()
+        events = getAllUpcomingEvents(self.request, home=self.calendar)
+        self.assertEqual(
+            [(e.title, e.page.id) for e in events],
+            [
+                ("Meeting Cancelled", self.cancellation.id),
+                ("Annual Meeting", self.info.id),
+                ("Meeting", self.meeting.id),
+            ],
+        )
+
+    @freeze_timetz("2013-01-08 10:00")
+    def testGetAllPastEvents(self):
+        refreshAllOccurrences()
+        events = getAllPastEvents(self.request, home=self.calendar)
+        self.assertEqual(
+            [(e.title, e.page.id) for e in events],
+            [("Meeting", self.meeting.id), ("Pet Show", self.show.id)],
+        )
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
@@ -1,8 +1,9 @@
 # ------------------------------------------------------------------------------
 import datetime as dt
-from dateutil.rrule import rrule
+import random
+from dateutil.rrule import rrule, rrulebase
 from django.test import TestCase
-from ls.joyous.utils.recurrence import Recurrence, Weekday
+from ls.joyous.utils.recurrence import Recurrence, Weekday, expandMany
 from ls.joyous.utils.recurrence import MO, TU, WE, TH, FR, SA, SU
 from ls.joyous.utils.recurrence import YEARLY, MONTHLY, WEEKLY, DAILY
 
@@ -303,6 +304,184 @@ class TestGetWhen(TestCase):
         )
 
 
+# ------------------------------------------------------------------------------
+class TestSeek(TestCase):
+    RULES = [
+        dict(dtstart=dt.date(2012, 3, 7), freq=DAILY),
+        dict(dtstart=dt.date(2012, 3, 7), freq=DAILY, interval=3, byweekday=[MO, FR]),
+        dict(dtstart=dt.date(1989, 1, 1), freq=WEEKLY, byweekday=[MO, WE, FR]),
+        dict(dtstart=dt.date(2001, 8, 30), freq=WEEKLY, interval=2, wkst=SU),
+        dict(dtstart=dt.date(2000, 1, 31), freq=MONTHLY),
+        dict(dtstart=dt.date(2000, 1, 31), freq=MONTHLY, bymonthday=[1, -1]),
+        dict(dtstart=dt.date(2005, 5, 5), freq=MONTHLY, interval=5, byweekday=[FR(2)]),
+        dict(dtstart=dt.date(1999, 7, 1), freq=YEARLY, bymonth=[2], bymonthday=[29]),
+        dict(
+            dtstart=dt.date(1998, 1, 1),
+            freq=YEARLY,
+            interval=2,
+            bymonth=[9],
+            byweekday=[SA(-1)],
+            until=dt.date(2030, 1, 1),
+        ),
+    ]
+    DATES = [dt.date(1990, 5, 1), dt.date(2012, 3, 7), dt.date(2024, 2, 29)]
+
+    # Compare with dateutil's methods, which count from dtstart
+
+    def testAfter(self):
+        for rule in self.RULES:
+            rr = Recurrence(**rule)
+            for myDate in self.DATES:
+                for inc in (False, True):
+                    with self.subTest(rr=rr, myDate=myDate, inc=inc):
+                        self.assertEqual(
+                            rr.after(myDate, inc), rrulebase.after(rr, myDate, inc)
+                        )
+
+    def testBefore(self):
+        for rule in self.RULES:
+            rr = Recurrence(**rule)
+            for myDate in self.DATES:
+                for inc in (False, True):
+                    with self.subTest(rr=rr, myDate=myDate, inc=inc):
+                        self.assertEqual(
+                            rr.before(myDate, inc), rrulebase.before(rr, myDate, inc)
+                        )
+
+    def testBetween(self):
+        for rule in self.RULES:
+            rr = Recurrence(**rule)
+            for myDate in self.DATES:
+                toDate = myDate + dt.timedelta(days=100)
+                with self.subTest(rr=rr, myDate=myDate):
+                    self.assertEqual(
+                        rr.between(myDate, toDate, inc=True),
+                        rrulebase.between(rr, myDate, toDate, inc=True),
+                    )
+
+    def testXafter(self):
+        for rule in self.RULES:
+            rr = Recurrence(**rule)
+            for myDate in self.DATES:
+                with self.subTest(rr=rr, myDate=myDate):
+                    self.assertEqual(
+                        list(rr.xafter(myDate, count=10)),
+                        list(rrulebase.xafter(rr, myDate, count=10)),
+                    )
+
+    def testCannotSeek(self):
+        rr = Recurrence(dtstart=dt.date(2012, 3, 7), freq=DAILY, count=10)
+        self.assertFalse(rr._canSeek())
+        self.assertEqual(rr.after(dt.date(2012, 3, 15)), dt.date(2012, 3, 16))
+        self.assertIsNone(rr.after(dt.date(2012, 3, 16)))
+        rr = Recurrence(
+            dtstart=dt.date(2012, 1, 1),
+            freq=MONTHLY,
+            bysetpos=-1,
+            byweekday=[MO, TU, WE, TH, FR],
+        )
+        self.assertFalse(rr._canSeek())
+        self.assertEqual(rr.after(dt.date(2020, 2, 1)), dt.date(2020, 2, 28))
+
+
+# ------------------------------------------------------------------------------
+class TestContains(TestCase):
+    def testMonthly(self):
+        rr = Recurrence(
+            dtstart=dt.date(2000, 1, 1), freq=MONTHLY, interval=2, byweekday=[MO(-1)]
+        )
+        self.assertIn(dt.date(2031, 3, 31), rr)
+        self.assertNotIn(dt.date(2031, 3, 24), rr)
+        self.assertNotIn(dt.date(2031, 4, 28), rr)
+        self.assertNotIn(dt.date(1999, 11, 29), rr)
+
+    def testUntil(self):
+        rr = Recurrence(
+            dtstart=dt.date(2009, 6, 1),
+            freq=WEEKLY,
+            byweekday=[TU, TH],
+            until=dt.date(2009, 6, 30),
+        )
+        self.assertIn(dt.date(2009, 6, 30), rr)
+        self.assertNotIn(dt.date(2009, 7, 2), rr)
+
+    def testCannotSeek(self):
+        rr = Recurrence(dtstart=dt.date(2012, 3, 7), freq=DAILY, count=10)
+        self.assertIn(dt.date(2012, 3, 16), rr)
+        self.assertNotIn(dt.date(2012, 3, 17), rr)
+
+    def testRandomRules(self):
+        # Compare with dateutil, which iterates from dtstart
+        rand = random.Random(5545)
+        weekdays = [MO, TU, WE, TH, FR, SA, SU]
+        for _ in range(200):
+            freq = rand.choice([YEARLY, MONTHLY, WEEKLY, DAILY])
+            rule = dict(
+                dtstart=dt.date(
+                    rand.randint(2000, 2011), rand.randint(1, 12), rand.randint(1, 28)
+                ),
+                freq=freq,
+                interval=rand.choice([1, 1, 2, 3]),
+                wkst=rand.randint(0, 6),
+            )
+            if rand.random() < 0.3:
+                rule["until"] = rule["dtstart"] + dt.timedelta(
+                    days=rand.randint(0, 3000)
+                )
+            choice = rand.random()
+            if freq in (MONTHLY, YEARLY) and choice < 0.3:
+                rule["byweekday"] = [
+                    rand.choice(weekdays)(rand.choice([1, 2, 4, -1, -2]))
+                ]
+            elif choice < 0.6:
+                rule["byweekday"] = rand.sample(weekdays, rand.randint(1, 3))
+            elif choice < 0.8 and freq != WEEKLY:
+                rule["bymonthday"] = rand.sample([1, 2, 15, 28, -1, -2], 2)
+            if freq == YEARLY:
+                rule["bymonth"] = rand.sample(range(1, 13), rand.randint(1, 3))
+            rr = Recurrence(**rule)
+            myDate = rule["dtstart"] + dt.timedelta(days=rand.randint(-50, 3000))
+            # test occurrences as well as random dates
+            occurence = rr.after(myDate, inc=True)
+            for date in (myDate, occurence):
+                if date is not None:
+                    with self.subTest(rr=rr, date=date):
+                        self.assertEqual(date in rr, rrulebase.__contains__(rr, date))
+
+
+# ------------------------------------------------------------------------------
+class TestExpandMany(TestCase):
+    def testExpandMany(self):
+        rules = [
+            Recurrence(dtstart=dt.date(2009, 1, 1), freq=WEEKLY, byweekday=[MO, TH]),
+            Recurrence(dtstart=dt.date(2019, 3, 1), freq=MONTHLY, byweekday=[FR(-1)]),
+            Recurrence(dtstart=dt.date(1990, 3, 10), freq=YEARLY),
+            Recurrence(dtstart=dt.date(2020, 3, 20), freq=DAILY, count=3),
+            Recurrence(dtstart=dt.date(2020, 4, 1), freq=DAILY),
+        ]
+        fromDate = dt.date(2020, 3, 1)
+        toDate = dt.date(2020, 3, 31)
+        expected = [
+            (index, occurence)
+            for index, rule in enumerate(rules)
+            for occurence in rrulebase.between(rule, fromDate, toDate, inc=True)
+        ]
+        self.assertEqual(expandMany(rules, fromDate, toDate), expected)
+        self.assertEqual(
+            expandMany(rules, fromDate, toDate)[-5:],
+            [
+                (1, dt.date(2020, 3, 27)),
+                (2, dt.date(2020, 3, 10)),
+                (3, dt.date(2020, 3, 20)),
+                (3, dt.date(2020, 3, 21)),
+                (3, dt.date(2020, 3, 22)),
+            ],
+        )
+
+    def testNoRules(self):
+        self.assertEqual(expandMany([], dt.date(2020, 3, 1), dt.date(2020, 3, 31)), [])
+
+
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
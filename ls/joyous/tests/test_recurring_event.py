@@ -281,6 +281,24 @@ class Test(TestCase):
         self.assertIs(self.event._occursOn(dt.date(2018, 3, 6)), True)
         self.assertIs(self.event._occursOn(dt.date(2018, 3, 13)), False)
 
+    @freeze_timetz("2017-10-10 10:00")
+    def testTimeline(self):
+        event = RecurringEventPage.objects.get(id=self.event.id)
+        self.assertEqual(event.next_date, dt.date(2017, 11, 7))
+        with self.assertNumQueries(0):
+            self.assertEqual(event.prev_date, dt.date(2017, 10, 3))
+            self.assertIsNone(event.status)
+            self.assertIs(event._occursOn(dt.date(2017, 11, 7)), True)
+        cancellation = CancellationPage(
+            owner=self.user,
+            overrides=self.event,
+            except_date=dt.date(2017, 11, 7),
+            cancellation_title="Meetup Cancelled",
+        )
+        self.event.add_child(instance=cancellation)
+        self.assertIs(event._occursOn(dt.date(2017, 11, 7)), False)
+        self.assertEqual(event.next_date, dt.date(2017, 12, 5))
+
 
 # ------------------------------------------------------------------------------
 class TestTZ(TestCase):
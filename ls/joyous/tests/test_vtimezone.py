@@ -70,6 +70,18 @@ class TestVDt(TestCase):
         assert vberlin_std in vberlin
         assert vberlin_dst in vberlin
 
+    def testCopied(self):
+        atime = dt.datetime(2014, 10, 28, 10, 10)
+        btime = dt.datetime(2015, 1, 1, 0, 0)
+        vberlin1 = create_timezone(self.berlin, atime, atime)
+        vberlin1.add("X-TEST", "1")
+        vberlin1.subcomponents[0].add("X-TEST", "2")
+        vberlin2 = create_timezone(self.berlin, atime, btime)
+        self.assertIsNot(vberlin1, vberlin2)
+        self.assertNotIn(b"X-TEST", vberlin2.to_ical())
+        self.assertEqual(vberlin2.to_ical().count(b"BEGIN:STANDARD"), 1)
+        self.assertEqual(vberlin2.to_ical().count(b"BEGIN:DAYLIGHT"), 1)
+
     def testBogota(self):
         vbogota = [
             b"BEGIN:VTIMEZONE",
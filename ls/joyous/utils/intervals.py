@@ -0,0 +1,91 @@
+# ------------------------------------------------------------------------------
+# Date intervals
+# ------------------------------------------------------------------------------
+import datetime as dt
+from bisect import bisect_right
+
+
+# ------------------------------------------------------------------------------
+class DateIntervals:
+    """
+    An index of date intervals, each with a value, which finds the interval
+    covering a date by bisection.  The intervals may overlap, where they do
+    the one given last wins.  An interval with no end date goes on forever.
+
+    :param intervals: an iterable of (fromDate, toDate or None, value)
+    """
+
+    __NOTHING = object()
+
+    def __init__(self, intervals=()):
+        intervals = [
+            (fromDate.toordinal(), (toDate or dt.date.max).toordinal(), value)
+            for fromDate, toDate, value in intervals
+        ]
+        self._starts = []
+        self._ends = []
+        self._values = []
+        # Split the intervals into non-overlapping segments at every boundary
+        bounds = sorted(
+            {start for start, _, _ in intervals} | {end + 1 for _, end, _ in intervals}
+        )
+        for start, nextStart in zip(bounds, bounds[1:]):
+            value = self.__valueOver(intervals, start)
+            if value is self.__NOTHING:
+                continue
+            if self._values and self._ends[-1] == start - 1:
+                if self._values[-1] is value:
+                    self._ends[-1] = nextStart - 1
+                    continue
+            self._starts.append(start)
+            self._ends.append(nextStart - 1)
+            self._values.append(value)
+
+    @classmethod
+    def __valueOver(cls, intervals, ord):
+        for start, end, value in reversed(intervals):
+            if start <= ord <= end:
+                return value
+        return cls.__NOTHING
+
+    def __bool__(self):
+        return bool(self._starts)
+
+    def __contains__(self, myDate):
+        return self.__find(myDate.toordinal()) is not None
+
+    def __find(self, ord):
+        index = bisect_right(self._starts, ord) - 1
+        if index >= 0 and ord <= self._ends[index]:
+            return index
+        return None
+
+    def get(self, myDate, default=None):
+        """
+        The value of the interval covering myDate, or default.
+        """
+        index = self.__find(myDate.toordinal())
+        if index is None:
+            return default
+        return self._values[index]
+
+    def within(self, fromDate, toDate):
+        """
+        Generator of (date, value) for each date from fromDate to toDate
+        (inclusive) that is covered by an interval.
+        """
+        fromOrd = fromDate.toordinal()
+        toOrd = toDate.toordinal()
+        index = max(bisect_right(self._starts, fromOrd) - 1, 0)
+        while index < len(self._starts) and self._starts[index] <= toOrd:
+            value = self._values[index]
+            start = max(self._starts[index], fromOrd)
+            end = min(self._ends[index], toOrd)
+            for ord in range(start, end + 1):
+                yield (dt.date.fromordinal(ord), value)
+            index += 1
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
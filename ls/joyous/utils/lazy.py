@@ -0,0 +1,202 @@
+# ------------------------------------------------------------------------------
+# Lazy evaluation utilities
+# ------------------------------------------------------------------------------
+import heapq
+from collections.abc import Sequence
+from itertools import count, islice
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.utils.translation import gettext_lazy as _
+
+
+# ------------------------------------------------------------------------------
+class LazyList(Sequence):
+    """
+    A read-only list whose items are only taken from the iterable as they are
+    needed.  Asking for the length evaluates everything.
+    """
+
+    def __init__(self, iterable):
+        super().__init__()
+        self._cache = []
+        self._iterator = iter(iterable)
+
+    @property
+    def evaluated(self):
+        """The number of items that have been evaluated so far."""
+        return len(self._cache)
+
+    @property
+    def exhausted(self):
+        """Have all the items been evaluated?"""
+        return self._iterator is None
+
+    def evaluateTo(self, stop=None):
+        """Evaluate the items up to stop (or all of them if stop is None)."""
+        if self._iterator is None:
+            return
+        if stop is None:
+            self._cache.extend(self._iterator)
+            self._iterator = None
+        elif stop > len(self._cache):
+            self._cache.extend(islice(self._iterator, stop - len(self._cache)))
+            if len(self._cache) < stop:
+                self._iterator = None
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop = index.start, index.stop
+            if stop is None or stop < 0 or (start is not None and start < 0):
+                self.evaluateTo()
+            else:
+                self.evaluateTo(max(stop, start or 0))
+        elif index < 0:
+            self.evaluateTo()
+        else:
+            self.evaluateTo(index + 1)
+        return self._cache[index]
+
+    def __len__(self):
+        self.evaluateTo()
+        return len(self._cache)
+
+    def __bool__(self):
+        self.evaluateTo(1)
+        return bool(self._cache)
+
+    def __iter__(self):
+        i = 0
+        while True:
+            if i >= len(self._cache):
+                self.evaluateTo(i + 1)
+                if i >= len(self._cache):
+                    return
+            yield self._cache[i]
+            i += 1
+
+    def __repr__(self):
+        items = ", ".join(repr(item) for item in self._cache)
+        if not self.exhausted:
+            items += ", ..." if items else "..."
+        return "LazyList([{}])".format(items)
+
+
+# ------------------------------------------------------------------------------
+class _Descending:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+def sortNearlySorted(iterable, key, bound, reverse=False):
+    """
+    Lazily sort an iterable that is already nearly in order.
+
+    The iterable must be in order of bound(item), and bound(item) must never be
+    after key(item) (or before it if reverse is True).  An item is yielded as
+    soon as nothing still to come from the iterable could be sorted before it.
+    """
+    wrap = _Descending if reverse else (lambda value: value)
+    tiebreak = count()
+    heap = []
+    for item in iterable:
+        limit = wrap(bound(item))
+        while heap and not limit < heap[0][0]:
+            yield heapq.heappop(heap)[2]
+        heapq.heappush(heap, (wrap(key(item)), next(tiebreak), item))
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def mergeSorted(iterables, key, reverse=False):
+    """
+    Lazily merge iterables which are each already sorted by key into a
+    :class:`LazyList`.
+    """
+    return LazyList(heapq.merge(*iterables, key=key, reverse=reverse))
+
+
+# ------------------------------------------------------------------------------
+class LazyPaginator(Paginator):
+    """
+    A Paginator for a :class:`LazyList` which only evaluates the items up to
+    the end of the page asked for (plus one more to know if there is a next
+    page).  The count and number of pages are of what is known so far.
+    """
+
+    @property
+    def count(self):
+        return self.object_list.evaluated
+
+    @property
+    def num_pages(self):
+        if self.count == 0 and not self.allow_empty_first_page:
+            return 0
+        hits = max(1, self.count - self.orphans)
+        return -(-hits // self.per_page)
+
+    def validate_number(self, number):
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_("That page number is not an integer"))
+        if number < 1:
+            raise EmptyPage(_("That page number is less than 1"))
+        self.object_list.evaluateTo(number * self.per_page + self.orphans + 1)
+        if number > self.num_pages:
+            if number == 1 and self.allow_empty_first_page:
+                pass
+            else:
+                raise EmptyPage(_("That page contains no results"))
+        return number
+
+
+class CursorPage(Sequence):
+    """
+    A page of items which was found by seeking past a cursor, rather than by
+    counting pages.  Only the items on the page plus one more are evaluated.
+
+    :param items: the items starting from just past the cursor
+    :param perPage: the number of items on each page
+    :param cursorName: the name of the query parameter for the cursor
+    :param getCursor: returns the cursor token for an item
+    :param isFirst: is this the first page?
+    """
+
+    def __init__(self, items, perPage, cursorName, getCursor, isFirst=True):
+        super().__init__()
+        items = items[: perPage + 1]
+        self.object_list = items[:perPage]
+        self.cursor_name = cursorName
+        self.next_cursor = None
+        if len(items) > perPage:
+            self.next_cursor = getCursor(self.object_list[-1])
+        self.is_first = isFirst
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __repr__(self):
+        return "<CursorPage {}={}>".format(self.cursor_name, self.next_cursor)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return not self.is_first
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
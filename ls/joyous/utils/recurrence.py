@@ -9,7 +9,9 @@
 #   https://github.com/django-recurrence/django-recurrence
 #   https://github.com/dakrauth/django-swingtime
 
+from collections import namedtuple
 from operator import attrgetter
+import calendar
 import datetime as dt
 from dateutil.rrule import rrule, rrulestr, rrulebase
 from dateutil.rrule import DAILY, WEEKLY, MONTHLY, YEARLY
@@ -67,6 +69,49 @@ class Weekday(rrweekday):
 MO, TU, WE, TH, FR, SA, SU = EVERYWEEKDAY = map(Weekday, range(7))
 
 
+# ------------------------------------------------------------------------------
+# The most days in a period of each frequency
+_PERIOD_SPANS = {
+    YEARLY: dt.timedelta(days=366),
+    MONTHLY: dt.timedelta(days=31),
+    WEEKLY: dt.timedelta(days=7),
+    DAILY: dt.timedelta(days=1),
+}
+
+
+def _toDate(myDate):
+    if isinstance(myDate, dt.datetime):
+        return myDate.date()
+    return myDate
+
+
+# The attributes of a date which the BYxxx parts are matched against
+_DayInfo = namedtuple(
+    "_DayInfo",
+    "date ordinal year month day weekday nday "
+    "nthOfMonth nthLastOfMonth nthOfYear nthLastOfYear",
+)
+
+
+def _getDayInfo(myDate):
+    daysInMonth = calendar.monthrange(myDate.year, myDate.month)[1]
+    daysInYear = 366 if calendar.isleap(myDate.year) else 365
+    dayOfYear = myDate.timetuple().tm_yday
+    return _DayInfo(
+        myDate,
+        myDate.toordinal(),
+        myDate.year,
+        myDate.month,
+        myDate.day,
+        myDate.weekday(),
+        myDate.day - daysInMonth - 1,
+        (myDate.day - 1) // 7 + 1,
+        -((daysInMonth - myDate.day) // 7 + 1),
+        (dayOfYear - 1) // 7 + 1,
+        -((daysInYear - dayOfYear) // 7 + 1),
+    )
+
+
 # ------------------------------------------------------------------------------
 class Recurrence(rrulebase):
     """
@@ -190,6 +235,193 @@ class Recurrence(rrulebase):
         for occurence in self.rule._iter():
             yield occurence.date()
 
+    def xafter(self, myDate, count=None, inc=False):
+        """
+        Generator which yields up to count occurrences after myDate.
+        """
+        if not self._canSeek():
+            yield from super().xafter(myDate, count, inc)
+            return
+        n = 0
+        for occurence in self._iterFrom(myDate):
+            if count is not None and n >= count:
+                break
+            if occurence > myDate or (inc and occurence == myDate):
+                yield occurence
+                n += 1
+
+    def after(self, myDate, inc=False):
+        """
+        Returns the first occurrence after myDate, or None.
+        """
+        if not self._canSeek():
+            return super().after(myDate, inc)
+        return next(self.xafter(myDate, inc=inc), None)
+
+    def before(self, myDate, inc=False):
+        """
+        Returns the last occurrence before myDate, or None.
+        """
+        if not self._canSeek():
+            return super().before(myDate, inc)
+        # look back further and further until an occurrence is found
+        span = _PERIOD_SPANS[self.rule._freq] * self.rule._interval
+        fromDate = _toDate(myDate)
+        while True:
+            fromDate -= span
+            retval = None
+            for occurence in self._iterFrom(fromDate):
+                if occurence > myDate or (not inc and occurence == myDate):
+                    break
+                retval = occurence
+            if retval is not None or fromDate <= self.dtstart:
+                return retval
+            span *= 2
+
+    def between(self, after, before, inc=False, count=1):
+        """
+        Returns all the occurrences between after and before.
+        """
+        if not self._canSeek():
+            return super().between(after, before, inc, count)
+        retval = []
+        for occurence in self._iterFrom(after):
+            if occurence > before or (not inc and occurence == before):
+                break
+            if occurence > after or (inc and occurence == after):
+                retval.append(occurence)
+        return retval
+
+    def __contains__(self, myDate):
+        """
+        Is myDate one of the occurrences?  Worked out from the date itself
+        rather than by iterating through the occurrences from dtstart.
+        """
+        if (
+            isinstance(myDate, dt.datetime)
+            or not isinstance(myDate, dt.date)
+            or not self._canSeek()
+        ):
+            return super().__contains__(myDate)
+        return bool(self._occursOnDays([_getDayInfo(myDate)]))
+
+    def _occursOnDays(self, days):
+        # The dates of the days (from _getDayInfo) which are occurrences,
+        # checking each against the interval and BYxxx parts directly
+        rule = self.rule
+        firstDate = self.dtstart
+        if dt.datetime.combine(firstDate, rule._timeset[-1]) < rule._dtstart:
+            firstDate += dt.timedelta(days=1)
+        lastDate = None
+        if rule._until is not None:
+            lastDate = rule._until.date()
+            if dt.datetime.combine(lastDate, rule._timeset[0]) > rule._until:
+                lastDate -= dt.timedelta(days=1)
+        interval = rule._interval
+        firstPeriod = self._getPeriodNum(_getDayInfo(self.dtstart))
+        nthOfYear = rule._freq == YEARLY and not rule._bymonth
+        bymonth = rule._bymonth
+        byweekday = rule._byweekday
+        bynweekday = rule._bynweekday
+        bymonthday = rule._bymonthday
+        bynmonthday = rule._bynmonthday
+
+        retval = []
+        for day in days:
+            if day.date < firstDate or (lastDate is not None and day.date > lastDate):
+                continue
+            if (self._getPeriodNum(day) - firstPeriod) % interval:
+                continue
+            if bymonth and day.month not in bymonth:
+                continue
+            if byweekday and day.weekday not in byweekday:
+                continue
+            if bynweekday:
+                if nthOfYear:
+                    nths = (day.nthOfYear, day.nthLastOfYear)
+                else:
+                    nths = (day.nthOfMonth, day.nthLastOfMonth)
+                if all((day.weekday, nth) not in bynweekday for nth in nths):
+                    continue
+            if bymonthday or bynmonthday:
+                if day.day not in bymonthday and day.nday not in bynmonthday:
+                    continue
+            retval.append(day.date)
+        return retval
+
+    def _getPeriodNum(self, day):
+        # Number the periods of our frequency that day falls in
+        rule = self.rule
+        if rule._freq == DAILY:
+            return day.ordinal
+        elif rule._freq == WEEKLY:
+            return (day.ordinal - (day.weekday - rule._wkst) % 7) // 7
+        elif rule._freq == MONTHLY:
+            return day.year * 12 + day.month
+        else:
+            return day.year
+
+    def _canSeek(self):
+        # Can we go directly to the period containing a date, or do we have
+        # to count through every occurrence from dtstart?
+        rule = self.rule
+        return (
+            rule._freq in _PERIOD_SPANS
+            and rule._count is None
+            and not rule._bysetpos
+            and not rule._byweekno
+            and not rule._byyearday
+            and not rule._byeaster
+        )
+
+    def _iterFrom(self, myDate):
+        # The occurrences from the start of the period containing myDate on
+        for occurence in self._seek(_toDate(myDate)):
+            yield occurence.date()
+
+    def _seek(self, myDate):
+        # An rrule which gives the same occurrences as ours, but starting from
+        # the period containing myDate
+        rule = self.rule
+        start = self.dtstart
+        interval = rule._interval
+        if rule._freq == DAILY:
+            periods = (myDate - start).days // interval
+            periodStart = start + dt.timedelta(days=periods * interval)
+        elif rule._freq == WEEKLY:
+            firstWeek = start - dt.timedelta(days=(start.weekday() - rule._wkst) % 7)
+            myWeek = myDate - dt.timedelta(days=(myDate.weekday() - rule._wkst) % 7)
+            periods = (myWeek - firstWeek).days // (7 * interval)
+            periodStart = firstWeek + dt.timedelta(weeks=periods * interval)
+        elif rule._freq == MONTHLY:
+            months = (myDate.year - start.year) * 12 + myDate.month - start.month
+            periods = months // interval
+            monthNum = start.month - 1 + periods * interval
+            periodStart = dt.date(start.year + monthNum // 12, monthNum % 12 + 1, 1)
+        else:
+            periods = (myDate.year - start.year) // interval
+            periodStart = dt.date(start.year + periods * interval, 1, 1)
+        if periods <= 0:
+            return rule
+        # Give all the BYxxx parts explicitly, so they are not defaulted from
+        # the new dtstart
+        return rrule(
+            rule._freq,
+            dtstart=dt.datetime.combine(
+                periodStart, dt.time.min, tzinfo=rule._dtstart.tzinfo
+            ),
+            interval=interval,
+            wkst=rule._wkst,
+            until=rule._until,
+            bymonth=rule._bymonth,
+            bymonthday=self.bymonthday or None,
+            byweekday=self.byweekday or None,
+            byhour=rule._byhour,
+            byminute=rule._byminute,
+            bysecond=rule._bysecond,
+            cache=False,
+        )
+
     # __len__() introduces a large performance penality.
     def getCount(self):
         """
@@ -388,6 +620,32 @@ class Recurrence(rrulebase):
         return retval
 
 
+# ------------------------------------------------------------------------------
+def expandMany(recurrences, fromDate, toDate):
+    """
+    Find the occurrences of many recurrences from fromDate to toDate
+    (inclusive) in one go.  The days in the range are worked out once and
+    then each recurrence is checked against them, rather than each being
+    iterated through separately.
+
+    :param recurrences: a sequence of :class:`Recurrence` objects
+    :param fromDate: the first date to look at
+    :param toDate: the last date to look at
+    :rtype: list of (index of the recurrence, date of the occurrence) pairs,
+            in order of index then date
+    """
+    numDays = (toDate - fromDate).days + 1
+    days = [_getDayInfo(fromDate + dt.timedelta(days=n)) for n in range(numDays)]
+    retval = []
+    for index, recurrence in enumerate(recurrences):
+        if recurrence._canSeek():
+            occurences = recurrence._occursOnDays(days)
+        else:
+            occurences = recurrence.between(fromDate, toDate, inc=True)
+        retval.extend((index, occurence) for occurence in occurences)
+    return retval
+
+
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
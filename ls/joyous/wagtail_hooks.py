@@ -2,10 +2,13 @@
 # Events hooks
 # ------------------------------------------------------------------------------
 
+from functools import partial
 from wagtail import hooks
 from wagtail_modeladmin.options import ModelAdmin
 from wagtail_modeladmin.options import modeladmin_register
 from .models import EventCategory, CalendarPage, CalendarPageForm
+from .models.calendar_cache import getExportCacheKey, serveCalendarResponse
+from .models.calendar_cache import getCalendarValidators, serveConditionalResponse
 from .formats import NullHandler, ICalHandler, GoogleCalendarHandler, RssHandler
 
 
@@ -21,7 +24,14 @@ def handlePageExport(page, request, serve_args, serve_kwargs):
         handler = RssHandler()
     else:
         handler = NullHandler()
-    return handler.serve(page, request, serve_args, serve_kwargs)
+    serve = partial(handler.serve, page, request, serve_args, serve_kwargs)
+    key = getExportCacheKey(page, request, format)
+    if key is not None:
+        serve = partial(serveCalendarResponse, key, serve)
+    validators = getCalendarValidators(page, request, format)
+    if validators is not None:
+        return serveConditionalResponse(request, validators, serve)
+    return serve()
 
 
 @hooks.register("before_edit_page")